@@ -0,0 +1,101 @@
+import sys
+from array import array
+from bisect import bisect_right
+
+import mufsim.stackitems as si
+
+
+def operand_key(val):
+    # Hashable stand-in for an operand value, or a TypeError if it has none.
+    # Types are part of the key, so 1, 1.0 and True never share a slot.
+    # Floats are keyed by their exact bits, so 0.0 and -0.0 don't either.
+    typ = type(val)
+    if typ is float:
+        return (typ, val.hex())
+    if typ in (int, str, bool, type(None)):
+        return (typ, val)
+    if isinstance(val, si.ValueItem):
+        # Keyed by the arguments it would be rebuilt from.
+        args = val.__reduce__()[1]
+        return (typ, tuple(operand_key(v) for v in args))
+    raise TypeError("Unpoolable operand type: %s" % typ.__name__)
+
+
+# Compact storage for compiled instructions.  Each instruction is an opcode,
+# naming its class, and an index into a pool of interned operand tuples.
+# Line numbers are run-length encoded.  Instructions are rebuilt on demand
+# with their original attributes.
+class MufBytecode(object):
+    opcode_classes = []
+    opcode_nums = {}
+
+    def __init__(self, code=()):
+        self.opcodes = array('H')
+        self.operands = array('L')
+        self.pool = []
+        self.pool_index = {}
+        self.line_addrs = array('L')
+        self.line_nums = array('l')
+        for inst in code:
+            self.append(inst)
+
+    @classmethod
+    def get_opcode(cls, instcls):
+        if instcls not in cls.opcode_nums:
+            cls.opcode_nums[instcls] = len(cls.opcode_classes)
+            cls.opcode_classes.append(instcls)
+        return cls.opcode_nums[instcls]
+
+    def intern_operands(self, items):
+        items = tuple(
+            (k, sys.intern(v) if type(v) is str else v)
+            for k, v in items
+        )
+        try:
+            key = tuple((k, operand_key(v)) for k, v in items)
+        except TypeError:
+            self.pool.append(items)
+            return len(self.pool) - 1
+        if key not in self.pool_index:
+            self.pool_index[key] = len(self.pool)
+            self.pool.append(items)
+        return self.pool_index[key]
+
+    def append(self, inst):
+        addr = len(self.opcodes)
+        items = [(k, v) for k, v in inst.__dict__.items() if k != 'line']
+        self.opcodes.append(self.get_opcode(type(inst)))
+        self.operands.append(self.intern_operands(items))
+        if not self.line_nums or self.line_nums[-1] != inst.line:
+            self.line_addrs.append(addr)
+            self.line_nums.append(inst.line)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def get_class(self, addr):
+        return self.opcode_classes[self.opcodes[addr]]
+
+    def get_line(self, addr):
+        return self.line_nums[bisect_right(self.line_addrs, addr) - 1]
+
+    def get_inst(self, addr):
+        cls = self.get_class(addr)
+        inst = cls.__new__(cls)
+        inst.__dict__.update(self.pool[self.operands[addr]])
+        inst.line = self.get_line(addr)
+        return inst
+
+    def __getitem__(self, addr):
+        if addr < 0:
+            addr += len(self)
+        if addr < 0 or addr >= len(self):
+            raise IndexError("bytecode address out of range")
+        return self.get_inst(addr)
+
+    def __iter__(self):
+        for addr in range(len(self)):
+            yield self.get_inst(addr)
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
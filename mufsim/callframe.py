@@ -4,19 +4,69 @@ import mufsim.stackitems as si
 
 
 class MufCallFrame(object):
-    def __init__(self, addr, caller):
+    def __init__(self, addr, caller, compiled=None, varcount=0):
         if isinstance(caller, int):
             caller = si.DBRef(caller)
-        self.variables = {}
+        self.variables = [0] * varcount
         self.loop_stack = []
-        self.pc = addr
+        self.prog = addr.prog
+        self.pcnum = addr.value
+        self.compiled = compiled
         self.caller = caller
+        self.elided = 0
+        self.memos = ()
+
+    def __deepcopy__(self, memo):
+        # The compiled program is shared, never copied.
+        fr = MufCallFrame.__new__(MufCallFrame)
+        memo[id(self)] = fr
+        fr.variables = copy.deepcopy(self.variables, memo)
+        fr.loop_stack = copy.deepcopy(self.loop_stack, memo)
+        fr.prog = self.prog
+        fr.pcnum = self.pcnum
+        fr.compiled = self.compiled
+        fr.caller = copy.deepcopy(self.caller, memo)
+        fr.elided = self.elided
+        fr.memos = self.memos
+        return fr
+
+    def fork(self, memo):
+        # A copy for a forked process.  Stack items are shared with this
+        # frame, except arrays, which get copied by si.fork_copy(), and the
+        # loop states, which change as loops run.
+        fr = MufCallFrame.__new__(MufCallFrame)
+        fr.variables = [si.fork_copy(x, memo) for x in self.variables]
+        fr.loop_stack = []
+        for typ, state in self.loop_stack:
+            state = list(state)
+            if typ == "foreach":
+                state[0] = si.fork_contents(state[0], memo)
+            fr.loop_stack.append((typ, state))
+        fr.prog = self.prog
+        fr.pcnum = self.pcnum
+        fr.compiled = self.compiled
+        fr.caller = self.caller
+        fr.elided = self.elided
+        fr.memos = self.memos
+        return fr
+
+    @property
+    def pc(self):
+        return si.Address(self.pcnum, self.prog)
+
+    @pc.setter
+    def pc(self, addr):
+        self.pc_set(addr)
 
     def pc_advance(self, delta):
-        self.pc.value += delta
+        self.pcnum += delta
 
     def pc_set(self, addr):
-        self.pc = copy.deepcopy(addr)
+        if addr.prog != self.prog:
+            # The compiled code was for the other program.
+            self.compiled = None
+        self.prog = addr.prog
+        self.pcnum = addr.value
 
     def loop_iter_push(self, typ, it):
         self.loop_stack.append((typ, it))
@@ -28,12 +78,17 @@ class MufCallFrame(object):
         return self.loop_stack[-1]
 
     def variable_get(self, varnum):
-        if varnum in self.variables:
+        try:
             return self.variables[varnum]
-        return 0
+        except IndexError:
+            return 0
 
     def variable_set(self, varnum, val):
-        self.variables[varnum] = val
+        try:
+            self.variables[varnum] = val
+        except IndexError:
+            self.variables.extend([0] * (varnum + 1 - len(self.variables)))
+            self.variables[varnum] = val
 
 
 # vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -1,28 +1,59 @@
 import mufsim.stackitems as si
 import mufsim.gamedb as db
+from mufsim.bytecode import MufBytecode
 from mufsim.insts.flow import InstFunc
+from mufsim.jit import MufJit
+from mufsim.memo import MufMemoCache
 
 
 class CompiledMuf(object):
     def __init__(self, prog):
         self.program = prog
         self.srclines = db.getobj(prog).sources.split("\n")
-        self.code = []
+        self.bytecode = MufBytecode()
+        self.insts = []
+        self.frame_sizes = {}
         self.functions = {}
         self.publics = {}
         self.func_vars = {}
         self.global_vars = ["me", "loc", "trigger", "command"]
         self.lastfunction = None
+        self.inlined = []
+        self.dispatch = None
+        self.jit_dispatch = None
+        self.jit = None
+        self.pure_funcs = {}
+        self.pure_addrs = None
+        self.memo = MufMemoCache()
+
+    @property
+    def code(self):
+        # Indexing the bytecode decodes just that one instruction.  Use
+        # get_inst() to get the decoded instruction the engines run.
+        return self.bytecode
+
+    @code.setter
+    def code(self, code):
+        self.bytecode = MufBytecode(code)
+        self.insts = [None] * len(self.bytecode)
+        self.frame_sizes = {}
+        self.dispatch = None
+        self.jit_dispatch = None
+        self.jit = None
+        self.pure_addrs = None
+
+    def get_code_size(self):
+        return len(self.bytecode)
 
     def get_tokens_info(self):
         return [
             {
                 "prog": self.program,
                 "addr": i,
-                "line": inst.line,
-                "repr": str(inst)
+                "line": self.bytecode.get_line(i),
+                "repr": str(self.bytecode.get_inst(i))
             }
-            for i, inst in enumerate(self.code)
+            for i in range(len(self.bytecode))
         ]
 
     def add_function(self, funcname, addr):
@@ -47,24 +78,92 @@ class CompiledMuf(object):
         self.publics[funcname] = self.functions[funcname]
         return True
 
+    def declare_pure(self, funcname, argcount=None):
+        # Without an explicit count, the function's declared arguments
+        # are the ones its results depend on.
+        self.pure_funcs[funcname] = argcount
+
+    def get_pure_funcs(self):
+        # Maps the address of each function declared pure to the number of
+        # stack arguments it takes.
+        if self.pure_addrs is None:
+            self.pure_addrs = {}
+            for funcname, argcount in self.pure_funcs.items():
+                addr = self.functions[funcname].value
+                if argcount is None:
+                    inst = self.code[addr]
+                    argcount = inst.varcount if isinstance(inst, InstFunc) else 0
+                self.pure_addrs[addr] = argcount
+        return self.pure_addrs
+
     def find_func(self, addr):
         if isinstance(addr, si.Address):
             addr = addr.value
-        while addr > 0 and not isinstance(self.code[addr], InstFunc):
+        for start, end, funcname in self.inlined:
+            if start <= addr < end:
+                return funcname
+        bytecode = self.bytecode
+        while addr > 0 and not issubclass(bytecode.get_class(addr), InstFunc):
             addr -= 1
-        if not isinstance(self.code[addr], InstFunc):
+        if not issubclass(bytecode.get_class(addr), InstFunc):
             return ""
-        return self.code[addr].funcname
+        return bytecode[addr].funcname
 
     def get_inst(self, addr):
+        # Instructions are decoded the first time they're needed, and then
+        # kept, so that every engine runs the same instance, along with
+        # any state it caches, like a CALL's resolved target.
+        if isinstance(addr, si.Address):
+            addr = addr.value
+        inst = self.insts[addr]
+        if inst is None:
+            inst = self.insts[addr] = self.bytecode[addr]
+        return inst
+
+    def get_frame_size(self, addr):
+        # Looked up on every call, so the sizes are kept by address.
         if isinstance(addr, si.Address):
             addr = addr.value
-        return self.code[addr]
+        size = self.frame_sizes.get(addr)
+        if size is None:
+            size = 0
+            if 0 <= addr < len(self.bytecode):
+                if issubclass(self.bytecode.get_class(addr), InstFunc):
+                    inst = self.bytecode[addr]
+                    funcvars = self.func_vars.get(inst.funcname, [])
+                    size = max(inst.varcount, len(funcvars))
+            self.frame_sizes[addr] = size
+        return size
+
+    def get_dispatch(self, jit=False):
+        if jit:
+            if self.jit_dispatch is None:
+                self.jit = MufJit(self)
+                self.jit_dispatch = self.jit.build_dispatch(self.lazy_ops())
+            return self.jit_dispatch
+        if self.dispatch is None:
+            self.dispatch = self.lazy_ops()
+        return self.dispatch
+
+    def lazy_ops(self):
+        # A dispatch table whose entries decode and lower their instruction
+        # the first time they run, so code that never runs is never decoded.
+        # Entries are only ever run for the top frame's pc.
+        ops = []
+
+        def decode(fr):
+            addr = fr.call_stack[-1].pcnum
+            op = self.get_inst(addr).lower(self)
+            if ops[addr] is decode:
+                ops[addr] = op
+            op(fr)
+        ops.extend([decode] * len(self.bytecode))
+        return ops
 
     def get_inst_line(self, addr):
         if isinstance(addr, si.Address):
             addr = addr.value
-        return self.code[addr].line
+        return self.bytecode.get_line(addr)
 
     def add_func_var(self, funcname, varname):
         varcount = len(self.func_vars[funcname])
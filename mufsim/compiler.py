@@ -5,8 +5,10 @@ from pymuv.parsefile import MuvParser
 import mufsim.stackitems as si
 import mufsim.gamedb as db
 import mufsim.utils as util
-from mufsim.logger import errlog
+from mufsim.logger import errlog, warnlog
 from mufsim.compiled import CompiledMuf
+from mufsim.optimizer import MufOptimizer
+from mufsim.stackeffects import MufStackAnalyzer
 from mufsim.errors import MufCompileError, ReloadAsMuvException
 
 import mufsim.insts.flow as instfl
@@ -33,6 +35,7 @@ import mufsim.insts.timedate  # noqa
 
 
 from mufsim.insts.base import primitives
+from mufsim.insts.fused import fuse_instructions
 import mufsim.configs as confs
 
 
@@ -134,8 +137,13 @@ class MufCompiler(object):
         'sorttype_shuffle': '4',
     }
 
-    def __init__(self, target='fb6'):
+    def __init__(self, target='fb6', fuse=False, optimize=0, warn_stack=False):
         self.target = target
+        self.fuse = fuse
+        self.warn_stack = warn_stack
+        self.stack_warnings = []
+        self.optlevel = optimize
+        self.optimize = optimize
         self.compiled = None
         self.word_line = 1
         self.muv_line = None
@@ -401,6 +409,8 @@ class MufCompiler(object):
         self.muv_line = None
         self.stmt_stack = []
         self.funcname = None
+        self.optimize = self.optlevel
+        self.stack_warnings = []
         self.defines = dict(self.builtin_defines)
         self.include_defs_from(0, suppress=True)
         progobj = db.getobj(prog)
@@ -425,14 +435,8 @@ class MufCompiler(object):
             if self.funcname:
                 raise MufCompileError("Function incomplete.")
             self.check_for_incomplete_block()
+            code = self.finish_code(comp, code)
             if code:
-                for inum, inst in enumerate(code):
-                    if type(inst) in [
-                        instfl.InstTry,
-                        instfl.InstJmp,
-                        instfl.InstJmpIfFalse
-                    ]:
-                        inst.value += inum
                 comp.code = code
                 db.getobj(prog).compiled = comp
                 return True
@@ -441,5 +445,33 @@ class MufCompiler(object):
             errlog("Error in line %d: %s" % (self.word_line, e))
             return None
 
+    def finish_code(self, comp, code):
+        # Checks the names declared pure, resolves relative jumps, then
+        # optimizes, checks and fuses the code.  Returns the final code.
+        for funcname in comp.pure_funcs:
+            if comp.get_function_addr(funcname) is None:
+                raise MufCompileError(
+                    "Unrecognized identifier: %s" % funcname)
+        if not code:
+            return code
+        for inum, inst in enumerate(code):
+            if type(inst) in instfl.relative_jump_types:
+                inst.value += inum
+        if self.optimize >= 1:
+            code = MufOptimizer(comp, self.optimize).optimize(code)
+        self.analyze_stack(comp, code)
+        if self.fuse or self.optimize >= 2:
+            fuse_instructions(code)
+        return code
+
+    def analyze_stack(self, comp, code):
+        analyzer = MufStackAnalyzer(comp)
+        if self.optimize >= 1:
+            analyzer.mark_proven(code)
+        if self.warn_stack:
+            self.stack_warnings = analyzer.find_underflows(code)
+            for msg in self.stack_warnings:
+                warnlog("Warning: %s" % msg)
+
 
 # vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -86,7 +86,10 @@ class ConsoleMufDebugger(object):
                     if x.startswith(text) or x.startswith(muvname)
                 ]
             elif words[0] == 'show':
-                showcmds = ['breakpoints', 'functions', 'globals', 'vars']
+                showcmds = [
+                    'breakpoints', 'functions', 'globals', 'memo',
+                    'processes', 'vars'
+                ]
                 self.matches = [x for x in showcmds if x.startswith(text)]
             elif words[0] in ['p', 'print']:
                 fun = self.fr.program_find_func(addr)
@@ -293,6 +296,34 @@ class ConsoleMufDebugger(object):
         else:
             log("  - None -")
 
+    def debug_cmd_show_memo(self):
+        log("Pure Function Memo Cache")
+        addr = self.fr.curr_addr()
+        stats = self.fr.program_memo_stats(addr.prog)
+        if stats:
+            for fun, hits, misses, cnt in stats:
+                log("  %s: %d hits, %d misses, %d cached" %
+                    (fun, hits, misses, cnt))
+        else:
+            log("  - None -")
+
+    def debug_cmd_show_processes(self):
+        log("Processes")
+        modes = {
+            self.fr.MODE_PREEMPT: "preempt",
+            self.fr.MODE_FOREGROUND: "foreground",
+            self.fr.MODE_BACKGROUND: "background",
+        }
+        for pid in sorted(process_list.get_pids()):
+            proc = process_list.get(pid)
+            cnt, avg, most = proc.get_wait_stats()
+            log("  PID %d %s: %s, %d cycles, queued %d times, "
+                "%.4fs avg wait, %.4fs max wait" % (
+                    pid, proc.wait_state or "RUNNING",
+                    modes.get(proc.execution_mode, "unknown"),
+                    proc.cycles, cnt, avg, most
+                ))
+
     def debug_cmd_show_vars(self):
         log("Function Variables")
         addr = self.fr.curr_addr()
@@ -313,12 +344,18 @@ class ConsoleMufDebugger(object):
             self.debug_cmd_show_functions()
         elif args == "globals":
             self.debug_cmd_show_globals()
+        elif args == "memo":
+            self.debug_cmd_show_memo()
+        elif args == "processes":
+            self.debug_cmd_show_processes()
         elif args == "vars":
             self.debug_cmd_show_vars()
         else:
             log("Usage: show breakpoints")
             log("   or: show functions")
             log("   or: show globals")
+            log("   or: show memo")
+            log("   or: show processes")
             log("   or: show vars")
 
     def debug_cmd_stack(self, args):
@@ -386,6 +423,8 @@ class ConsoleMufDebugger(object):
         fmt = "{level:-3d}: In prog {prog}, func '{func}', line {line}: {inst}"
         fmt += "\n    {src}"
         for callinfo in self.fr.get_call_stack():
+            if callinfo['elided']:
+                log("     (%d frames elided by tail calls)" % callinfo['elided'])
             log(fmt.format(**callinfo))
 
     def debug_cmd_run(self, args):
@@ -411,6 +450,8 @@ class ConsoleMufDebugger(object):
         log("show breakpoints   Show current breakpoints.")
         log("show functions     List all declared functions.")
         log("show globals       List all global vars.")
+        log("show memo          Show memo cache stats for pure functions.")
+        log("show processes     List processes and their run queue waits.")
         log("show vars          List all vars in the current func.")
         log("step [COUNT]       Step 1 or COUNT lines, enters calls.")
         log("next [COUNT]       Step 1 or COUNT lines, skips calls.")
@@ -509,6 +550,19 @@ class MufConsole(object):
                             action="store_true")
         parser.add_argument("-T", "--target", choices=['fb6', 'fb7'], default="fb6",
                             help="Target MUF variant. Currently one of 'fb6' or 'fb7'.")
+        parser.add_argument("--engine", choices=['dispatch', 'classic', 'jit'], default="dispatch",
+                            help="Execution engine. 'classic' is the original per-instruction "
+                                 "lookup loop. 'jit' compiles hot functions to python.")
+        parser.add_argument("-O", "--optimize", type=int, nargs='?', const=1, default=0,
+                            metavar="LEVEL",
+                            help="Optimization level. 1 folds constants, threads jumps and removes dead code; "
+                                 "2 also inlines small functions and fuses.")
+        parser.add_argument("--fuse",
+                            help="Fuse common instruction sequences into superinstructions.",
+                            action="store_true")
+        parser.add_argument("--warn-stack",
+                            help="Warn about stack underflows that can be proven at compile time.",
+                            action="store_true")
         parser.add_argument("-t", "--trace",
                             help="Show stacktrace for each instrution.",
                             action="store_true")
@@ -566,6 +620,7 @@ class MufConsole(object):
             self.opts.command
         )
         fr.set_trace(self.opts.trace)
+        fr.set_engine(self.opts.engine)
         fr.set_text_entry(self.opts.textentry)
         dbg = ConsoleMufDebugger(fr)
         if self.opts.debug:
@@ -613,7 +668,12 @@ class MufConsole(object):
                 progobj = db.get_registered_obj(userobj, "$cmd/test")
             progobj.sources = srcs
             self.header("Compiling MUF Program %s" % progobj)
-            cmplr = MufCompiler(target=self.opts.target)
+            cmplr = MufCompiler(
+                target=self.opts.target,
+                fuse=self.opts.fuse,
+                optimize=self.opts.optimize,
+                warn_stack=self.opts.warn_stack,
+            )
             success = cmplr.compile_source(progobj.dbref)
             log("")
             if not success:
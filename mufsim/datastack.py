@@ -0,0 +1,121 @@
+import mufsim.stackitems as si
+from mufsim.errors import MufRuntimeError
+
+
+type_names = [
+    ("number", [int, float]),
+    ("integer", [int]),
+    ("float", [float]),
+    ("string", [str]),
+    ("list array", [si.MufList]),
+    ("dictionary array", [si.MufDict]),
+    ("dbref", [si.DBRef]),
+    ("array", [si.MufList, si.MufDict]),
+    ("address", [si.Address]),
+    ("lock", [si.Lock]),
+    ("variable", [si.GlobalVar, si.FuncVar]),
+    ("variable", [si.GlobalVar]),
+    ("variable", [si.FuncVar]),
+]
+
+
+def expected_type_error(types, isarray=False, argnum=0):
+    types = list(types)
+    expected = []
+    for name, extypes in type_names:
+        if all(extype in types for extype in extypes):
+            for extype in extypes:
+                types.remove(extype)
+            expected.append(name)
+    expected = " or ".join(expected)
+    arrstr = "array of " if isarray else ""
+    argstr = " ({0})".format(argnum) if argnum else ""
+    msg = "Expected {0}{1} argument.{2}".format(arrstr, expected, argstr)
+    return MufRuntimeError(msg)
+
+
+# The data stack.  Items below the lock level belong to an enclosing TRY
+# block, and can't be popped until that block exits.  The lock level is
+# kept up to date by the process as TRY blocks are entered and left.
+class MufDataStack(list):
+    def __init__(self, items=()):
+        super(MufDataStack, self).__init__(items)
+        self.lock = 0
+
+    def fork(self, memo):
+        stk = MufDataStack(si.fork_copy(x, memo) for x in self)
+        stk.lock = self.lock
+        return stk
+
+    def depth(self):
+        return len(self) - self.lock
+
+    def check_underflow(self, cnt):
+        if len(self) - self.lock < cnt:
+            raise MufRuntimeError("Stack underflow.")
+
+    def truncate(self):
+        # Drops everything above the lock level.
+        del self[self.lock:]
+
+    def pop_any(self):
+        if len(self) <= self.lock:
+            raise MufRuntimeError("Stack underflow.")
+        return self.pop()
+
+    def pop_typed(self, types):
+        if len(self) <= self.lock:
+            raise MufRuntimeError("Stack underflow.")
+        if type(self[-1]) not in types:
+            raise expected_type_error(types)
+        return self.pop()
+
+    def pop_int(self):
+        if len(self) <= self.lock:
+            raise MufRuntimeError("Stack underflow.")
+        if type(self[-1]) is not int:
+            raise MufRuntimeError("Expected integer argument.")
+        return self.pop()
+
+    def pop_str(self):
+        if len(self) <= self.lock:
+            raise MufRuntimeError("Stack underflow.")
+        if type(self[-1]) is not str:
+            raise MufRuntimeError("Expected string argument.")
+        return self.pop()
+
+    def pop_dbref(self):
+        if len(self) <= self.lock:
+            raise MufRuntimeError("Stack underflow.")
+        if type(self[-1]) is not si.DBRef:
+            raise MufRuntimeError("Expected dbref argument.")
+        return self.pop()
+
+    def pop_many(self, cnt):
+        # Returns the top cnt items, deepest first.
+        if cnt <= 0:
+            return []
+        if len(self) - self.lock < cnt:
+            raise MufRuntimeError("Stack underflow.")
+        items = self[-cnt:]
+        del self[-cnt:]
+        return items
+
+    def pop2(self):
+        # Returns the top two items, deepest first.
+        if len(self) - self.lock < 2:
+            raise MufRuntimeError("Stack underflow.")
+        a, b = self[-2:]
+        del self[-2:]
+        return a, b
+
+    def pop3(self):
+        # Returns the top three items, deepest first.
+        if len(self) - self.lock < 3:
+            raise MufRuntimeError("Stack underflow.")
+        a, b, c = self[-3:]
+        del self[-3:]
+        return a, b, c
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
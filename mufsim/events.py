@@ -1,38 +1,110 @@
-from collections import namedtuple
+from collections import namedtuple, deque
+
+import mufsim.utils as util
 
 
 MufEvent = namedtuple('Event', ['name', 'data'])
 
 
+# Matches event names against EVENT_WAITFOR patterns.  An empty pattern
+# list matches every event.  Results are remembered by event name, since
+# a process usually sees the same few event names over and over.
+class MufEventMatcher(object):
+    MAX_NAMES = 256
+
+    def __init__(self, pats):
+        self.pats = [util.smatch_compile(pat) for pat in pats]
+        self.pats = [rx for rx in self.pats if rx is not None]
+        self.match_all = not pats
+        self.results = {}
+
+    def __call__(self, name):
+        res = self.results.get(name)
+        if res is None:
+            res = self.match_all or any(rx.search(name) for rx in self.pats)
+            if len(self.results) >= self.MAX_NAMES:
+                self.results.clear()
+            self.results[name] = res
+        return res
+
+
+# A process's mailbox.  Holds at most MAX_EVENTS events.  When it's full,
+# either the oldest event is dropped to make room for the new one, or the
+# new one is dropped, depending on the overflow policy.  Event counts are
+# kept by name, so lookups only scan the events if a name matches.
 class MufEventQueue(object):
+    MAX_EVENTS = 1024
+    OVERFLOW_DROP_OLDEST = 'oldest'
+    OVERFLOW_DROP_NEWEST = 'newest'
+
     def __init__(self):
-        self.events = []
+        self.events = deque()
+        self.names = {}
+        self.overflow = self.OVERFLOW_DROP_OLDEST
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def _forget(self, event):
+        cnt = self.names[event.name] - 1
+        if cnt:
+            self.names[event.name] = cnt
+        else:
+            del self.names[event.name]
 
     def add_event(self, eventname, eventdata):
+        # Returns the event, or None if it was dropped.
+        if len(self.events) >= self.MAX_EVENTS:
+            self.dropped += 1
+            if self.overflow == self.OVERFLOW_DROP_NEWEST:
+                return None
+            self._forget(self.events.popleft())
         event = MufEvent(name=eventname, data=eventdata)
         self.events.append(event)
+        self.names[eventname] = self.names.get(eventname, 0) + 1
+        return event
+
+    def remove_event(self, event):
+        self.events.remove(event)
+        self._forget(event)
 
     def find_event(self, eventnames):
-        for idx, event in enumerate(self.events):
+        if not any(name in self.names for name in eventnames):
+            return None
+        for event in self.events:
             if event.name in eventnames:
                 return event
         return None
 
+    def find_match(self, match):
+        # Returns the oldest event whose name satisfies match, or None.
+        names = [name for name in self.names if match(name)]
+        if not names:
+            return None
+        return self.find_event(set(names))
+
     def add_singleton_event(self, eventname, eventdata, replace=True):
         event = self.find_event([eventname])
         if event is None:
             self.add_event(eventname, eventdata)
-        if replace:
-            event.data = eventdata
+        elif replace:
+            idx = self.events.index(event)
+            self.events[idx] = event._replace(data=eventdata)
 
     def count(self, pat):
         if pat == '*':
             return len(self.events)
-        cnt = 0
-        for event in self.events:
-            if util.smatch(pat, event.name):
-                cnt += 1
-        return cnt
+        rx = util.smatch_compile(pat)
+        if rx is None:
+            return 0
+        return sum(
+            cnt for name, cnt in self.names.items()
+            if rx.search(name)
+        )
 
 
 # vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -14,6 +14,10 @@ objects_db = {}
 db_top = 0
 recycled_list = []
 
+# Bumped whenever any program's compiled code is replaced, so anything
+# that caches compiled addresses can tell when it's out of date.
+compile_generation = 0
+
 
 class InvalidObjectError(Exception):
     pass
@@ -72,6 +76,16 @@ class DBObject(object):
         self.name = newname
         return True
 
+    @property
+    def compiled(self):
+        return self._compiled
+
+    @compiled.setter
+    def compiled(self, comp):
+        global compile_generation
+        compile_generation += 1
+        self._compiled = comp
+
     def mark_modify(self):
         self.ts_modified = int(time.time())
 
@@ -1041,7 +1041,6 @@ class MufGui(object):
 
     def compile_program(self, prog):
         self.clear_errors()
-        process_list.killall(prog)
         progobj = db.getobj(prog)
         progobj.compiled = None
         self.cons_disp.delete('0.0', END)
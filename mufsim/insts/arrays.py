@@ -1,7 +1,6 @@
 import re
 import copy
 import random
-from functools import cmp_to_key
 
 import mufsim.utils as util
 import mufsim.gamedb as db
@@ -13,7 +12,7 @@ from mufsim.insts.base import Instruction, instr
 @instr("array_default_pinning")
 class InstArrayDefaultPinning(Instruction):
     def execute(self, fr):
-        pin = fr.data_pop(int)
+        pin = fr.data_pop_int()
         fr.array_pinning = bool(pin)
 
 
@@ -36,18 +35,15 @@ class InstArrayPin(Instruction):
 @instr("array_make")
 class InstArrayMake(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
-        fr.check_underflow(num)
-        arr = []
-        for i in range(num):
-            arr.insert(0, fr.data_pop())
+        num = fr.data_pop_int()
+        arr = fr.data_pop_many(num)
         fr.data_push_list(arr)
 
 
 @instr("array_make_dict")
 class InstArrayMakeDict(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
+        num = fr.data_pop_int()
         fr.check_underflow(num * 2)
         d = {}
         for i in range(num):
@@ -69,6 +65,15 @@ class InstArrayCompare(Instruction):
     def execute(self, fr):
         arr2 = fr.data_pop_array()
         arr1 = fr.data_pop_array()
+        if (
+            isinstance(arr1, si.MufList) and arr1.is_numeric() and
+            isinstance(arr2, si.MufList) and arr2.is_numeric()
+        ):
+            # Longer lists sort after shorter ones, as with dictionaries.
+            a = (len(arr1), arr1)
+            b = (len(arr2), arr2)
+            fr.data_push((a > b) - (a < b))
+            return
         fr.data_push(util.compare_dicts(arr1, arr2))
 
 
@@ -78,18 +83,7 @@ class InstArrayGetItem(Instruction):
         fr.check_underflow(2)
         key = fr.data_pop()
         arr = fr.data_pop_array()
-        if isinstance(arr, si.MufList):
-            if not isinstance(key, int):
-                fr.data_push(0)
-            elif key < 0 or key >= len(arr):
-                fr.data_push(0)
-            else:
-                fr.data_push(arr[key])
-        elif isinstance(arr, si.MufDict):
-            if key in arr:
-                fr.data_push(arr[key])
-            else:
-                fr.data_push(0)
+        fr.data_push(arr.get(key, 0))
 
 
 @instr("array_setitem")
@@ -153,8 +147,14 @@ class InstArrayExtract(Instruction):
         fr.check_underflow(2)
         keys = fr.data_pop_list()
         arr = fr.data_pop_array()
-        arrkeys = arr.keys()
-        out = {key: arr[key] for key in keys if key in arrkeys}
+        if isinstance(arr, si.MufList):
+            cnt = len(arr)
+            out = {
+                key: arr[key] for key in keys
+                if isinstance(key, int) and 0 <= key < cnt
+            }
+        else:
+            out = {key: arr[key] for key in keys if key in arr}
         fr.data_push_dict(out)
 
 
@@ -162,10 +162,15 @@ class InstArrayExtract(Instruction):
 class InstArrayGetRange(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        end = fr.data_pop(int)
-        st = fr.data_pop(int)
-        arr = fr.data_pop_list()
-        fr.data_push_list(arr[st:end + 1])
+        end = fr.data_pop(int, str)
+        st = fr.data_pop(int, str)
+        arr = fr.data_pop_array()
+        if isinstance(arr, si.MufDict):
+            fr.data_push(arr.get_range(st, end))
+            return
+        if not isinstance(st, int) or not isinstance(end, int):
+            raise MufRuntimeError("List array expects integer index.")
+        fr.data_push_list(arr.range_view(st, end + 1))
 
 
 @instr("array_setrange")
@@ -173,7 +178,7 @@ class InstArraySetRange(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         items = fr.data_pop_list()
-        st = fr.data_pop(int)
+        st = fr.data_pop_int()
         arr = fr.data_pop_list()
         arr = arr.set_item(slice(st, st+len(items)), list(items))
         fr.data_push(arr)
@@ -183,8 +188,8 @@ class InstArraySetRange(Instruction):
 class InstArrayDelRange(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        end = fr.data_pop(int)
-        st = fr.data_pop(int)
+        end = fr.data_pop_int()
+        st = fr.data_pop_int()
         arr = fr.data_pop_list()
         if end >= len(arr):
             end = len(arr) - 1
@@ -197,7 +202,7 @@ class InstArrayInsertRange(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         items = fr.data_pop_list()
-        st = fr.data_pop(int)
+        st = fr.data_pop_int()
         arr = fr.data_pop_list()
         if st < 0 or st > len(arr):
             raise MufRuntimeError("Index outside array bounds. (2)")
@@ -237,14 +242,14 @@ class InstArrayNestedSet(Instruction):
             if isinstance(arr, si.MufList):
                 if not isinstance(key, int):
                     raise MufRuntimeError("List array expects integer index.")
-                if key < 0 or key > len(subarr):
+                if key < 0 or key > len(arr):
                     raise MufRuntimeError("Index out of list array bounds.")
             elif not isinstance(key, (int, str)):
                 raise MufRuntimeError("Dictionary array expects integer or string index.")
             stack.append( (key, arr) )
             try:
                 arr = arr[key]
-            except (TypeError, KeyError) as e:
+            except (TypeError, KeyError, IndexError) as e:
                 arr = si.MufDict({}, fr.array_pinning)
         for key, arr in reversed(stack):
             val = arr.set_item(key, val)
@@ -265,14 +270,14 @@ class InstArrayNestedDel(Instruction):
             if isinstance(arr, si.MufList):
                 if not isinstance(key, int):
                     raise MufRuntimeError("List array expects integer index.")
-                if key < 0 or key > len(subarr):
+                if key < 0 or key > len(arr):
                     raise MufRuntimeError("Index out of list array bounds.")
             elif not isinstance(key, (int, str)):
                 raise MufRuntimeError("Dictionary array expects integer or string index.")
             stack.append( (key, arr) )
             try:
                 arr = arr[key]
-            except (TypeError, KeyError) as e:
+            except (TypeError, KeyError, IndexError) as e:
                 fr.data_push(oarr)
                 return
         val = None
@@ -288,12 +293,7 @@ class InstArrayNestedDel(Instruction):
 class InstArrayKeys(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        keys = sorted(
-            list(arr.keys()),
-            key=cmp_to_key(si.sortcomp),
-        )
-        for key in keys:
-            fr.data_push(key)
+        fr.data_push_many(arr.keys())
         fr.data_push(len(arr))
 
 
@@ -301,12 +301,7 @@ class InstArrayKeys(Instruction):
 class InstArrayVals(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        keys = sorted(
-            list(arr.keys()),
-            key=cmp_to_key(si.sortcomp),
-        )
-        for key in keys:
-            fr.data_push(arr[key])
+        fr.data_push_many(arr.values())
         fr.data_push(len(arr))
 
 
@@ -314,13 +309,9 @@ class InstArrayVals(Instruction):
 class InstArrayExplode(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        keys = sorted(
-            list(arr.keys()),
-            key=cmp_to_key(si.sortcomp),
+        fr.data_push_many(
+            item for pair in arr.items() for item in pair
         )
-        for key in keys:
-            fr.data_push(key)
-            fr.data_push(arr[key])
         fr.data_push(len(arr))
 
 
@@ -328,7 +319,7 @@ class InstArrayExplode(Instruction):
 class InstArrayJoin(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        delim = fr.data_pop(str)
+        delim = fr.data_pop_str()
         arr = fr.data_pop_list()
         out = ""
         for val in arr:
@@ -355,15 +346,18 @@ class InstArrayFindVal(Instruction):
         fr.check_underflow(2)
         val = fr.data_pop()
         arr = fr.data_pop_array()
-        out = [k for k in arr.keys() if arr[k] == val]
-        fr.data_push(out)
+        if isinstance(arr, si.MufList):
+            out = arr.find_keys(val)
+        else:
+            out = [k for k in arr.keys() if arr[k] == val]
+        fr.data_push_list(out)
 
 
 @instr("array_matchkey")
 class InstArrayMatchKey(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        pat = fr.data_pop(str)
+        pat = fr.data_pop_str()
         arr = fr.data_pop_array()
         out = {k: arr[k] for k in arr.keys() if isinstance(k, str) and util.smatch(pat, k)}
         fr.data_push(out)
@@ -373,7 +367,7 @@ class InstArrayMatchKey(Instruction):
 class InstArrayMatchVal(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        pat = fr.data_pop(str)
+        pat = fr.data_pop_str()
         arr = fr.data_pop_array()
         out = {k: arr[k] for k in arr.keys() if isinstance(arr[k], str) and util.smatch(pat, arr[k])}
         fr.data_push(out)
@@ -387,22 +381,15 @@ class InstArrayCut(Instruction):
         arr = fr.data_pop_array()
         if isinstance(arr, si.MufList):
             if isinstance(pos, str):
-                fr.data_push_list(arr[:])
+                fr.data_push_list(arr.value)
                 fr.data_push_list([])
             else:
-                fr.data_push_list(arr[:pos])
-                fr.data_push_list(arr[pos:])
+                fr.data_push_list(arr.range_view(0, pos))
+                fr.data_push_list(arr.range_view(pos, len(arr)))
         else:
-            out1 = {}
-            out2 = {}
-            for k in arr.keys():
-                v = arr[k]
-                if si.sortcomp(k, pos) < 0:
-                    out1[k] = v
-                else:
-                    out2[k] = v
-            fr.data_push_dict(out1)
-            fr.data_push_dict(out2)
+            before, after = arr.split(pos)
+            fr.data_push(before)
+            fr.data_push(after)
 
 
 @instr("array_excludeval")
@@ -411,34 +398,40 @@ class InstArrayExcludeVal(Instruction):
         fr.check_underflow(2)
         val = fr.data_pop()
         arr = fr.data_pop_array()
-        out = [k for k in arr.keys() if arr[k] != val]
-        fr.data_push(out)
+        if isinstance(arr, si.MufList):
+            out = arr.find_keys(val, invert=True)
+        else:
+            out = [k for k in arr.keys() if arr[k] != val]
+        fr.data_push_list(out)
 
 
 @instr("array_reverse")
 class InstArrayReverse(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_list()
-        out = [x for x in reversed(arr)]
-        fr.data_push_list(arr)
+        fr.data_push_list(arr.value.reversed())
 
 
 @instr("array_sort")
 class InstArraySort(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        flags = fr.data_pop(int)
-        arr = fr.data_pop_list()[:]
+        flags = fr.data_pop_int()
+        arr = fr.data_pop_list()
         nocase = flags & 1 != 0
         dorev = flags & 2 != 0
         doshuffle = flags & 4 != 0
+        if arr.is_numeric() and not doshuffle:
+            fr.data_push_list(arr.value.sorted(reverse=dorev))
+            return
+        arr = arr[:]
         if doshuffle:
             for i in range(7):
                 random.shuffle(arr)
         elif nocase:
-            arr = sorted(arr, key=cmp_to_key(si.sortcompi), reverse=dorev)
+            arr = sorted(arr, key=si.sort_keyi, reverse=dorev)
         else:
-            arr = sorted(arr, key=cmp_to_key(si.sortcomp), reverse=dorev)
+            arr = sorted(arr, key=si.sort_key, reverse=dorev)
         fr.data_push_list(arr)
 
 
@@ -447,7 +440,7 @@ class InstArraySortIndexed(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         idx = fr.data_pop(int, str)
-        flags = fr.data_pop(int)
+        flags = fr.data_pop_int()
         arr = fr.data_pop_list()[:]
         nocase = flags & 1 != 0
         dorev = flags & 2 != 0
@@ -457,54 +450,68 @@ class InstArraySortIndexed(Instruction):
         elif nocase:
             arr = sorted(
                 arr, reverse=dorev,
-                key=cmp_to_key(lambda x, y: si.sortcompi(x[idx], y[idx])),
+                key=lambda x: si.sort_keyi(x[idx]),
             )
         else:
             arr = sorted(
                 arr, reverse=dorev,
-                key=cmp_to_key(lambda x, y: si.sortcomp(x[idx], y[idx])),
+                key=lambda x: si.sort_key(x[idx]),
             )
         fr.data_push_list(arr)
 
 
+def pop_number_list(fr):
+    arr = fr.data_pop_list()
+    if not arr.is_numeric():
+        fr.check_list_type(arr, (int, float), argnum=1)
+    return arr
+
+
+@instr("array_sum")
+class InstArraySum(Instruction):
+    def execute(self, fr):
+        arr = pop_number_list(fr)
+        fr.data_push(sum(arr))
+
+
+@instr("array_min")
+class InstArrayMin(Instruction):
+    def execute(self, fr):
+        arr = pop_number_list(fr)
+        if not len(arr):
+            raise MufRuntimeError("Array is empty.")
+        fr.data_push(min(arr))
+
+
+@instr("array_max")
+class InstArrayMax(Instruction):
+    def execute(self, fr):
+        arr = pop_number_list(fr)
+        if not len(arr):
+            raise MufRuntimeError("Array is empty.")
+        fr.data_push(max(arr))
+
+
+def push_found_key(fr, key):
+    # Pushes the key and 1, or 0 and 0 if no key was found.
+    if key is None:
+        fr.data_push_many([0, 0])
+    else:
+        fr.data_push_many([key, 1])
+
+
 @instr("array_first")
 class InstArrayFirst(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        if not arr:
-            fr.data_push(0)
-            fr.data_push(0)
-        elif isinstance(arr, si.MufList):
-            fr.data_push(0)
-            fr.data_push(1)
-        else:
-            keys = sorted(
-                list(arr.keys()),
-                key=cmp_to_key(si.sortcomp),
-                reverse=False
-            )
-            fr.data_push(keys[0])
-            fr.data_push(1)
+        push_found_key(fr, arr.first_key())
 
 
 @instr("array_last")
 class InstArrayLast(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        if not arr:
-            fr.data_push(0)
-            fr.data_push(0)
-        elif isinstance(arr, si.MufList):
-            fr.data_push(len(arr) - 1)
-            fr.data_push(1)
-        else:
-            keys = sorted(
-                list(arr.keys()),
-                key=cmp_to_key(si.sortcomp),
-                reverse=True
-            )
-            fr.data_push(keys[0])
-            fr.data_push(1)
+        push_found_key(fr, arr.last_key())
 
 
 @instr("array_prev")
@@ -513,18 +520,7 @@ class InstArrayPrev(Instruction):
         fr.check_underflow(2)
         idx = fr.data_pop(int, str)
         arr = fr.data_pop_array()
-        if not arr:
-            fr.data_push(0)
-            fr.data_push(0)
-            return
-        keys = [k for k in arr.keys() if si.sortcomp(k, idx) < 0]
-        keys = sorted(keys, key=cmp_to_key(si.sortcomp), reverse=True)
-        if keys:
-            fr.data_push(keys[0])
-            fr.data_push(1)
-        else:
-            fr.data_push(0)
-            fr.data_push(0)
+        push_found_key(fr, arr.prev_key(idx))
 
 
 @instr("array_next")
@@ -533,18 +529,7 @@ class InstArrayNext(Instruction):
         fr.check_underflow(2)
         idx = fr.data_pop(int, str)
         arr = fr.data_pop_array()
-        if not arr:
-            fr.data_push(0)
-            fr.data_push(0)
-            return
-        keys = [k for k in arr.keys() if si.sortcomp(k, idx) > 0]
-        keys = sorted(keys, key=cmp_to_key(si.sortcomp))
-        if keys:
-            fr.data_push(keys[0])
-            fr.data_push(1)
-        else:
-            fr.data_push(0)
-            fr.data_push(0)
+        push_found_key(fr, arr.next_key(idx))
 
 
 @instr("array_fmtstrings")
@@ -583,7 +568,7 @@ class InstArrayFmtStrings(Instruction):
             fmt = fmt + ftyp
             return fmt % val
 
-        fmt = fr.data_pop(str)
+        fmt = fr.data_pop_str()
         arr = fr.data_pop_list()
         fr.check_list_type(arr, (si.MufDict), argnum=1)
         outarr = []
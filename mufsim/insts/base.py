@@ -13,12 +13,22 @@ def instr(inst_name):
 class Instruction(object):
     prim_name = None
 
+    # Set by the stack effect analysis when the arguments are known to be
+    # on the stack with usable types, so execute_fast can skip the checks.
+    proven = False
+    execute_fast = None
+
     def __init__(self, line):
         self.line = line
 
     def execute(self, fr):
         pass
 
+    def lower(self, comp):
+        if self.proven and self.execute_fast:
+            return self.execute_fast
+        return self.execute
+
     def compile(self, cmplr, code, src):
         cls = type(self)
         inst = cls(self.line)
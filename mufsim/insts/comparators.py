@@ -6,27 +6,21 @@ from mufsim.insts.base import Instruction, instr
 @instr("or")
 class InstOr(Instruction):
     def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop()
-        a = fr.data_pop()
+        a, b = fr.data_pop2()
         fr.data_push(1 if a or b else 0)
 
 
 @instr("xor")
 class InstXor(Instruction):
     def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop()
-        a = fr.data_pop()
+        a, b = fr.data_pop2()
         fr.data_push(1 if (a and not b) or (not a and b) else 0)
 
 
 @instr("and")
 class InstAnd(Instruction):
     def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop()
-        a = fr.data_pop()
+        a, b = fr.data_pop2()
         fr.data_push(1 if a and b else 0)
 
 
@@ -40,100 +34,90 @@ class InstNot(Instruction):
             fr.data_push(1 if not a else 0)
 
 
-@instr("=")
-class InstEquals(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, str, si.DBRef)
-        a = fr.data_pop(int, float, str, si.DBRef)
-        if isinstance(a, str) and not isinstance(b, str):
-            raise MufRuntimeError("Strings can only compare to strings!")
+class InstComparator(Instruction):
+    arg_types = (int, float, si.DBRef)
+
+    def compare(self, a, b):
+        return False
+
+    def test(self, a, b):
         if isinstance(a, si.DBRef):
             a = a.value
         if isinstance(b, si.DBRef):
             b = b.value
-        fr.data_push(1 if a == b else 0)
+        return self.compare(a, b)
 
-    def __str__(self):
-        return "="
-
-@instr("!=")
-class InstNotEquals(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(int, float, str, si.DBRef)
-        a = fr.data_pop(int, float, str, si.DBRef)
+        b = fr.data_pop(*self.arg_types)
+        a = fr.data_pop(*self.arg_types)
+        fr.data_push(1 if self.test(a, b) else 0)
+
+    def execute_fast(self, fr):
+        stk = fr.data_stack
+        b = stk.pop()
+        a = stk.pop()
+        stk.append(1 if self.test(a, b) else 0)
+
+
+class InstEqualityComparator(InstComparator):
+    arg_types = (int, float, str, si.DBRef)
+
+    def test(self, a, b):
         if isinstance(a, str) and not isinstance(b, str):
             raise MufRuntimeError("Strings can only compare to strings!")
-        if isinstance(a, si.DBRef):
-            a = a.value
-        if isinstance(b, si.DBRef):
-            b = b.value
-        fr.data_push(1 if a != b else 0)
+        return super(InstEqualityComparator, self).test(a, b)
+
+
+@instr("=")
+class InstEquals(InstEqualityComparator):
+    def compare(self, a, b):
+        return a == b
+
+    def __str__(self):
+        return "="
+
+
+@instr("!=")
+class InstNotEquals(InstEqualityComparator):
+    def compare(self, a, b):
+        return a != b
 
     def __str__(self):
         return "="
 
 
 @instr("<")
-class InstLessThan(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, si.DBRef)
-        a = fr.data_pop(int, float, si.DBRef)
-        if isinstance(a, si.DBRef):
-            a = a.value
-        if isinstance(b, si.DBRef):
-            b = b.value
-        fr.data_push(1 if a < b else 0)
+class InstLessThan(InstComparator):
+    def compare(self, a, b):
+        return a < b
 
     def __str__(self):
         return "<"
 
 
 @instr("<=")
-class InstLessThanOrEquals(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, si.DBRef)
-        a = fr.data_pop(int, float, si.DBRef)
-        if isinstance(a, si.DBRef):
-            a = a.value
-        if isinstance(b, si.DBRef):
-            b = b.value
-        fr.data_push(1 if a <= b else 0)
+class InstLessThanOrEquals(InstComparator):
+    def compare(self, a, b):
+        return a <= b
 
     def __str__(self):
         return "<="
 
 
 @instr(">")
-class InstGreaterThan(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, si.DBRef)
-        a = fr.data_pop(int, float, si.DBRef)
-        if isinstance(a, si.DBRef):
-            a = a.value
-        if isinstance(b, si.DBRef):
-            b = b.value
-        fr.data_push(1 if a > b else 0)
+class InstGreaterThan(InstComparator):
+    def compare(self, a, b):
+        return a > b
 
     def __str__(self):
         return ">"
 
 
 @instr(">=")
-class InstGreaterThanOrEquals(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, si.DBRef)
-        a = fr.data_pop(int, float, si.DBRef)
-        if isinstance(a, si.DBRef):
-            a = a.value
-        if isinstance(b, si.DBRef):
-            b = b.value
-        fr.data_push(1 if a >= b else 0)
+class InstGreaterThanOrEquals(InstComparator):
+    def compare(self, a, b):
+        return a >= b
 
     def __str__(self):
         return ">="
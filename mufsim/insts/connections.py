@@ -17,8 +17,7 @@ class InstAwakeP(Instruction):
 class InstOnline(Instruction):
     def execute(self, fr):
         users = netifc.get_users_online()
-        for who in users:
-            fr.data_push(who)
+        fr.data_push_many(users)
         fr.data_push(len(users))
 
 
@@ -37,7 +36,7 @@ class InstConCount(Instruction):
 @instr("condbref")
 class InstConDBRef(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         fr.data_push(si.DBRef(netifc.descr_dbref(descr)))
 
@@ -45,7 +44,7 @@ class InstConDBRef(Instruction):
 @instr("contime")
 class InstConTime(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             fr.data_push(netifc.descr_time(descr))
@@ -56,7 +55,7 @@ class InstConTime(Instruction):
 @instr("conidle")
 class InstConIdle(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             fr.data_push(netifc.descr_idle(descr))
@@ -67,7 +66,7 @@ class InstConIdle(Instruction):
 @instr("conhost")
 class InstConHost(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             fr.data_push(netifc.descr_host(descr))
@@ -78,7 +77,7 @@ class InstConHost(Instruction):
 @instr("conuser")
 class InstConUser(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             who = netifc.descr_user(descr)
@@ -90,7 +89,7 @@ class InstConUser(Instruction):
 @instr("conboot")
 class InstConBoot(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             who = netifc.descr_dbref(descr)
@@ -102,8 +101,8 @@ class InstConBoot(Instruction):
 class InstConNotify(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
-        con = fr.data_pop(int)
+        msg = fr.data_pop_str()
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         if descr >= 0:
             who = netifc.descr_dbref(descr)
@@ -114,7 +113,7 @@ class InstConNotify(Instruction):
 @instr("condescr")
 class InstConDescr(Instruction):
     def execute(self, fr):
-        con = fr.data_pop(int)
+        con = fr.data_pop_int()
         descr = netifc.descr_from_con(con)
         fr.data_push(descr)
 
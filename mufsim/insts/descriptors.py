@@ -16,8 +16,7 @@ class InstDescriptors(Instruction):
             if db.getobj(who).objtype != "player":
                 raise MufRuntimeError("Expected #-1 or player dbref.")
             descrs = netifc.user_descrs(who.value)
-        for descr in descrs:
-            fr.data_push(descr)
+        fr.data_push_many(descrs)
         fr.data_push(len(descrs))
 
 
@@ -37,14 +36,14 @@ class InstDescrArray(Instruction):
 @instr("descrcon")
 class InstDescrCon(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(netifc.descr_con(descr))
 
 
 @instr("descrdbref")
 class InstDescrDBRef(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         ref = netifc.descr_dbref(descr)
         obj = si.DBRef(ref)
         fr.data_push(obj)
@@ -54,9 +53,9 @@ class InstDescrDBRef(Instruction):
 class InstDescrSetUser(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        pw = fr.data_pop(str)
+        pw = fr.data_pop_str()
         who = fr.data_pop_object()
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         if who.objtype != "player":
             raise MufRuntimeError("Expected player dbref.")
         was = netifc.descr_dbref(descr)
@@ -72,7 +71,7 @@ class InstDescrSetUser(Instruction):
 @instr("descrboot")
 class InstDescrBoot(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         who = netifc.descr_dbref(descr)
         if netifc.descr_disconnect(descr):
             log("BOOTED DESCRIPTOR %d: %s" % (descr, db.getobj(who)))
@@ -82,8 +81,8 @@ class InstDescrBoot(Instruction):
 class InstDescrNotify(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
-        descr = fr.data_pop(int)
+        msg = fr.data_pop_str()
+        descr = fr.data_pop_int()
         who = netifc.descr_dbref(descr)
         if netifc.is_descr_online(descr):
             log("NOTIFY TO DESCR %d, %s: %s" %
@@ -93,7 +92,7 @@ class InstDescrNotify(Instruction):
 @instr("descrflush")
 class InstDescrFlush(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         if descr == -1:
             netifc.flush_all_descrs()
             log("DESCRFLUSH ALL DESCRS.")
@@ -141,7 +140,7 @@ class InstLastDescr(Instruction):
 @instr("nextdescr")
 class InstNextDescr(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         descrs = netifc.get_descriptors()
         if descr in descrs:
             pos = descrs.index(descr) + 1
@@ -156,21 +155,21 @@ class InstNextDescr(Instruction):
 @instr("descrbufsize")
 class InstDescrBufSize(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(netifc.descr_bufsize(descr))
 
 
 @instr("descrsecure?")
 class InstDescrSecureP(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(1 if netifc.descr_secure(descr) else 0)
 
 
 @instr("descruser")
 class InstDescrUser(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         who = netifc.descr_user(descr)
         if who >= 0:
             fr.data_push(db.getobj(who).name)
@@ -181,21 +180,21 @@ class InstDescrUser(Instruction):
 @instr("descrhost")
 class InstDescrHost(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(netifc.descr_host(descr))
 
 
 @instr("descrtime")
 class InstDescrTime(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(int(netifc.descr_time(descr)))
 
 
 @instr("descridle")
 class InstDescrIdle(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         fr.data_push(int(netifc.descr_idle(descr)))
 
 
@@ -24,6 +24,23 @@ class InstDollarEcho(Instruction):
 class InstDollarPragma(Instruction):
     def compile(self, cmplr, code, src):
         val, src = cmplr.get_to_eol(src)
+        words = val.split()
+        if words and words[0].lower() == "optimize":
+            if len(words) < 2:
+                cmplr.optimize = 1
+            elif util.is_int(words[1]):
+                cmplr.optimize = int(words[1])
+            else:
+                raise MufCompileError("Bad optimization level: %s" % words[1])
+        elif words and words[0].lower() == "pure":
+            if len(words) < 2:
+                raise MufCompileError("Expected function name.")
+            argcount = None
+            if len(words) > 2:
+                if not util.is_int(words[2]) or int(words[2]) < 0:
+                    raise MufCompileError("Bad argument count: %s" % words[2])
+                argcount = int(words[2])
+            cmplr.compiled.declare_pure(words[1], argcount)
         return (False, src)
 
 
@@ -1,5 +1,6 @@
 from mufsim.errors import MufRuntimeError
 from mufsim.insts.base import Instruction, instr
+import mufsim.gamedb as db
 import mufsim.stackitems as si
 
 
@@ -12,7 +13,7 @@ class InstEventCount(Instruction):
 @instr("event_exists")
 class InstEventExists(Instruction):
     def execute(self, fr):
-        pat = fr.data_pop(str)
+        pat = fr.data_pop_str()
         fr.data_push(fr.events.count(pat))
 
 
@@ -20,21 +21,21 @@ class InstEventExists(Instruction):
 class InstEventSend(Instruction):
     def execute(self, fr):
         data = fr.data_pop()
-        name = fr.data_pop(str)
-        pid = fr.data_pop(int)
+        name = fr.data_pop_str()
+        pid = fr.data_pop_int()
         ofr = fr.lookup_process(pid)
         if not ofr:
             raise MufRuntimeError("No such Process.")
-        ofr.events.add_event(
-            "USER." + name[:32],
+        fr.send_event(
+            pid, "USER." + name[:32],
             si.MufDict(
                 dict(
                     data=data,
                     caller_pid=fr.pid,
                     caller_prog=fr.caller_get(),
-                    descr=fr.descr,
-                    trigger=si.DBRef(fr.trigger),
-                    player=si.DBRef(fr.user),
+                    descr=db.getobj(fr.user).descr,
+                    trigger=fr.trigger,
+                    player=fr.user,
                 ),
                 fr.array_pinning
             )
@@ -45,22 +46,22 @@ class InstEventSend(Instruction):
 class InstTimerStart(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        name = fr.data_pop(str)
-        secs = fr.data_pop(int)
+        name = fr.data_pop_str()
+        secs = fr.data_pop_int()
         fr.timer_start(secs, name)
 
 
 @instr("timer_stop")
 class InstTimerStop(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         fr.timer_stop(name)
 
 
 @instr("watchpid")
 class InstWatchPid(Instruction):
     def execute(self, fr):
-        pid = fr.data_pop(int)
+        pid = fr.data_pop_int()
         fr.watch_pid(pid)
 
 
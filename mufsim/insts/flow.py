@@ -16,9 +16,14 @@ class InstJmp(Instruction):
         super(InstJmp, self).__init__(line)
 
     def execute(self, fr):
-        addr = fr.curr_addr()
-        addr = si.Address(self.value - 1, addr.prog)
-        fr.pc_set(addr)
+        fr.call_stack[-1].pcnum = self.value - 1
+
+    def lower(self, comp):
+        target = self.value - 1
+
+        def jmp(fr):
+            fr.call_stack[-1].pcnum = target
+        return jmp
 
     def __str__(self):
         return "JMP: %d" % self.value
@@ -34,9 +39,15 @@ class InstJmpIfFalse(Instruction):
     def execute(self, fr):
         val = fr.data_pop()
         if not val:
-            addr = fr.curr_addr()
-            addr = si.Address(self.value - 1, addr.prog)
-            fr.pc_set(addr)
+            fr.call_stack[-1].pcnum = self.value - 1
+
+    def lower(self, comp):
+        target = self.value - 1
+
+        def jmp_if_false(fr):
+            if not fr.data_pop():
+                fr.call_stack[-1].pcnum = target
+        return jmp_if_false
 
     def __str__(self):
         return "JmpIfFalse: %d" % self.value
@@ -139,45 +150,98 @@ class InstWizCall(Instruction):
 class InstExecute(Instruction):
     def execute(self, fr):
         addr = fr.data_pop_address()
-        fr.call_push(addr, fr.caller_get())
-        fr.pc_advance(-1)
+        fr.call_function(addr, fr.caller_get())
+
+
+class InstTailExecute(InstExecute):
+    # An EXECUTE immediately followed by EXIT.  The current call frame
+    # is replaced instead of growing the call stack.
+    def execute(self, fr):
+        addr = fr.data_pop_address()
+        fr.call_function(addr, fr.caller_get(), tail=True)
+
+    def __str__(self):
+        return "TAILEXECUTE"
+
+
+class CallSiteCache(object):
+    # Remembers what address each (program, public) pair seen at one call
+    # site resolved to, or None if it can't be called.  Everything is
+    # forgotten when any program gets recompiled or uncompiled.  A call
+    # site only ever runs in its own program's version of the code, so
+    # calls back into that program always resolve the same way.
+    MAX_ENTRIES = 4
+
+    def __init__(self):
+        self.generation = db.compile_generation
+        self.entries = {}
+
+    def resolve(self, fr, obj, pub):
+        # Addresses come from the version of the program the call will
+        # run, which for a call into the caller's own program is the
+        # version the caller is running.
+        obj = db.getobj(obj)
+        if obj.objtype != "program":
+            return None
+        comp = fr.get_call_compiled(obj.dbref)
+        if not comp:
+            return None
+        if pub is None:
+            return comp.lastfunction
+        return comp.publics.get(pub)
+
+    def lookup(self, fr, obj, pub):
+        if self.generation != db.compile_generation:
+            self.generation = db.compile_generation
+            self.entries = {}
+        key = (obj.value, pub)
+        try:
+            return self.entries[key]
+        except KeyError:
+            pass
+        addr = self.resolve(fr, obj, pub)
+        if len(self.entries) < self.MAX_ENTRIES:
+            self.entries[key] = addr
+        return addr
 
 
 @instr("call")
 class InstCall(Instruction):
+    cache = None
+
     def execute(self, fr):
         saddr = fr.curr_addr()
         x = fr.data_pop(si.DBRef, str)
         if isinstance(x, str):
-            pub = x
+            pub = x or None
             obj = fr.data_pop_dbref()
         else:
             pub = None
             obj = x
-        obj = db.getobj(obj)
-        if obj.objtype != "program":
-            raise MufRuntimeError("Expected program object!")
-        if pub:
-            if pub not in obj.compiled.publics:
-                raise MufRuntimeError("Unrecognized public call.")
-            addr = obj.compiled.publics[pub]
-        else:
-            addr = obj.compiled.lastfunction
-        fr.call_push(addr, saddr.prog)
-        fr.pc_advance(-1)
+        if self.cache is None:
+            self.cache = CallSiteCache()
+        addr = self.cache.lookup(fr, obj, pub)
+        if addr is None:
+            obj = db.getobj(obj)
+            if obj.objtype != "program":
+                raise MufRuntimeError("Expected program object!")
+            if not obj.compiled:
+                raise MufRuntimeError("Program not compiled.")
+            raise MufRuntimeError("Unrecognized public call.")
+        fr.call_function(addr, saddr.prog)
 
 
 @instr("cancall?")
 class InstCanCallP(Instruction):
+    cache = None
+
     def execute(self, fr):
         fr.check_underflow(2)
-        pub = fr.data_pop(str)
-        obj = fr.data_pop_object()
-        if obj.compiled and obj.compiled.publics:
-            if pub in obj.compiled.publics:
-                fr.data_push(1)
-                return
-        fr.data_push(0)
+        pub = fr.data_pop_str()
+        obj = fr.data_pop_dbref()
+        if self.cache is None:
+            self.cache = CallSiteCache()
+        fr.data_push(0 if self.cache.lookup(fr, obj, pub) is None else 1)
 
 
 @instr("exit")
@@ -195,10 +259,9 @@ class InstTry(Instruction):
         super(InstTry, self).__init__(line)
 
     def execute(self, fr):
-        cnt = fr.data_pop(int)
-        stacklock = fr.data_depth() - cnt
-        addr = fr.curr_addr()
-        addr = si.Address(self.value, addr.prog)
+        cnt = fr.data_pop_int()
+        stacklock = fr.data_full_depth() - cnt
+        addr = si.Address(self.value, fr.call_stack[-1].prog)
         fr.catch_push(self.detailed, addr, stacklock)
 
     def compile(self, cmplr, code, src):
@@ -274,7 +337,7 @@ class InstEndCatch(Instruction):
 @instr("abort")
 class InstAbort(Instruction):
     def execute(self, fr):
-        msg = fr.data_pop(str)
+        msg = fr.data_pop_str()
         raise MufRuntimeError(msg)
 
 
@@ -338,80 +401,149 @@ class InstBegin(Instruction):
         return (False, src)
 
 
+# Loop state kept in the call frame's loop stack.  FOR loops keep
+# [next value, end, increment].  FOREACH loops keep [values, keys, index],
+# where keys is None for lists, which are walked by index.
+
+def for_next(fr, state):
+    cur, end, inc = state
+    if cur > end if inc > 0 else cur < end:
+        return False
+    state[0] = cur + inc
+    fr.data_push(cur)
+    return True
+
+
+def foreach_next(fr, state):
+    vals, keys, idx = state
+    if keys is None:
+        if idx >= len(vals):
+            return False
+        key = idx
+    else:
+        if idx >= len(keys):
+            return False
+        key = keys[idx]
+    state[2] = idx + 1
+    fr.data_push(key)
+    fr.data_push(vals[key])
+    return True
+
+
+def compile_loop_body(cmplr, code, src, loopinst, nextinst):
+    code.append(loopinst)
+    cmplr.stmt_stack.append(loopinst)
+    src = "__foriter__ while " + src
+    subcode, src = cmplr.compile_r(src)
+    cmplr.stmt_stack.pop()
+    bodylen = len(subcode)
+    body = []
+    for instnum, inst in enumerate(subcode):
+        if isinstance(inst, InstWhile):
+            inst = InstJmpIfFalse(inst.line, bodylen - instnum)
+        elif isinstance(inst, InstBreak):
+            inst = InstJmp(inst.line, bodylen - instnum)
+        elif isinstance(inst, InstContinue):
+            inst = InstJmp(inst.line, -instnum)
+        body.append(inst)
+    # The leading "__foriter__ while" pair becomes a single instruction
+    # that jumps to the loop end itself, so jumps back to the loop head
+    # move one closer.
+    nextinst.line = body[0].line
+    nextinst.value = bodylen - 1
+    code.append(nextinst)
+    for instnum, inst in enumerate(body[2:], 2):
+        if isinstance(inst, relative_jump_types) and instnum + inst.value == 0:
+            inst.value += 1
+        code.append(inst)
+    code.append(InstForPop(inst.line))
+    return (False, src)
+
+
+class InstForNext(Instruction):
+    # Pushes the next FOR loop value, or jumps out of the loop.
+    value = 0
+
+    def __init__(self, line, val=0):
+        self.value = val
+        super(InstForNext, self).__init__(line)
+
+    def execute(self, fr):
+        frame = fr.call_stack[-1]
+        if not for_next(fr, frame.loop_stack[-1][1]):
+            frame.pcnum = self.value - 1
+
+    def __str__(self):
+        return "ForNext: %d" % self.value
+
+
+class InstForeachNext(Instruction):
+    # Pushes the next FOREACH key and value, or jumps out of the loop.
+    value = 0
+
+    def __init__(self, line, val=0):
+        self.value = val
+        super(InstForeachNext, self).__init__(line)
+
+    def execute(self, fr):
+        frame = fr.call_stack[-1]
+        if not foreach_next(fr, frame.loop_stack[-1][1]):
+            frame.pcnum = self.value - 1
+
+    def __str__(self):
+        return "ForeachNext: %d" % self.value
+
+
 @instr("for")
 class InstFor(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        inc = fr.data_pop(int)
-        end = fr.data_pop(int)
-        start = fr.data_pop(int)
-        fr.loop_iter_push("for", iter(range(start, end + inc, inc)))
+        inc = fr.data_pop_int()
+        end = fr.data_pop_int()
+        start = fr.data_pop_int()
+        if inc == 0:
+            raise MufRuntimeError("FOR loop increment cannot be zero.")
+        fr.loop_iter_push("for", [start, end, inc])
 
     def compile(self, cmplr, code, src):
-        inst = InstFor(self.line)
-        code.append(inst)
-        cmplr.stmt_stack.append(inst)
-        src = "__foriter__ while " + src
-        subcode, src = cmplr.compile_r(src)
-        cmplr.stmt_stack.pop()
-        bodylen = len(subcode)
-        for instnum, inst in enumerate(subcode):
-            if isinstance(inst, InstWhile):
-                inst = InstJmpIfFalse(inst.line, bodylen - instnum)
-            elif isinstance(inst, InstBreak):
-                inst = InstJmp(inst.line, bodylen - instnum)
-            elif isinstance(inst, InstContinue):
-                inst = InstJmp(inst.line, -instnum)
-            code.append(inst)
-        code.append(InstForPop(inst.line))
-        return (False, src)
+        return compile_loop_body(
+            cmplr, code, src, InstFor(self.line), InstForNext(self.line)
+        )
 
 
 @instr("foreach")
 class InstForeach(Instruction):
     def execute(self, fr):
         arr = fr.data_pop_array()
-        arr = {k: arr[k] for k in arr.keys()}
-        fr.loop_iter_push("foreach", iter(arr.items()))
+        # Array contents are immutable, even for pinned arrays, so the
+        # loop can walk a snapshot of them without copying.
+        if isinstance(arr, si.MufList):
+            keys = None
+        else:
+            keys = arr.keys()
+        fr.loop_iter_push("foreach", [arr.value, keys, 0])
 
     def compile(self, cmplr, code, src):
-        inst = InstForeach(self.line)
-        code.append(inst)
-        cmplr.stmt_stack.append(inst)
-        src = "__foriter__ while " + src
-        subcode, src = cmplr.compile_r(src)
-        cmplr.stmt_stack.pop()
-        bodylen = len(subcode)
-        for instnum, inst in enumerate(subcode):
-            if isinstance(inst, InstWhile):
-                inst = InstJmpIfFalse(inst.line, bodylen - instnum)
-            elif isinstance(inst, InstBreak):
-                inst = InstJmp(inst.line, bodylen - instnum)
-            elif isinstance(inst, InstContinue):
-                inst = InstJmp(inst.line, -instnum)
-            code.append(inst)
-        code.append(InstForPop(inst.line))
-        return (False, src)
+        return compile_loop_body(
+            cmplr, code, src, InstForeach(self.line), InstForeachNext(self.line)
+        )
 
 
 @instr("__foriter__")
 class InstForIter(Instruction):
     def execute(self, fr):
-        typ, topiter = fr.loop_iter_top()
-        try:
-            if typ == "for":
-                v = next(topiter)
-                fr.data_push(v)
-                fr.data_push(1)
-            elif typ == "foreach":
-                k, v = next(topiter)
-                fr.data_push(k)
-                fr.data_push(v)
-                fr.data_push(1)
-            else:
-                fr.data_push(1)
-        except StopIteration:
-            fr.data_push(0)
+        typ, state = fr.loop_iter_top()
+        if typ == "for":
+            fr.data_push(1 if for_next(fr, state) else 0)
+        elif typ == "foreach":
+            fr.data_push(1 if foreach_next(fr, state) else 0)
+        else:
+            fr.data_push(1)
+
+
+relative_jump_types = (
+    InstJmp, InstJmpIfFalse, InstTry, InstForNext, InstForeachNext
+)
 
 
 @instr(" __forpop__")
@@ -531,14 +663,14 @@ class InstMode(Instruction):
 @instr("setmode")
 class InstSetMode(Instruction):
     def execute(self, fr):
-        mod = fr.data_pop(int)
+        mod = fr.data_pop_int()
         fr.execution_mode = mod
 
 
 @instr("sleep")
 class InstSleep(Instruction):
     def execute(self, fr):
-        secs = fr.data_pop(int)
+        secs = fr.data_pop_int()
         fr.pc_advance(1)
         fr.sleep(secs)
 
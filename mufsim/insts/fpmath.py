@@ -8,21 +8,21 @@ from mufsim.insts.base import Instruction, instr
 @instr("abs")
 class InstAbs(Instruction):
     def execute(self, fr):
-        a = fr.data_pop(int)
+        a = fr.data_pop_int()
         fr.data_push(abs(a))
 
 
 @instr("sign")
 class InstSign(Instruction):
     def execute(self, fr):
-        a = fr.data_pop(int)
+        a = fr.data_pop_int()
         fr.data_push((a > 0) - (a < 0))
 
 
 @instr("float")
 class InstFloat(Instruction):
     def execute(self, fr):
-        i = fr.data_pop(int)
+        i = fr.data_pop_int()
         fr.data_push(float(i))
 
 
@@ -69,7 +69,7 @@ class InstFToStrC(Instruction):
 @instr("strtof")
 class InstStrToF(Instruction):
     def execute(self, fr):
-        x = fr.data_pop(str)
+        x = fr.data_pop_str()
         try:
             x = float(x)
         except:
@@ -105,7 +105,7 @@ class InstFloor(Instruction):
 class InstRound(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(int)
+        b = fr.data_pop_int()
         a = fr.data_pop(float)
         fr.data_push(round(a, b))
 
@@ -392,7 +392,7 @@ class InstErrorP(Instruction):
 @instr("error_bit")
 class InstErrorBit(Instruction):
     def execute(self, fr):
-        errname = fr.data_pop(str)
+        errname = fr.data_pop_str()
         errnum = -1
         if errname in fr.fp_error_names:
             errnum = fr.fp_error_names.index(errname)
@@ -402,7 +402,7 @@ class InstErrorBit(Instruction):
 @instr("error_name")
 class InstErrorName(Instruction):
     def execute(self, fr):
-        errnum = fr.data_pop(int)
+        errnum = fr.data_pop_int()
         try:
             fr.data_push(fr.fp_error_names[errnum])
         except:
@@ -0,0 +1,179 @@
+from mufsim.insts.base import Instruction
+from mufsim.insts.flow import InstJmpIfFalse
+from mufsim.insts.comparators import InstComparator
+from mufsim.insts.stack import (
+    InstPushItem, InstGlobalVar, InstFuncVar, InstAt, InstBang, InstDup,
+    InstOver,
+)
+
+
+# Superinstructions replace the first instruction of a fused sequence.  The
+# original instructions are left in place after it, so addresses, jump
+# targets and breakpoints are unchanged; the fused instruction just skips
+# the pc over them once it has done their combined work.
+class InstFused(Instruction):
+    def __init__(self, line, addr, parts):
+        self.addr = addr
+        self.parts = parts
+        self.skip = len(parts) - 1
+        self.prim_name = parts[-1].prim_name
+        super(InstFused, self).__init__(line)
+
+    def __str__(self):
+        return "Fused %d-%d: %s" % (
+            self.addr, self.addr + self.skip,
+            ", ".join(str(part) for part in self.parts)
+        )
+
+
+class InstFusedFuncVarAt(InstFused):
+    def __init__(self, line, addr, parts):
+        super(InstFusedFuncVarAt, self).__init__(line, addr, parts)
+        self.varnum = parts[0].varnum
+
+    def execute(self, fr):
+        fr.data_push(fr.funcvar_get(self.varnum))
+        fr.call_stack[-1].pcnum += 1
+
+
+class InstFusedFuncVarBang(InstFused):
+    def __init__(self, line, addr, parts):
+        super(InstFusedFuncVarBang, self).__init__(line, addr, parts)
+        self.varnum = parts[0].varnum
+
+    def execute(self, fr):
+        fr.funcvar_set(self.varnum, fr.data_pop())
+        fr.call_stack[-1].pcnum += 1
+
+
+class InstFusedGlobalVarAt(InstFused):
+    def __init__(self, line, addr, parts):
+        super(InstFusedGlobalVarAt, self).__init__(line, addr, parts)
+        self.varnum = parts[0].varnum
+
+    def execute(self, fr):
+        fr.data_push(fr.globalvar_get(self.varnum))
+        fr.call_stack[-1].pcnum += 1
+
+
+class InstFusedGlobalVarBang(InstFused):
+    def __init__(self, line, addr, parts):
+        super(InstFusedGlobalVarBang, self).__init__(line, addr, parts)
+        self.varnum = parts[0].varnum
+
+    def execute(self, fr):
+        fr.globalvar_set(self.varnum, fr.data_pop())
+        fr.call_stack[-1].pcnum += 1
+
+
+# Fuses: [DUP|OVER] [constant] comparator [JmpIfFalse]
+class InstFusedCompare(InstFused):
+    def __init__(self, line, addr, parts):
+        super(InstFusedCompare, self).__init__(line, addr, parts)
+        self.depth = 0
+        self.has_const = False
+        self.const = None
+        self.jump = None
+        for part in parts:
+            if type(part) is InstDup:
+                self.depth = 1
+            elif type(part) is InstOver:
+                self.depth = 2
+            elif type(part) is InstPushItem:
+                self.has_const = True
+                self.const = part.value
+            elif isinstance(part, InstComparator):
+                self.cmpinst = part
+                self.prim_name = part.prim_name
+            elif type(part) is InstJmpIfFalse:
+                self.jump = part.value - 1
+
+    def execute(self, fr):
+        types = self.cmpinst.arg_types
+        if not self.depth:
+            a = fr.data_pop(*types)
+            b = self.const
+        else:
+            fr.check_underflow(self.depth)
+            a = fr.data_stack[-self.depth]
+            fr.check_type(a, types)
+            if self.has_const:
+                b = self.const
+            else:
+                b = a
+                a = fr.data_pop(*types)
+        res = self.cmpinst.test(a, b)
+        frame = fr.call_stack[-1]
+        if self.jump is None:
+            fr.data_push(1 if res else 0)
+            frame.pcnum += self.skip
+        elif res:
+            frame.pcnum += self.skip
+        else:
+            frame.pcnum = self.jump
+
+
+def _match_var(code, addr, end):
+    fusions = {
+        (InstFuncVar, InstAt): InstFusedFuncVarAt,
+        (InstFuncVar, InstBang): InstFusedFuncVarBang,
+        (InstGlobalVar, InstAt): InstFusedGlobalVarAt,
+        (InstGlobalVar, InstBang): InstFusedGlobalVarBang,
+    }
+    parts = code[addr:min(addr + 2, end)]
+    key = tuple(type(part) for part in parts)
+    if key in fusions:
+        return fusions[key], parts
+    return None, []
+
+
+def _match_compare(code, addr, end):
+    pos = addr
+    parts = []
+    if pos < end and type(code[pos]) in (InstDup, InstOver):
+        parts.append(code[pos])
+        pos += 1
+    const = None
+    if pos < end and type(code[pos]) is InstPushItem:
+        const = code[pos]
+        parts.append(const)
+        pos += 1
+    if pos >= end or not isinstance(code[pos], InstComparator):
+        return None, []
+    cmpinst = code[pos]
+    if const is not None and type(const.value) not in cmpinst.arg_types:
+        return None, []
+    parts.append(cmpinst)
+    pos += 1
+    if pos < end and type(code[pos]) is InstJmpIfFalse:
+        parts.append(code[pos])
+    if len(parts) < 2 or parts[0] is cmpinst:
+        return None, []
+    return InstFusedCompare, parts
+
+
+fusion_matchers = [
+    _match_var,
+    _match_compare,
+]
+
+
+def fuse_instructions(code):
+    addr = 0
+    while addr < len(code):
+        # Only fuse within a single source line, so line stepping and
+        # line breakpoints see the same boundaries as unfused code.
+        end = addr + 1
+        while end < len(code) and code[end].line == code[addr].line:
+            end += 1
+        for matcher in fusion_matchers:
+            cls, parts = matcher(code, addr, end)
+            if cls:
+                code[addr] = cls(parts[0].line, addr, parts)
+                addr += len(parts) - 1
+                break
+        addr += 1
+    return code
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
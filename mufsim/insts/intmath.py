@@ -32,12 +32,30 @@ class InstInt(Instruction):
         fr.data_push(val)
 
 
-@instr("+")
-class InstPlus(Instruction):
+class InstBinaryMath(Instruction):
+    arg_types = (int, float)
+
+    def operate(self, fr, a, b):
+        pass
+
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(int, float, str, si.DBRef)
-        a = fr.data_pop(int, float, str, si.DBRef)
+        b = fr.data_pop(*self.arg_types)
+        a = fr.data_pop(*self.arg_types)
+        self.operate(fr, a, b)
+
+    def execute_fast(self, fr):
+        stk = fr.data_stack
+        b = stk.pop()
+        a = stk.pop()
+        self.operate(fr, a, b)
+
+
+@instr("+")
+class InstPlus(InstBinaryMath):
+    arg_types = (int, float, str, si.DBRef)
+
+    def operate(self, fr, a, b):
         makedbref = False
         if isinstance(a, str):
             if not isinstance(b, str):
@@ -92,11 +110,10 @@ class InstPlusPlus(Instruction):
 
 
 @instr("-")
-class InstMinus(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, si.DBRef)
-        a = fr.data_pop(int, float, si.DBRef)
+class InstMinus(InstBinaryMath):
+    arg_types = (int, float, si.DBRef)
+
+    def operate(self, fr, a, b):
         makedbref = False
         if isinstance(a, si.DBRef):
             if isinstance(b, float):
@@ -146,11 +163,10 @@ class InstMinusMinus(Instruction):
 
 
 @instr("*")
-class InstTimes(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float, str)
-        a = fr.data_pop(int, float, str)
+class InstTimes(InstBinaryMath):
+    arg_types = (int, float, str)
+
+    def operate(self, fr, a, b):
         if isinstance(a, str):
             if not isinstance(b, int) or b < 0:
                 raise MufRuntimeError("Strings can only be multiplied by positive integers.")
@@ -173,11 +189,8 @@ class InstTimes(Instruction):
 
 
 @instr("/")
-class InstDivide(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float)
-        a = fr.data_pop(int, float)
+class InstDivide(InstBinaryMath):
+    def operate(self, fr, a, b):
         if math.isinf(a) or math.isinf(b):
             fr.set_error("FBOUNDS")
         out = 0
@@ -197,11 +210,8 @@ class InstDivide(Instruction):
 
 
 @instr("%")
-class InstModulo(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int, float)
-        a = fr.data_pop(int, float)
+class InstModulo(InstBinaryMath):
+    def operate(self, fr, a, b):
         if math.isinf(a) or math.isinf(b):
             fr.set_error("FBOUNDS")
         out = 0
@@ -218,11 +228,10 @@ class InstModulo(Instruction):
 
 
 @instr("bitshift")
-class InstBitShift(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int)
-        a = fr.data_pop(int)
+class InstBitShift(InstBinaryMath):
+    arg_types = (int,)
+
+    def operate(self, fr, a, b):
         if b < 0:
             fr.data_push(a >> -b)
         else:
@@ -230,29 +239,26 @@ class InstBitShift(Instruction):
 
 
 @instr("bitor")
-class InstBitOr(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int)
-        a = fr.data_pop(int)
+class InstBitOr(InstBinaryMath):
+    arg_types = (int,)
+
+    def operate(self, fr, a, b):
         fr.data_push(a | b)
 
 
 @instr("bitxor")
-class InstBitXor(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int)
-        a = fr.data_pop(int)
+class InstBitXor(InstBinaryMath):
+    arg_types = (int,)
+
+    def operate(self, fr, a, b):
         fr.data_push(a ^ b)
 
 
 @instr("bitand")
-class InstBitAnd(Instruction):
-    def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop(int)
-        a = fr.data_pop(int)
+class InstBitAnd(InstBinaryMath):
+    arg_types = (int,)
+
+    def operate(self, fr, a, b):
         fr.data_push(a & b)
 
 
@@ -260,7 +266,7 @@ class InstBitAnd(Instruction):
 @instr("setseed")
 class InstSetSeed(Instruction):
     def execute(self, fr):
-        s = fr.data_pop(str)
+        s = fr.data_pop_str()
         random.seed(s[:32])
 
 
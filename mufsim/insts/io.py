@@ -24,7 +24,7 @@ class InstRead(Instruction):
 @instr("userlog")
 class InstUserLog(Instruction):
     def execute(self, fr):
-        s = fr.data_pop(str)
+        s = fr.data_pop_str()
         msg = "%s [%s] %s: %s\n" % (
             db.getobj(fr.user),
             db.getobj(fr.program),
@@ -40,7 +40,7 @@ class InstUserLog(Instruction):
 class InstNotify(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
+        msg = fr.data_pop_str()
         who = fr.data_pop_object()
         who.notify(msg)
         me = fr.globalvar_get(0)
@@ -54,7 +54,7 @@ class InstNotify(Instruction):
 class InstNotifyNolisten(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
+        msg = fr.data_pop_str()
         who = fr.data_pop_object()
         who.notify(msg)
         me = fr.globalvar_get(0)
@@ -87,7 +87,7 @@ class InstArrayNotify(Instruction):
 class InstNotifyExcept(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
+        msg = fr.data_pop_str()
         who = fr.data_pop_dbref()
         where = fr.data_pop_object()
         for ref in where.contents:
@@ -104,8 +104,8 @@ class InstNotifyExcept(Instruction):
 class InstNotifyExclude(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        msg = fr.data_pop(str)
-        pcount = fr.data_pop(int)
+        msg = fr.data_pop_str()
+        pcount = fr.data_pop_int()
         fr.check_underflow(pcount + 1)
         excl = []
         for i in range(pcount):
@@ -150,8 +150,8 @@ class InstArrayNotifySecure(Instruction):
 class InstNotifySecure(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        insmsg = fr.data_pop(str)
-        secmsg = fr.data_pop(str)
+        insmsg = fr.data_pop_str()
+        secmsg = fr.data_pop_str()
         who = fr.data_pop_object()
         for descr in network_interface.user_descrs(who.value):
             msg = secmsg if network_interface.descr_secure(descr) else insmsg
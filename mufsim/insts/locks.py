@@ -19,7 +19,7 @@ class InstLockedP(Instruction):
 @instr("parselock")
 class InstParseLock(Instruction):
     def execute(self, fr):
-        lockstr = fr.data_pop(str)
+        lockstr = fr.data_pop_str()
         lock = locks.lock_parse(lockstr, fr.user)
         fr.data_push(si.Lock(lock))
 
@@ -27,14 +27,14 @@ class InstParseLock(Instruction):
 @instr("unparselock")
 class InstUnParseLock(Instruction):
     def execute(self, fr):
-        lock = fr.data_pop(si.Lock)
+        lock = fr.data_pop_lock()
         fr.data_push(str(lock.value))
 
 
 @instr("prettylock")
 class InstPrettyLock(Instruction):
     def execute(self, fr):
-        lock = fr.data_pop(si.Lock)
+        lock = fr.data_pop_lock()
         fr.data_push(lock.value.pretty())
 
 
@@ -42,7 +42,7 @@ class InstPrettyLock(Instruction):
 class InstTestLock(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        lock = fr.data_pop(si.Lock)
+        lock = fr.data_pop_lock()
         who = fr.data_pop_object()
         fr.data_push(1 if lock.value.eval(who) else 0)
 
@@ -51,7 +51,7 @@ class InstTestLock(Instruction):
 class InstSetLockStr(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        lockstr = fr.data_pop(str)
+        lockstr = fr.data_pop_str()
         what = fr.data_pop_object()
         lock = locks.lock_parse(lockstr, fr.user)
         if lock:
@@ -55,8 +55,8 @@ class McpMufPackage(McpPackage):
             fr = process_list.get(pid)
             if fr is None:
                 return
-            fr.events.add_event(
-                'MCP.%s' % msg.name,
+            process_list.send_event(
+                pid, 'MCP.%s' % msg.name,
                 {
                     'descr': descr,
                     'package': self.name,
@@ -79,7 +79,7 @@ class InstMcpRegister(Instruction):
         fr.check_underflow(3)
         maxver = fr.data_pop(float)
         minver = fr.data_pop(float)
-        pkgname = fr.data_pop(str)
+        pkgname = fr.data_pop_str()
         if pkgname in mcp_packages:
             addr = fr.curr_addr()
             if mcp_pkg_program[pkgname] != addr.prog:
@@ -98,7 +98,7 @@ class InstMcpRegisterEvent(Instruction):
         fr.check_underflow(3)
         maxver = fr.data_pop(float)
         minver = fr.data_pop(float)
-        pkgname = fr.data_pop(str)
+        pkgname = fr.data_pop_str()
         if pkgname in mcp_packages:
             addr = fr.curr_addr()
             if mcp_pkg_program[pkgname] != addr.prog:
@@ -116,9 +116,9 @@ class InstMcpBind(Instruction):
     def execute(self, fr):
         global mcp_packages, mcp_pkg_program
         fr.check_underflow(3)
-        targaddr = fr.data_pop(si.Address)
-        msgname = fr.data_pop(str)
-        pkgname = fr.data_pop(str)
+        targaddr = fr.data_pop_address()
+        msgname = fr.data_pop_str()
+        pkgname = fr.data_pop_str()
         addr = fr.curr_addr()
         if mcp_pkg_program[pkgname] != addr.prog:
             raise MufRuntimeError("MCP package bound to another program.")
@@ -132,9 +132,9 @@ class InstMcpSend(Instruction):
         global mcp_pkg_program
         fr.check_underflow(4)
         args = fr.data_pop_dict()
-        msgname = fr.data_pop(str)
-        pkgname = fr.data_pop(str)
-        descr = fr.data_pop(int)
+        msgname = fr.data_pop_str()
+        pkgname = fr.data_pop_str()
+        descr = fr.data_pop_int()
         mcp = netifc.descr_mcp_connection(descr)
         ver = mcp.supports_package(pkgname)
         if ver is None:
@@ -153,8 +153,8 @@ class InstMcpSend(Instruction):
 @instr("mcp_supports")
 class InstMcpSupports(Instruction):
     def execute(self, fr):
-        pkgname = fr.data_pop(str)
-        descr = fr.data_pop(int)
+        pkgname = fr.data_pop_str()
+        descr = fr.data_pop_int()
         mcp = netifc.descr_mcp_connection(descr)
         ver = mcp.supports_package(pkgname)
         if ver is None:
@@ -101,8 +101,8 @@ class McpGuiPackage(McpPackage):
         dismissed = 0 if dismissed == '0' else 1
         if isinstance(data, str):
             data = [data]
-        fr.events.add_event(
-            'GUI.%s' % dlogid,
+        process_list.send_event(
+            dlog.pid, 'GUI.%s' % dlogid,
             si.MufDict(
                 {
                     'descr': descr,
@@ -140,7 +140,7 @@ class McpGuiPackage(McpPackage):
         }
         if ctrlid:
             data['id'] = ctrlid
-        fr.events.add_event('GUI.%s' % dlogid, data)
+        process_list.send_event(dlog.pid, 'GUI.%s' % dlogid, data)
 
     def process_message(self, msg):
         msgname = msg.name[len(self.name)+1:]
@@ -155,7 +155,7 @@ class McpGuiPackage(McpPackage):
 @instr("gui_available")
 class InstGuiAvailable(Instruction):
     def execute(self, fr):
-        descr = fr.data_pop(int)
+        descr = fr.data_pop_int()
         mcp = netifc.descr_mcp_connection(descr)
         vers = mcp.supports_package('org-fuzzball-gui')
         vers = version2float(vers)
@@ -167,9 +167,9 @@ class InstGuiDlogCreate(Instruction):
     def execute(self, fr):
         fr.check_underflow(4)
         args = fr.data_pop_dict()
-        title = fr.data_pop(str)
-        dtype = fr.data_pop(str)
-        descr = fr.data_pop(int)
+        title = fr.data_pop_str()
+        dtype = fr.data_pop_str()
+        descr = fr.data_pop_int()
         if dtype not in ['simple', 'tabbed', 'helper']:
             dtype = "simple"
         for key in args.keys():
@@ -190,7 +190,7 @@ class InstGuiDlogCreate(Instruction):
 @instr("gui_dlog_show")
 class InstGuiDlogShow(Instruction):
     def execute(self, fr):
-        dlogid = fr.data_pop(str)
+        dlogid = fr.data_pop_str()
         dlog = get_dlog(dlogid)
         if not dlog:
             raise MufRuntimeError("Invalid dialog ID")
@@ -200,7 +200,7 @@ class InstGuiDlogShow(Instruction):
 @instr("gui_dlog_close")
 class InstGuiDlogClose(Instruction):
     def execute(self, fr):
-        dlogid = fr.data_pop(str)
+        dlogid = fr.data_pop_str()
         dlog = get_dlog(dlogid)
         if not dlog:
             raise MufRuntimeError("Invalid dialog ID")
@@ -213,9 +213,9 @@ class InstGuiCtrlCreate(Instruction):
     def execute(self, fr):
         fr.check_underflow(4)
         args = fr.data_pop_dict()
-        ctrlid = fr.data_pop(str)
-        ctype = fr.data_pop(str)
-        dlogid = fr.data_pop(str)
+        ctrlid = fr.data_pop_str()
+        ctype = fr.data_pop_str()
+        dlogid = fr.data_pop_str()
         for key in args.keys():
             fr.check_type(key, [str])
         dlog = get_dlog(dlogid)
@@ -228,9 +228,9 @@ class InstGuiCtrlCommand(Instruction):
     def execute(self, fr):
         fr.check_underflow(4)
         args = fr.data_pop_dict()
-        command = fr.data_pop(str)
-        ctrlid = fr.data_pop(str)
-        dlogid = fr.data_pop(str)
+        command = fr.data_pop_str()
+        ctrlid = fr.data_pop_str()
+        dlogid = fr.data_pop_str()
         for key in args.keys():
             fr.check_type(key, [str])
         dlog = get_dlog(dlogid)
@@ -244,8 +244,8 @@ class InstGuiValueSet(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         val = fr.data_pop(str, int, float, si.DBRef, si.MufList)
-        ctrlid = fr.data_pop(str)
-        dlogid = fr.data_pop(str)
+        ctrlid = fr.data_pop_str()
+        dlogid = fr.data_pop_str()
         if isinstance(val, si.MufList):
             val = val[:]
             fr.check_list_type(val, (str, int, float, si.DBRef), argnum=3)
@@ -258,8 +258,8 @@ class InstGuiValueSet(Instruction):
 class InstGuiValueGet(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        ctrlid = fr.data_pop(str)
-        dlogid = fr.data_pop(str)
+        ctrlid = fr.data_pop_str()
+        dlogid = fr.data_pop_str()
         dlog = get_dlog(dlogid)
         val = dlog.getvalue(ctrlid, '')
         if isinstance(val, str):
@@ -270,7 +270,7 @@ class InstGuiValueGet(Instruction):
 @instr("gui_values_get")
 class InstGuiValuesGet(Instruction):
     def execute(self, fr):
-        dlogid = fr.data_pop(str)
+        dlogid = fr.data_pop_str()
         dlog = get_dlog(dlogid)
         fr.data_push(dlog.values)
 
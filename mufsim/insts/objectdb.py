@@ -24,7 +24,7 @@ class InstTimestamps(Instruction):
 class InstCheckPassWord(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        passwd = fr.data_pop(str)
+        passwd = fr.data_pop_str()
         who = fr.data_pop_object()
         if who.objtype != "player":
             raise MufRuntimeError("Expected player dbref.")
@@ -35,7 +35,7 @@ class InstCheckPassWord(Instruction):
 class InstNewPassWord(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        passwd = fr.data_pop(str)
+        passwd = fr.data_pop_str()
         who = fr.data_pop_object()
         if who.objtype != "player":
             raise MufRuntimeError("Expected player dbref.")
@@ -47,8 +47,8 @@ class InstNewPassWord(Instruction):
 class InstProgramGetLines(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        end = fr.data_pop(int)
-        start = fr.data_pop(int)
+        end = fr.data_pop_int()
+        start = fr.data_pop_int()
         obj = fr.data_pop_object()
         if obj.objtype != "program":
             raise MufRuntimeError("Expected program dbref.")
@@ -94,7 +94,7 @@ class InstUnCompile(Instruction):
         if obj.objtype != "program":
             raise MufRuntimeError("Expected program dbref.")
         for cfr in fr.call_stack:
-            if cfr.pc.prog == obj.dbref:
+            if cfr.prog == obj.dbref:
                 raise MufRuntimeError("Cannot uncompile running program.")
         obj.compiled = None
 
@@ -102,12 +102,12 @@ class InstUnCompile(Instruction):
 @instr("compile")
 class InstCompile(Instruction):
     def execute(self, fr):
-        showerrs = fr.data_pop(int)
+        showerrs = fr.data_pop_int()
         obj = fr.data_pop_object()
         if obj.objtype != "program":
             raise MufRuntimeError("Expected program dbref.")
         for cfr in fr.call_stack:
-            if cfr.pc.prog == obj.dbref:
+            if cfr.prog == obj.dbref:
                 raise MufRuntimeError("Cannot compile running program.")
         obj.compiled = None
         try:
@@ -116,7 +116,7 @@ class InstCompile(Instruction):
             if showerrs:
                 log(str(e))
         if obj.compiled:
-            fr.data_push(len(obj.compiled.code))
+            fr.data_push(obj.compiled.get_code_size())
         else:
             fr.data_push(0)
         log("COMPILE %s" % obj)
@@ -125,7 +125,7 @@ class InstCompile(Instruction):
 @instr("sysparm")
 class InstSysParm(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         val = sysparm.get_sysparm_value(name)
         if val is None:
             raise MufRuntimeError("Non-existent sysparm.")
@@ -136,8 +136,8 @@ class InstSysParm(Instruction):
 class InstSetSysParm(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        val = fr.data_pop(str)
-        name = fr.data_pop(str)
+        val = fr.data_pop_str()
+        name = fr.data_pop_str()
         typ = sysparm.get_sysparm_type(name)
         if typ is None:
             raise MufRuntimeError("Non-existent sysparm.")
@@ -158,7 +158,7 @@ class InstSetSysParm(Instruction):
 @instr("sysparm_array")
 class InstSysParmArray(Instruction):
     def execute(self, fr):
-        pat = fr.data_pop(str)
+        pat = fr.data_pop_str()
         out = [
             si.MufDict(sysparm.get_sysparm_info(name), fr.array_pinning)
             for name in sysparm.get_sysparm_names(pat)
@@ -169,14 +169,14 @@ class InstSysParmArray(Instruction):
 @instr("dbref")
 class InstDBRef(Instruction):
     def execute(self, fr):
-        val = fr.data_pop(int)
+        val = fr.data_pop_int()
         fr.data_push(si.DBRef(val))
 
 
 @instr("match")
 class InstMatch(Instruction):
     def execute(self, fr):
-        pat = fr.data_pop(str).lower()
+        pat = fr.data_pop_str().lower()
         if pat == "me":
             obj = db.getobj(fr.user).dbref
         elif pat == "here":
@@ -192,7 +192,7 @@ class InstMatch(Instruction):
 class InstRMatch(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        pat = fr.data_pop(str).lower()
+        pat = fr.data_pop_str().lower()
         remote = fr.data_pop_object()
         if pat == "me":
             obj = db.getobj(fr.user).dbref
@@ -208,7 +208,7 @@ class InstRMatch(Instruction):
 @instr("pmatch")
 class InstPMatch(Instruction):
     def execute(self, fr):
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         obj = db.match_playername("*" + nam)
         fr.data_push(si.DBRef(obj))
 
@@ -216,7 +216,7 @@ class InstPMatch(Instruction):
 @instr("part_pmatch")
 class InstPartPMatch(Instruction):
     def execute(self, fr):
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         obj = db.match_playername_prefix(nam)
         fr.data_push(si.DBRef(obj))
 
@@ -239,7 +239,7 @@ class InstPennies(Instruction):
 class InstAddPennies(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        val = fr.data_pop(int)
+        val = fr.data_pop_int()
         obj = fr.data_pop_object()
         obj.pennies += val
         obj.mark_modify()
@@ -249,7 +249,7 @@ class InstAddPennies(Instruction):
 class InstMovePennies(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        val = fr.data_pop(int)
+        val = fr.data_pop_int()
         dest = fr.data_pop_object()
         obj = fr.data_pop_object()
         obj.pennies -= val
@@ -277,7 +277,7 @@ class InstUnparseObj(Instruction):
 class InstSetName(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.name = nam
         if obj.objtype == "player":
@@ -305,14 +305,14 @@ class InstPNameHistory(Instruction):
 @instr("name-ok?")
 class InstNameOkP(Instruction):
     def execute(self, fr):
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         fr.data_push(1 if db.ok_name(nam) else 0)
 
 
 @instr("pname-ok?")
 class InstPNameOkP(Instruction):
     def execute(self, fr):
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         fr.data_push(1 if db.ok_player_name(nam) else 0)
 
 
@@ -320,7 +320,7 @@ class InstPNameOkP(Instruction):
 class InstExtNameOkP(Instruction):
     def execute(self, fr):
         obj = fr.data_pop(str, si.DBRef)
-        nam = fr.data_pop(str)
+        nam = fr.data_pop_str()
         if isinstance(obj, si.DBRef):
             typ = db.getobj(obj).objtype
         else:
@@ -334,7 +334,7 @@ class InstExtNameOkP(Instruction):
 @instr("set")
 class InstSet(Instruction):
     def execute(self, fr):
-        flg = fr.data_pop(str)
+        flg = fr.data_pop_str()
         obj = fr.data_pop_object()
         flg = flg.strip().upper()[0]
         if flg not in obj.flags:
@@ -346,7 +346,7 @@ class InstSet(Instruction):
 class InstFlagP(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        flg = fr.data_pop(str)
+        flg = fr.data_pop_str()
         obj = fr.data_pop_object()
         flg = flg.strip().upper()[0]
         ret = 1 if flg in obj.flags else 0
@@ -420,7 +420,7 @@ class InstMoveTo(Instruction):
 class InstForce(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        cmd = fr.data_pop(str)
+        cmd = fr.data_pop_str()
         obj = fr.data_pop_object()
         log("FORCE %s TO DO: %s" % (obj, cmd))
         cmds.force_level_push(fr.user, fr.program)
@@ -530,8 +530,7 @@ class InstGetLink(Instruction):
 class InstGetLinks(Instruction):
     def execute(self, fr):
         obj = fr.data_pop_object()
-        for link in obj.links:
-            fr.data_push(si.DBRef(link))
+        fr.data_push_many(si.DBRef(link) for link in obj.links)
         fr.data_push(len(obj.links))
 
 
@@ -568,8 +567,8 @@ class InstCopyObj(Instruction):
 @instr("copyplayer")
 class InstCopyPlayer(Instruction):
     def execute(self, fr):
-        pw = fr.data_pop(str)  # noqa
-        name = fr.data_pop(str)
+        pw = fr.data_pop_str()  # noqa
+        name = fr.data_pop_str()
         obj = fr.data_pop_object()
         if obj.objtype != "player":
             raise MufRuntimeError("Expected player dbref.")
@@ -589,8 +588,8 @@ class InstCopyPlayer(Instruction):
 @instr("newplayer")
 class InstNewPlayer(Instruction):
     def execute(self, fr):
-        pw = fr.data_pop(str)  # noqa
-        name = fr.data_pop(str)
+        pw = fr.data_pop_str()  # noqa
+        name = fr.data_pop_str()
         obj = db.DBObject(
             name=name,
             objtype="player",
@@ -604,7 +603,7 @@ class InstNewPlayer(Instruction):
 @instr("newroom")
 class InstNewRoom(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         parent = fr.data_pop_object()
         if parent.objtype not in ["room", "thing"]:
             raise MufRuntimeError("Expected room or thing dbref.")
@@ -620,7 +619,7 @@ class InstNewRoom(Instruction):
 @instr("newobject")
 class InstNewObject(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         parent = fr.data_pop_object()
         if parent.objtype not in ["room", "thing", "player"]:
             raise MufRuntimeError("Expected room or thing or player dbref.")
@@ -636,7 +635,7 @@ class InstNewObject(Instruction):
 @instr("newexit")
 class InstNewExit(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         parent = fr.data_pop_object()
         if parent.objtype not in ["room", "thing", "player"]:
             raise MufRuntimeError("Expected room or thing or player dbref.")
@@ -652,7 +651,7 @@ class InstNewExit(Instruction):
 @instr("newprogram")
 class InstNewProgram(Instruction):
     def execute(self, fr):
-        name = fr.data_pop(str)
+        name = fr.data_pop_str()
         obj = db.DBObject(
             name=name,
             objtype="program",
@@ -681,7 +680,7 @@ class InstRecycle(Instruction):
         obj = fr.data_pop_object()
         if obj.objtype == "player":
             raise MufRuntimeError("Expected non-player dbref.")
-        protect = [cl.pc.prog for cl in fr.call_stack]
+        protect = [cl.prog for cl in fr.call_stack]
         if obj.dbref in protect:
             raise MufRuntimeError("Cannot recycle running program.")
         db.recycle_object(obj)
@@ -707,8 +706,8 @@ class InstNextEntrance(Instruction):
 class InstFindNext(Instruction):
     def execute(self, fr):
         fr.check_underflow(4)
-        flags = fr.data_pop(str)
-        name = fr.data_pop(str)
+        flags = fr.data_pop_str()
+        name = fr.data_pop_str()
         own = fr.data_pop_dbref()
         obj = fr.data_pop_dbref()
         fr.data_push(si.DBRef(db.findnext(obj, own.value, name, flags)))
@@ -15,7 +15,7 @@ class InstPid(Instruction):
 @instr("ispid?")
 class InstIsPidP(Instruction):
     def execute(self, fr):
-        pid = fr.data_pop(int)
+        pid = fr.data_pop_int()
         fr.data_push(1 if fr.lookup_process(pid) else 0)
 
 
@@ -43,7 +43,7 @@ class InstGetPids(Instruction):
 @instr("getpidinfo")
 class InstGetPidInfo(Instruction):
     def execute(self, fr):
-        pid = fr.data_pop(int)
+        pid = fr.data_pop_int()
         ofr = fr.lookup_process(pid)
         if not ofr:
             out = {}
@@ -83,7 +83,7 @@ class InstInstances(Instruction):
 @instr("kill")
 class InstKill(Instruction):
     def execute(self, fr):
-        pid = fr.data_pop(int)
+        pid = fr.data_pop_int()
         if fr.lookup_process(pid):
             fr.kill_pid(pid)
             fr.data_push(1)
@@ -95,9 +95,9 @@ class InstKill(Instruction):
 class InstQueue(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        cmd = fr.data_pop(str)
+        cmd = fr.data_pop_str()
         prog = fr.data_pop_object()
-        secs = fr.data_pop(int)
+        secs = fr.data_pop_int()
         newproc = fr.proclist.new_process()
         newproc.setup(prog.dbref, fr.user, fr.program, cmd)
         newproc.sleep(secs)
@@ -116,7 +116,7 @@ class InstFork(Instruction):
 class InstInterp(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        cmd = fr.data_pop(str)
+        cmd = fr.data_pop_str()
         trig = fr.data_pop_object()
         prog = fr.data_pop_object()
         newproc = fr.proclist.new_process()
@@ -1,4 +1,3 @@
-from functools import cmp_to_key
 
 import mufsim.utils as util
 import mufsim.gamedb as db
@@ -11,9 +10,9 @@ from mufsim.insts.base import Instruction, instr
 class InstAddProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        val2 = fr.data_pop(int)
-        val = fr.data_pop(str)
-        prop = fr.data_pop(str)
+        val2 = fr.data_pop_int()
+        val = fr.data_pop_str()
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         if val:
             obj.setprop(prop, val)
@@ -26,7 +25,7 @@ class InstSetProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         val = fr.data_pop()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.setprop(prop, val)
 
@@ -35,7 +34,7 @@ class InstSetProp(Instruction):
 class InstRemoveProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.delprop(prop)
 
@@ -44,7 +43,7 @@ class InstRemoveProp(Instruction):
 class InstPropDirP(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.is_propdir(prop)
         fr.data_push(1 if val else 0)
@@ -54,7 +53,7 @@ class InstPropDirP(Instruction):
 class InstNextProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.next_prop(prop)
         fr.data_push(val)
@@ -64,7 +63,7 @@ class InstNextProp(Instruction):
 class InstArrayGetPropDirs(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str) + '/'
+        prop = fr.data_pop_str() + '/'
         obj = fr.data_pop_object()
         out = []
         while True:
@@ -80,7 +79,7 @@ class InstArrayGetPropDirs(Instruction):
 class InstGetProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if val is None:
@@ -92,7 +91,7 @@ class InstGetProp(Instruction):
 class InstGetPropStr(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, str):
@@ -104,7 +103,7 @@ class InstGetPropStr(Instruction):
 class InstGetPropVal(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, int):
@@ -116,7 +115,7 @@ class InstGetPropVal(Instruction):
 class InstGetPropFVal(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, float):
@@ -128,7 +127,7 @@ class InstGetPropFVal(Instruction):
 class InstEnvProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object().dbref
         while obj >= 0:
             val = db.getobj(obj).getprop(prop)
@@ -144,7 +143,7 @@ class InstEnvProp(Instruction):
 class InstEnvPropStr(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object().dbref
         while obj >= 0:
             val = db.getobj(obj).getprop(prop)
@@ -161,7 +160,7 @@ class InstEnvPropStr(Instruction):
 class InstBlessProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.blessprop(prop)
 
@@ -170,7 +169,7 @@ class InstBlessProp(Instruction):
 class InstUnBlessProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.unblessprop(prop)
 
@@ -179,7 +178,7 @@ class InstUnBlessProp(Instruction):
 class InstBlessedP(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.is_blessed(prop)
         fr.data_push(1 if val else 0)
@@ -189,7 +188,7 @@ class InstBlessedP(Instruction):
 class InstArrayGetPropList(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         out = []
         val = obj.getprop("%s#" % prop)
@@ -214,7 +213,7 @@ class InstArrayPutPropList(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         items = fr.data_pop_list()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         obj.setprop("%s#" % prop, len(items))
         for i, item in enumerate(items[:]):
@@ -225,7 +224,7 @@ class InstArrayPutPropList(Instruction):
 class InstArrayGetPropVals(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         prop = obj.normalize_prop(prop) + '/'
         plen = len(prop)
@@ -244,21 +243,17 @@ class InstArrayPutPropVals(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         d = fr.data_pop_dict()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
-        keys = sorted(
-            list(d.keys()),
-            key=cmp_to_key(si.sortcomp),
-        )
-        for key in keys:
-            obj.setprop("%s/%s" % (prop, key), d[key])
+        for key, val in d.items():
+            obj.setprop("%s/%s" % (prop, key), val)
 
 
 @instr("array_get_reflist")
 class InstArrayGetReflist(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, str):
@@ -277,7 +272,7 @@ class InstArrayPutReflist(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         refs = fr.data_pop_list()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         fr.check_list_type(refs, (si.DBRef), argnum=3)
         refstr = " ".join([str(ref) for ref in refs])
@@ -289,7 +284,7 @@ class InstRefListAdd(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         ref = fr.data_pop_dbref()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, str):
@@ -312,7 +307,7 @@ class InstRefListDel(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         ref = fr.data_pop_dbref()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, str):
@@ -334,7 +329,7 @@ class InstRefListFind(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
         ref = fr.data_pop_dbref()
-        prop = fr.data_pop(str)
+        prop = fr.data_pop_str()
         obj = fr.data_pop_object()
         val = obj.getprop(prop)
         if not isinstance(val, str):
@@ -355,8 +350,8 @@ class InstRefListFind(Instruction):
 class InstArrayFilterProp(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        pat = fr.data_pop(str)
-        prop = fr.data_pop(str)
+        pat = fr.data_pop_str()
+        prop = fr.data_pop_str()
         objs = fr.data_pop_list()
         found = []
         fr.check_list_type(objs, (si.DBRef), argnum=1)
@@ -372,7 +367,7 @@ class InstArrayFilterProp(Instruction):
 class InstArrayFilterFlags(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        flags = fr.data_pop(str).upper()
+        flags = fr.data_pop_str().upper()
         objs = fr.data_pop_list()
         fr.check_list_type(obj, (si.DBRef), argnum=1)
         found = []
@@ -98,6 +98,9 @@ class InstDup(Instruction):
         fr.data_push(a)
         fr.data_push(a)
 
+    def execute_fast(self, fr):
+        fr.data_push(fr.data_stack[-1])
+
 
 @instr("shallow_copy")
 class InstShallowCopy(Instruction):
@@ -130,10 +133,9 @@ class InstQDup(Instruction):
 @instr("dupn")
 class InstDupN(Instruction):
     def execute(self, fr):
-        n = fr.data_pop(int)
-        fr.check_underflow(n)
-        for i in range(n):
-            fr.data_push(fr.data_pick(n))
+        n = fr.data_pop_int()
+        vals = fr.data_pop_many(n)
+        fr.data_push_many(vals + vals)
 
 
 @instr("ldup")
@@ -142,10 +144,8 @@ class InstLDup(Instruction):
         n = fr.data_pick(1)
         if not isinstance(n, int):
             raise MufRuntimeError("Expected integer argument.")
-        n += 1
-        fr.check_underflow(n)
-        for i in range(n):
-            fr.data_push(fr.data_pick(n))
+        vals = fr.data_pop_many(n + 1)
+        fr.data_push_many(vals + vals)
 
 
 @instr("pop")
@@ -153,25 +153,28 @@ class InstPop(Instruction):
     def execute(self, fr):
         fr.data_pop()
 
+    def execute_fast(self, fr):
+        fr.data_stack.pop()
+
 
 @instr("popn")
 class InstPopN(Instruction):
     def execute(self, fr):
-        n = fr.data_pop(int)
-        fr.check_underflow(n)
-        for i in range(n):
-            fr.data_pop()
+        n = fr.data_pop_int()
+        fr.data_pop_many(n)
 
 
 @instr("swap")
 class InstSwap(Instruction):
     def execute(self, fr):
-        fr.check_underflow(2)
-        b = fr.data_pop()
-        a = fr.data_pop()
+        a, b = fr.data_pop2()
         fr.data_push(b)
         fr.data_push(a)
 
+    def execute_fast(self, fr):
+        stk = fr.data_stack
+        stk[-1], stk[-2] = stk[-2], stk[-1]
+
 
 @instr("rot")
 class InstRot(Instruction):
@@ -180,14 +183,15 @@ class InstRot(Instruction):
         a = fr.data_pull(3)
         fr.data_push(a)
 
+    def execute_fast(self, fr):
+        stk = fr.data_stack
+        stk.append(stk.pop(-3))
+
 
 @instr("-rot")
 class InstNegRot(Instruction):
     def execute(self, fr):
-        fr.check_underflow(3)
-        c = fr.data_pop()
-        b = fr.data_pop()
-        a = fr.data_pop()
+        a, b, c = fr.data_pop3()
         fr.data_push(c)
         fr.data_push(a)
         fr.data_push(b)
@@ -196,7 +200,7 @@ class InstNegRot(Instruction):
 @instr("rotate")
 class InstRotate(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
+        num = fr.data_pop_int()
         fr.check_underflow(num)
         if not num:
             return
@@ -211,7 +215,7 @@ class InstRotate(Instruction):
 @instr("pick")
 class InstPick(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
+        num = fr.data_pop_int()
         fr.check_underflow(num)
         if not num:
             return
@@ -229,12 +233,15 @@ class InstOver(Instruction):
         a = fr.data_pick(2)
         fr.data_push(a)
 
+    def execute_fast(self, fr):
+        fr.data_push(fr.data_stack[-2])
+
 
 @instr("put")
 class InstPut(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        num = fr.data_pop(int)
+        num = fr.data_pop_int()
         val = fr.data_pop()
         fr.check_underflow(num)
         if not num:
@@ -268,25 +275,19 @@ class InstTuck(Instruction):
 @instr("reverse")
 class InstReverse(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
-        fr.check_underflow(num)
-        if not num:
-            return
-        arr = [fr.data_pop() for i in range(num)]
-        for val in arr:
-            fr.data_push(val)
+        num = fr.data_pop_int()
+        arr = fr.data_pop_many(num)
+        fr.data_push_many(reversed(arr))
 
 
 @instr("lreverse")
 class InstLReverse(Instruction):
     def execute(self, fr):
-        num = fr.data_pop(int)
-        fr.check_underflow(num)
+        num = fr.data_pop_int()
         if not num:
             return
-        arr = [fr.data_pop() for i in range(num)]
-        for val in arr:
-            fr.data_push(val)
+        arr = fr.data_pop_many(num)
+        fr.data_push_many(reversed(arr))
         fr.data_push(num)
 
 
@@ -323,14 +324,14 @@ class InstFullDepth(Instruction):
 @instr("variable")
 class InstVariable(Instruction):
     def execute(self, fr):
-        vnum = fr.data_pop(int)
+        vnum = fr.data_pop_int()
         fr.data_push(si.GlobalVar(vnum))
 
 
 @instr("localvar")
 class InstLocalVar(Instruction):
     def execute(self, fr):
-        vnum = fr.data_pop(int)
+        vnum = fr.data_pop_int()
         fr.data_push(si.GlobalVar(vnum))
 
 
@@ -439,7 +440,7 @@ class InstCheckArgs(Instruction):
                                 "Expected %s at depth %d" % (label, depth))
 
     def execute(self, fr):
-        argexp = fr.data_pop(str)
+        argexp = fr.data_pop_str()
         self.checkargs_part(fr, argexp)
 
 
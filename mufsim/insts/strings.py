@@ -13,7 +13,7 @@ class InstFmtString(Instruction):
     def handle_fieldsubs(self, fmt, fr):
         while '*' in fmt:
             pre, post = fmt.split('*', 1)
-            x = fr.data_pop(int)
+            x = fr.data_pop_int()
             fmt = pre + str(x) + post
         fmt = fmt.replace('|', '^')
         return fmt
@@ -26,12 +26,12 @@ class InstFmtString(Instruction):
             if ftyp == "%":
                 return "%"
             elif ftyp == "i":
-                val = fr.data_pop(int)
+                val = fr.data_pop_int()
                 ftyp = "d"
             elif ftyp.lower() in ["e" "f", "g"]:
                 val = fr.data_pop(float)
             elif ftyp == "s":
-                val = fr.data_pop(str)
+                val = fr.data_pop_str()
             elif ftyp == "D":
                 val = fr.data_pop_object().name
                 ftyp = "s"
@@ -50,7 +50,7 @@ class InstFmtString(Instruction):
             fmtd = fmt % val
             return fmtd
 
-        fmt = fr.data_pop(str)
+        fmt = fr.data_pop_str()
         pat = r'(%[| 0+-]*(\d*|\*)\.?(\d*|\*)?)([idDefgEFGsl%?~])'
         out = re.sub(pat, subfunc, fmt)
         fr.data_push(out)
@@ -60,22 +60,22 @@ class InstFmtString(Instruction):
 class InstExplodeArray(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        delim = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        delim = fr.data_pop_str()
+        txt = fr.data_pop_str()
         fr.data_push_list(txt.split(delim))
 
 
 @instr("toupper")
 class InstToUpper(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         fr.data_push(txt.upper())
 
 
 @instr("tolower")
 class InstToLower(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         fr.data_push(txt.lower())
 
 
@@ -83,13 +83,12 @@ class InstToLower(Instruction):
 class InstExplode(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        delim = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        delim = fr.data_pop_str()
+        txt = fr.data_pop_str()
         if not delim:
             raise MufRuntimeError("Expected non-null string argument. (2)")
         parts = txt.split(delim)
-        for part in reversed(parts):
-            fr.data_push(part)
+        fr.data_push_many(reversed(parts))
         fr.data_push(len(parts))
 
 
@@ -97,8 +96,8 @@ class InstExplode(Instruction):
 class InstSplit(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        delim = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        delim = fr.data_pop_str()
+        txt = fr.data_pop_str()
         parts = txt.split(delim, 1)
         fr.data_push(parts[0])
         if len(parts) > 1:
@@ -111,8 +110,8 @@ class InstSplit(Instruction):
 class InstRSplit(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        delim = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        delim = fr.data_pop_str()
+        txt = fr.data_pop_str()
         parts = txt.rsplit(delim, 1)
         fr.data_push(parts[0])
         if len(parts) > 1:
@@ -124,30 +123,39 @@ class InstRSplit(Instruction):
 @instr("striplead")
 class InstStripLead(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         fr.data_push(txt.lstrip())
 
 
 @instr("striptail")
 class InstStripTail(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         fr.data_push(txt.rstrip())
 
 
 @instr("strlen")
 class InstStrLen(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         fr.data_push(len(txt))
 
+    def execute_fast(self, fr):
+        stk = fr.data_stack
+        stk.append(len(stk.pop()))
+
 
 @instr("strcat")
 class InstStrCat(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        txt2 = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        txt2 = fr.data_pop_str()
+        txt = fr.data_pop_str()
+        fr.data_push(txt + txt2)
+
+    def execute_fast(self, fr):
+        txt2 = fr.data_stack.pop()
+        txt = fr.data_stack.pop()
         fr.data_push(txt + txt2)
 
 
@@ -155,8 +163,8 @@ class InstStrCat(Instruction):
 class InstInstr(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        fnd = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        fnd = fr.data_pop_str()
+        txt = fr.data_pop_str()
         fr.data_push(txt.find(fnd) + 1)
 
 
@@ -164,8 +172,8 @@ class InstInstr(Instruction):
 class InstInString(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        fnd = fr.data_pop(str).lower()
-        txt = fr.data_pop(str).lower()
+        fnd = fr.data_pop_str().lower()
+        txt = fr.data_pop_str().lower()
         fr.data_push(txt.find(fnd) + 1)
 
 
@@ -173,8 +181,8 @@ class InstInString(Instruction):
 class InstRInstr(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        fnd = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        fnd = fr.data_pop_str()
+        txt = fr.data_pop_str()
         fr.data_push(txt.rfind(fnd) + 1)
 
 
@@ -182,8 +190,8 @@ class InstRInstr(Instruction):
 class InstRInString(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        fnd = fr.data_pop(str).lower()
-        txt = fr.data_pop(str).lower()
+        fnd = fr.data_pop_str().lower()
+        txt = fr.data_pop_str().lower()
         fr.data_push(txt.rfind(fnd) + 1)
 
 
@@ -191,8 +199,8 @@ class InstRInString(Instruction):
 class InstStrCut(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(int)
-        a = fr.data_pop(str)
+        b = fr.data_pop_int()
+        a = fr.data_pop_str()
         fr.data_push(a[:b])
         fr.data_push(a[b:])
 
@@ -201,9 +209,9 @@ class InstStrCut(Instruction):
 class InstMidStr(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        num = fr.data_pop(int)
-        pos = fr.data_pop(int)
-        s = fr.data_pop(str)
+        num = fr.data_pop_int()
+        pos = fr.data_pop_int()
+        s = fr.data_pop_str()
         fr.data_push(s[pos - 1:pos + num - 1])
 
 
@@ -211,9 +219,9 @@ class InstMidStr(Instruction):
 class InstRegExp(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        flags = fr.data_pop(int)
-        pat = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        flags = fr.data_pop_int()
+        pat = fr.data_pop_str()
+        txt = fr.data_pop_str()
         flgs = 0
         if (flags % 0x1) != 0:
             flgs |= re.IGNORECASE
@@ -239,10 +247,10 @@ class InstRegExp(Instruction):
 class InstRegSub(Instruction):
     def execute(self, fr):
         fr.check_underflow(4)
-        flags = fr.data_pop(int)
-        repl = fr.data_pop(str)
-        pat = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        flags = fr.data_pop_int()
+        repl = fr.data_pop_str()
+        pat = fr.data_pop_str()
+        txt = fr.data_pop_str()
         flgs = 0
         if (flags % 0x1) != 0:
             flgs |= re.IGNORECASE
@@ -257,9 +265,9 @@ class InstRegSub(Instruction):
 class InstRegSplit(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        flags = fr.data_pop(int)
-        pat = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        flags = fr.data_pop_int()
+        pat = fr.data_pop_str()
+        txt = fr.data_pop_str()
         flgs = 0
         if (flags % 0x1) != 0:
             flgs |= re.IGNORECASE
@@ -274,9 +282,9 @@ class InstRegSplit(Instruction):
 class InstRegSplitNoEmpty(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        flags = fr.data_pop(int)
-        pat = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        flags = fr.data_pop_int()
+        pat = fr.data_pop_str()
+        txt = fr.data_pop_str()
         flgs = 0
         if (flags % 0x1) != 0:
             flgs |= re.IGNORECASE
@@ -291,9 +299,9 @@ class InstRegSplitNoEmpty(Instruction):
 class InstSubst(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        fnd = fr.data_pop(str)
-        repl = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        fnd = fr.data_pop_str()
+        repl = fr.data_pop_str()
+        txt = fr.data_pop_str()
         fr.data_push(txt.replace(fnd, repl))
 
 
@@ -301,8 +309,8 @@ class InstSubst(Instruction):
 class InstStrCmp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(str)
-        a = fr.data_pop(str)
+        b = fr.data_pop_str()
+        a = fr.data_pop_str()
         fr.data_push((a > b) - (a < b))
 
 
@@ -310,9 +318,9 @@ class InstStrCmp(Instruction):
 class InstStrNCmp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        n = fr.data_pop(int)
-        b = fr.data_pop(str)[:n]
-        a = fr.data_pop(str)[:n]
+        n = fr.data_pop_int()
+        b = fr.data_pop_str()[:n]
+        a = fr.data_pop_str()[:n]
         fr.data_push((a > b) - (a < b))
 
 
@@ -320,8 +328,8 @@ class InstStrNCmp(Instruction):
 class InstStringCmp(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(str).upper()
-        a = fr.data_pop(str).upper()
+        b = fr.data_pop_str().upper()
+        a = fr.data_pop_str().upper()
         fr.data_push((a > b) - (a < b))
 
 
@@ -329,8 +337,8 @@ class InstStringCmp(Instruction):
 class InstStringPfx(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        b = fr.data_pop(str).upper()
-        a = fr.data_pop(str).upper()
+        b = fr.data_pop_str().upper()
+        a = fr.data_pop_str().upper()
         fr.data_push(1 if a.startswith(b) else 0)
 
 
@@ -338,8 +346,8 @@ class InstStringPfx(Instruction):
 class InstSMatch(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        pat = fr.data_pop(str).upper()
-        txt = fr.data_pop(str).upper()
+        pat = fr.data_pop_str().upper()
+        txt = fr.data_pop_str().upper()
         fr.data_push(1 if util.smatch(pat, txt) else 0)
 
 
@@ -347,8 +355,8 @@ class InstSMatch(Instruction):
 class InstStrEncrypt(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        key = fr.data_pop(str)
-        data = fr.data_pop(str)
+        key = fr.data_pop_str()
+        data = fr.data_pop_str()
         enarr = list(range(256))
         for i in range(ord('A'), ord('M') + 1):
             enarr[i] += 13
@@ -384,8 +392,8 @@ class InstStrEncrypt(Instruction):
 class InstStrDecrypt(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        key = fr.data_pop(str)
-        data = fr.data_pop(str)
+        key = fr.data_pop_str()
+        data = fr.data_pop_str()
         if not data:
             fr.data_push("")
             return
@@ -429,9 +437,9 @@ class InstStrDecrypt(Instruction):
 class InstTokenSplit(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        esc = fr.data_pop(str)
-        delim = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        esc = fr.data_pop_str()
+        delim = fr.data_pop_str()
+        txt = fr.data_pop_str()
         txtlen = len(txt)
         pos = 0
         while pos < txtlen:
@@ -450,7 +458,7 @@ class InstTokenSplit(Instruction):
 class InstPronounSub(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         obj = fr.data_pop_object()
         sex = obj.getprop("sex")
         if not isinstance(sex, str):
@@ -549,8 +557,8 @@ class InstTextAttr(Instruction):
 
     def execute(self, fr):
         fr.check_underflow(2)
-        attrs = fr.data_pop(str)
-        txt = fr.data_pop(str)
+        attrs = fr.data_pop_str()
+        txt = fr.data_pop_str()
         codes = []
         endcode = ""
         for attr in attrs.split(','):
@@ -566,7 +574,7 @@ class InstTextAttr(Instruction):
 @instr("ansi_strip")
 class InstAnsiStrip(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         pos = 0
         txtlen = len(txt)
         out = ""
@@ -584,7 +592,7 @@ class InstAnsiStrip(Instruction):
 @instr("ansi_strlen")
 class InstAnsiStrLen(Instruction):
     def execute(self, fr):
-        txt = fr.data_pop(str)
+        txt = fr.data_pop_str()
         pos = 0
         txtlen = len(txt)
         outlen = 0
@@ -603,8 +611,8 @@ class InstAnsiStrLen(Instruction):
 class InstAnsiStrCut(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        cutpos = fr.data_pop(int)
-        txt = fr.data_pop(str)
+        cutpos = fr.data_pop_int()
+        txt = fr.data_pop_str()
         pos = 0
         txtlen = len(txt)
         while pos < txtlen:
@@ -625,9 +633,9 @@ class InstAnsiStrCut(Instruction):
 class InstAnsiMidStr(Instruction):
     def execute(self, fr):
         fr.check_underflow(3)
-        end = fr.data_pop(int)
-        start = fr.data_pop(int) - 1
-        txt = fr.data_pop(str)
+        end = fr.data_pop_int()
+        start = fr.data_pop_int() - 1
+        txt = fr.data_pop_str()
         pos = 0
         strpos = 0
         end += start
@@ -660,7 +668,7 @@ class InstAnsiMidStr(Instruction):
 @instr("atoi")
 class InstAtoI(Instruction):
     def execute(self, fr):
-        a = fr.data_pop(str)
+        a = fr.data_pop_str()
         try:
             fr.data_push(int(a))
         except:
@@ -670,7 +678,7 @@ class InstAtoI(Instruction):
 @instr("stod")
 class InstStoD(Instruction):
     def execute(self, fr):
-        a = fr.data_pop(str)
+        a = fr.data_pop_str()
         if a[0] == '#':
             a = a[1:]
         try:
@@ -682,14 +690,14 @@ class InstStoD(Instruction):
 @instr("intostr")
 class InstIntostr(Instruction):
     def execute(self, fr):
-        a = fr.data_pop(int)
+        a = fr.data_pop_int()
         fr.data_push("%d" % a)
 
 
 @instr("itoc")
 class InstItoC(Instruction):
     def execute(self, fr):
-        c = fr.data_pop(int)
+        c = fr.data_pop_int()
         if c == 13 or c == 27 or c >= 32 or c < 127:
             fr.data_push("%c" % c)
         else:
@@ -699,7 +707,7 @@ class InstItoC(Instruction):
 @instr("ctoi")
 class InstCtoI(Instruction):
     def execute(self, fr):
-        c = ord(fr.data_pop(str)[0])
+        c = ord(fr.data_pop_str()[0])
         if c == 13 or c == 27 or c >= 32 or c < 127:
             fr.data_push(c)
         else:
@@ -709,7 +717,7 @@ class InstCtoI(Instruction):
 @instr("md5hash")
 class InstMD5Hash(Instruction):
     def execute(self, fr):
-        s = fr.data_pop(str)
+        s = fr.data_pop_str()
         hash = hashlib.md5(s.encode()).hexdigest()
         fr.data_push(hash)
 
@@ -717,7 +725,7 @@ class InstMD5Hash(Instruction):
 @instr("sha1hash")
 class InstSHA1Hash(Instruction):
     def execute(self, fr):
-        s = fr.data_pop(str)
+        s = fr.data_pop_str()
         hash = hashlib.sha1(s.encode()).hexdigest()
         fr.data_push(hash)
 
@@ -31,24 +31,26 @@ class InstGmtOffset(Instruction):
 @instr("timesplit")
 class InstTimeSplit(Instruction):
     def execute(self, fr):
-        secs = fr.data_pop(int)
+        secs = fr.data_pop_int()
         when = time.localtime(secs)
-        fr.data_push(int(when.tm_sec))
-        fr.data_push(int(when.tm_min))
-        fr.data_push(int(when.tm_hour))
-        fr.data_push(int(when.tm_mday))
-        fr.data_push(int(when.tm_mon))
-        fr.data_push(int(when.tm_year))
-        fr.data_push(int(when.tm_wday) + 1)
-        fr.data_push(int(when.tm_yday))
+        fr.data_push_many([
+            int(when.tm_sec),
+            int(when.tm_min),
+            int(when.tm_hour),
+            int(when.tm_mday),
+            int(when.tm_mon),
+            int(when.tm_year),
+            int(when.tm_wday) + 1,
+            int(when.tm_yday),
+        ])
 
 
 @instr("timefmt")
 class InstTimeFmt(Instruction):
     def execute(self, fr):
         fr.check_underflow(2)
-        when = fr.data_pop(int)
-        fmt = fr.data_pop(str)
+        when = fr.data_pop_int()
+        fmt = fr.data_pop_str()
         when = time.localtime(when)
         fr.data_push(time.strftime(fmt, when))
 
@@ -0,0 +1,391 @@
+import mufsim.stackitems as si
+from mufsim.errors import MufRuntimeError, MufBreakExecution
+
+import mufsim.insts.flow as instfl
+import mufsim.insts.stack as instst
+import mufsim.insts.intmath as instim
+import mufsim.insts.comparators as instcmp
+import mufsim.insts.debug as instdbg
+from mufsim.insts.fused import InstFused
+
+
+HOT_CALL_THRESHOLD = 20
+
+MAX_STACK = 1024
+BUFFER_LEN = 4096
+
+# Instructions after which the JIT always hands control back to the
+# interpreter, as they change frames or tracing state.
+barrier_types = (
+    instfl.InstExecute,
+    instfl.InstCall,
+    instfl.InstExit,
+    instdbg.InstDebugOn,
+    instdbg.InstDebugOff,
+)
+
+# Stack shuffles, as (depth needed, net depth change, python source).
+shuffle_ops = {
+    instst.InstDup: (1, 1, "stk.append(stk[-1])"),
+    instst.InstPop: (1, -1, "del stk[-1]"),
+    instst.InstSwap: (2, 0, "stk[-2], stk[-1] = stk[-1], stk[-2]"),
+    instst.InstOver: (2, 1, "stk.append(stk[-2])"),
+    instst.InstRot: (3, 0, "stk.append(stk.pop(-3))"),
+}
+
+# Integer fast paths.  Anything else falls back to the primitive.
+int_binary_ops = {
+    instim.InstPlus: "x + y",
+    instim.InstMinus: "x - y",
+    instim.InstTimes: "x * y",
+    instcmp.InstEquals: "1 if x == y else 0",
+    instcmp.InstNotEquals: "1 if x != y else 0",
+    instcmp.InstLessThan: "1 if x < y else 0",
+    instcmp.InstLessThanOrEquals: "1 if x <= y else 0",
+    instcmp.InstGreaterThan: "1 if x > y else 0",
+    instcmp.InstGreaterThanOrEquals: "1 if x >= y else 0",
+}
+
+constant_types = (int, float, str, si.DBRef)
+
+
+class MufJitSource(object):
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def get_source(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class MufJit(object):
+    def __init__(self, comp, threshold=None):
+        if threshold is None:
+            threshold = HOT_CALL_THRESHOLD
+        self.compiled = comp
+        self.threshold = threshold
+        self.call_counts = {}
+        self.sources = {}
+
+    def build_dispatch(self, ops):
+        # Function entry points count calls, and loop heads count
+        # iterations, until the function they are in gets hot.
+        code = self.compiled.code
+        for addr in self.compiled.functions.values():
+            ops[addr.value] = self.make_counter(ops, addr.value, addr.value)
+        for addr in range(len(code)):
+            if code.get_class(addr) is not instfl.InstJmp:
+                continue
+            inst = code[addr]
+            if inst.value <= addr:
+                start, end = self.func_range(addr)
+                if start < inst.value:
+                    ops[inst.value] = self.make_counter(ops, inst.value, start)
+        return ops
+
+    def make_counter(self, ops, addr, funcaddr):
+        interp = self.compiled.get_inst(addr).lower(self.compiled)
+
+        def count_calls(fr):
+            cnt = self.call_counts.get(funcaddr, 0) + 1
+            self.call_counts[funcaddr] = cnt
+            if cnt < self.threshold or funcaddr in self.sources:
+                interp(fr)
+                return
+            self.compile_function(ops, funcaddr)
+            ops[addr](fr)
+        return count_calls
+
+    def func_range(self, addr):
+        start = 0
+        end = len(self.compiled.code)
+        for func in self.compiled.functions.values():
+            if start <= func.value <= addr:
+                start = func.value
+            elif addr < func.value < end:
+                end = func.value
+        return (start, end)
+
+    def get_inst(self, addr):
+        # Superinstructions leave the originals in place after them.
+        inst = self.compiled.get_inst(addr)
+        if isinstance(inst, InstFused):
+            inst = inst.parts[0]
+        return inst
+
+    def find_leaders(self, start, end):
+        leaders = set([start])
+        for addr in range(start, end):
+            inst = self.get_inst(addr)
+            if type(inst) in (
+                instfl.InstJmp, instfl.InstJmpIfFalse,
+                instfl.InstForNext, instfl.InstForeachNext,
+            ):
+                leaders.add(inst.value)
+                leaders.add(addr + 1)
+            elif type(inst) is instfl.InstTry:
+                leaders.add(inst.value)
+            elif isinstance(inst, barrier_types):
+                leaders.add(addr + 1)
+            elif type(inst) is instst.InstPushItem:
+                val = inst.value
+                if (
+                    isinstance(val, si.Address) and
+                    val.prog == self.compiled.program
+                ):
+                    leaders.add(val.value)
+        return sorted(a for a in leaders if start <= a < end)
+
+    def inline_op(self, addr, end, env):
+        # Returns (instruction count, [(need, delta)...], source lines),
+        # or None if the instruction has to run through its primitive.
+        inst = self.get_inst(addr)
+        typ = type(inst)
+        if typ is instst.InstPushItem:
+            return self.inline_push(addr, inst.value, env)
+        if typ in (instst.InstFuncVar, instst.InstGlobalVar):
+            nxt = self.get_inst(addr + 1) if addr + 1 < end else None
+            return self.inline_var(inst, nxt)
+        if typ in shuffle_ops:
+            need, delta, src = shuffle_ops[typ]
+            return (1, [(need, delta)], [src])
+        if typ in int_binary_ops:
+            src = [
+                "x = stk[-2]",
+                "y = stk[-1]",
+                "if type(x) is int and type(y) is int:",
+                "    del stk[-1]",
+                "    stk[-1] = %s" % int_binary_ops[typ],
+                "else:",
+            ]
+            src.extend("    " + line for line in self.generic_op(addr))
+            return (1, [(2, -1)], src)
+        return None
+
+    def inline_push(self, addr, val, env):
+        if type(val) not in constant_types:
+            return None
+        if type(val) is str and len(val) > BUFFER_LEN:
+            return None
+        if type(val) in (int, str):
+            const = repr(val)
+        else:
+            const = "c_%d" % addr
+            env[const] = val
+        return (1, [(0, 1)], ["stk.append(%s)" % const])
+
+    def inline_var(self, inst, nxt):
+        # A variable push, fused with a following fetch or store.
+        isfunc = type(inst) is instst.InstFuncVar
+        vnum = inst.varnum
+        if type(nxt) is instst.InstAt:
+            if isfunc:
+                src = "stk.append(frame.variable_get(%d))" % vnum
+            else:
+                src = "stk.append(fr.globalvar_get(%d))" % vnum
+            return (2, [(0, 1), (1, 0)], [src])
+        if type(nxt) is instst.InstBang:
+            if isfunc:
+                src = "frame.variable_set(%d, stk.pop())" % vnum
+            else:
+                src = "fr.globalvar_set(%d, stk.pop())" % vnum
+            return (2, [(0, 1), (2, -2)], [src])
+        vtype = "FuncVar" if isfunc else "GlobalVar"
+        src = "stk.append(%s(%d))" % (vtype, vnum)
+        return (1, [(0, 1)], [src])
+
+    def generic_op(self, addr):
+        return [
+            "i = %d" % addr,
+            "frame.pcnum = %d" % addr,
+            "op_%d(fr)" % addr,
+        ]
+
+    def emit_exit(self, src, addr):
+        src.emit("n += %d - bs" % (addr + 1))
+        src.emit("return n")
+
+    def segment_guard(self, ops):
+        # Returns the conditions under which a run of inlined ops can't
+        # underflow or overflow the stack.
+        depth = 0
+        need = 0
+        grow = 0
+        for addr, cnt, effects, lines, slow in ops:
+            for opneed, delta in effects:
+                need = max(need, opneed - depth)
+                depth += delta
+                grow = max(grow, depth)
+        conds = []
+        if need > 0:
+            conds.append("len(stk) - stk.lock >= %d" % need)
+        if grow > 0:
+            conds.append("len(stk) <= %d" % (MAX_STACK - grow))
+        return conds
+
+    def emit_segment(self, src, ops):
+        # A run of inlined ops, guarded so the fast path can't underflow
+        # or overflow the stack.  If the guard fails, each op is run by
+        # its primitive instead, which raises the same errors.
+        conds = self.segment_guard(ops)
+        if conds:
+            src.emit("if %s:" % " and ".join(conds))
+            src.indent += 1
+        for addr, cnt, effects, lines, slow in ops:
+            for line in lines:
+                src.emit(line)
+        if conds:
+            src.indent -= 1
+            src.emit("else:")
+            src.indent += 1
+            for addr, cnt, effects, lines, slow in ops:
+                for line in slow:
+                    src.emit(line)
+            src.indent -= 1
+
+    def emit_block(self, src, start, end, env):
+        src.emit("bs = %d" % start)
+        segment = []
+        addr = start
+        while addr < end:
+            inst = self.get_inst(addr)
+            typ = type(inst)
+            if typ in (instfl.InstJmp, instfl.InstJmpIfFalse):
+                break
+            res = self.inline_op(addr, end, env)
+            if res:
+                cnt, effects, lines = res
+                slow = []
+                for a in range(addr, addr + cnt):
+                    env["op_%d" % a] = self.get_inst(a).execute
+                    slow.extend(self.generic_op(a))
+                segment.append((addr, cnt, effects, lines, slow))
+                addr += cnt
+                continue
+            if segment:
+                self.emit_segment(src, segment)
+                segment = []
+            if not self.emit_generic(src, addr, inst, env):
+                return
+            addr += 1
+        self.emit_block_end(src, start, end, addr, segment)
+
+    def emit_generic(self, src, addr, inst, env):
+        # Runs an instruction through its primitive.  Returns False if
+        # the block ends there, as it's a barrier.
+        env["op_%d" % addr] = inst.execute
+        for line in self.generic_op(addr):
+            src.emit(line)
+        if isinstance(inst, barrier_types):
+            self.emit_exit(src, addr)
+            return False
+        src.emit(
+            "if frame.pcnum != %d or not call_stack or "
+            "call_stack[-1] is not frame:" % addr
+        )
+        src.indent += 1
+        self.emit_exit(src, addr)
+        src.indent -= 1
+        return True
+
+    def emit_block_end(self, src, start, end, addr, segment):
+        # Emits the rest of the segment, and the jump, branch, or fall
+        # through to the next block.
+        inst = self.get_inst(addr) if addr < end else None
+        if type(inst) is instfl.InstJmpIfFalse:
+            slow = [
+                "i = %d" % addr,
+                "frame.pcnum = %d" % addr,
+                "v = fr.data_pop()",
+            ]
+            segment.append((addr, 1, [(1, -1)], ["v = stk.pop()"], slow))
+            self.emit_segment(src, segment)
+            src.emit("n += %d" % (addr + 1 - start))
+            src.emit("pc = %d if v else %d" % (addr + 1, inst.value))
+            src.emit("continue")
+            return
+        if segment:
+            self.emit_segment(src, segment)
+        if inst is not None:
+            src.emit("n += %d" % (addr + 1 - start))
+            src.emit("pc = %d" % inst.value)
+        else:
+            src.emit("n += %d" % (end - start))
+            src.emit("pc = %d" % end)
+        src.emit("continue")
+
+    def generate(self, start, end, env):
+        leaders = self.find_leaders(start, end)
+        src = MufJitSource()
+        src.emit("def jit_func(fr, frame, pc, budget):")
+        src.indent += 1
+        src.emit("stk = fr.data_stack")
+        src.emit("call_stack = fr.call_stack")
+        src.emit("n = 0")
+        src.emit("i = bs = pc")
+        src.emit("try:")
+        src.indent += 1
+        src.emit("while True:")
+        src.indent += 1
+        for num, leader in enumerate(leaders):
+            bend = leaders[num + 1] if num + 1 < len(leaders) else end
+            src.emit("%s pc == %d:" % ("if" if not num else "elif", leader))
+            src.indent += 1
+            src.emit("if n + %d > budget:" % (bend - leader))
+            src.emit("    break")
+            self.emit_block(src, leader, bend, env)
+            src.indent -= 1
+        src.emit("else:")
+        src.emit("    break")
+        src.indent -= 1
+        src.emit("if n:")
+        src.emit("    frame.pcnum = pc - 1")
+        src.emit("return n")
+        src.indent -= 1
+        src.emit("except MufBreakExecution:")
+        src.emit("    n += i - bs + 1")
+        src.emit("    raise")
+        src.emit("except Exception:")
+        src.emit("    n += i - bs + 1")
+        src.emit("    if call_stack and call_stack[-1] is frame:")
+        src.emit("        frame.pcnum = i")
+        src.emit("    raise")
+        src.emit("finally:")
+        src.emit("    if n:")
+        src.emit("        fr.cycles += n - 1")
+        src.emit("        fr.slice_cycles += n - 1")
+        return (leaders, src.get_source())
+
+    def compile_function(self, ops, addr):
+        start, end = self.func_range(addr)
+        env = {
+            "MufBreakExecution": MufBreakExecution,
+            "MufRuntimeError": MufRuntimeError,
+            "FuncVar": si.FuncVar,
+            "GlobalVar": si.GlobalVar,
+        }
+        leaders, source = self.generate(start, end, env)
+        self.sources[addr] = source
+        name = "<jit #%d addr %d>" % (self.compiled.program, addr)
+        exec(compile(source, name, "exec"), env)
+        jitfunc = env["jit_func"]
+        for leader in leaders:
+            interp = self.compiled.get_inst(leader).lower(self.compiled)
+            ops[leader] = self.make_entry(jitfunc, leader, interp)
+
+    def make_entry(self, jitfunc, leader, interp):
+        def jit_entry(fr):
+            # Tracing and breakpoints need the interpreter's per-step checks.
+            if fr.trace or fr.break_type or fr.breakpoints:
+                interp(fr)
+                return
+            budget = fr.slice_limit - fr.slice_cycles + 1
+            if not jitfunc(fr, fr.call_stack[-1], leader, budget):
+                interp(fr)
+        return jit_entry
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
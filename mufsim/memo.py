@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+import mufsim.stackitems as si
+
+
+def freeze_item(val):
+    # Returns a hashable key for a stack item, or raises TypeError if its
+    # value can change, or isn't something a pure function can depend on.
+    # Types are part of the key, so 1 and 1.0 never share an entry.
+    typ = type(val)
+    if typ is int or typ is float or typ is str:
+        return (typ, val)
+    if typ is si.DBRef:
+        return (typ, val.value)
+    if typ is si.Address:
+        return (typ, val.prog, val.value)
+    if typ is si.MufList and not val.pinned:
+        return (typ, tuple(freeze_item(x) for x in val))
+    if typ is si.MufDict and not val.pinned:
+        return (typ, tuple(
+            (freeze_item(k), freeze_item(v)) for k, v in val.items()
+        ))
+    raise TypeError("Can't memoize %s" % typ.__name__)
+
+
+# Results of calls to functions declared with $pragma pure, keyed by the
+# function address and its arguments.  The least recently used entries
+# are dropped once the cache is full.
+class MufMemoCache(object):
+    MAX_ENTRIES = 1024
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.hits = {}
+        self.misses = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, addr, args):
+        # Returns the key to store the results under, and the cached
+        # results or None.  The key is None if the call can't be cached.
+        try:
+            key = (addr, tuple(freeze_item(x) for x in args))
+        except TypeError:
+            return (None, None)
+        results = self.entries.get(key)
+        if results is None:
+            self.misses[addr] = self.misses.get(addr, 0) + 1
+        else:
+            self.hits[addr] = self.hits.get(addr, 0) + 1
+            self.entries.move_to_end(key)
+        return (key, results)
+
+    def store(self, key, results):
+        try:
+            for x in results:
+                freeze_item(x)
+        except TypeError:
+            return
+        self.entries[key] = tuple(results)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.MAX_ENTRIES:
+            self.entries.popitem(last=False)
+
+    def get_stats(self, addr):
+        # Returns the hits, misses, and cached entries for a function.
+        cnt = sum(1 for key in self.entries if key[0] == addr)
+        return (self.hits.get(addr, 0), self.misses.get(addr, 0), cnt)
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
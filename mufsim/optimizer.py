@@ -0,0 +1,444 @@
+import copy
+import mufsim.stackitems as si
+from mufsim.errors import MufRuntimeError
+from mufsim.datastack import MufDataStack
+from mufsim.bytecode import operand_key
+
+import mufsim.insts.flow as instfl
+import mufsim.insts.stack as instst
+
+
+# Primitives with no side effects beyond the data stack, which are safe
+# to evaluate at compile time when all of their arguments are constants.
+foldable_primitives = set([
+    "+", "-", "*", "/", "%", "int", "float", "abs", "sign", "fabs",
+    "bitshift", "bitor", "bitxor", "bitand", "pow", "sqrt", "ceil", "floor",
+    "fmod", "strtof", "ftostr",
+    "or", "xor", "and", "not", "=", "!=", "<", "<=", ">", ">=",
+    "toupper", "tolower", "strlen", "strcat", "instr", "instring",
+    "rinstr", "rinstring", "strcut", "midstr", "subst", "strcmp",
+    "strncmp", "stringcmp", "stringpfx", "striplead", "striptail",
+    "atoi", "intostr", "itoc", "ctoi",
+    "pop", "dup", "swap", "over", "rot", "-rot", "nip", "tuck",
+])
+
+constant_types = (int, float, str, si.DBRef)
+
+jump_types = instfl.relative_jump_types
+
+terminal_types = (instfl.InstJmp, instfl.InstExit, instfl.InstAbort)
+
+# Instructions that need a call frame of their own, so functions using
+# them are never inlined.
+inline_barrier_types = (
+    instfl.InstFunc, instfl.InstExecute, instfl.InstCall,
+    instfl.InstTry, instfl.InstTryPop, instst.InstCaller,
+)
+
+loop_types = (instfl.InstFor, instfl.InstForeach)
+
+# Largest function body, in instructions, that gets inlined at level 2.
+INLINE_BUDGET = 16
+
+
+class MufOptimizer(object):
+    def __init__(self, comp, level=1):
+        self.compiled = comp
+        self.level = level
+        self.refs = {}
+        self.forward = {}
+        self.funcinsts = {}
+        self.inlined = {}
+        self.inline_slots = {}
+        self.evalfr = None
+
+    def optimize(self, code):
+        if self.level < 1 or not code:
+            return code
+        self.link(code)
+        optpasses = [
+            self.thread_jumps,
+            self.fold_constants,
+            self.remove_noops,
+            self.remove_unreachable,
+        ]
+        if self.level >= 2:
+            optpasses.append(self.inline_calls)
+        optpasses.append(self.mark_tail_calls)
+        changed = True
+        while changed:
+            changed = False
+            for optpass in optpasses:
+                code, passchanged = optpass(code)
+                changed = changed or passchanged
+        self.relink(code)
+        return code
+
+    def is_local_addr(self, val):
+        return (
+            isinstance(val, si.Address) and
+            val.prog == self.compiled.program
+        )
+
+    def link(self, code):
+        # Turn absolute addresses into references to instruction objects,
+        # so code can be freely inserted or removed before relinking.
+        self.refs = {}
+        self.forward = {}
+        for inst in code:
+            if isinstance(inst, jump_types):
+                self.refs[inst] = code[inst.value]
+            elif type(inst) is instst.InstPushItem:
+                if self.is_local_addr(inst.value):
+                    self.refs[inst] = code[inst.value.value]
+        self.funcinsts = {
+            name: code[addr.value]
+            for name, addr in self.compiled.functions.items()
+        }
+
+    def resolve(self, inst):
+        while inst in self.forward:
+            inst = self.forward[inst]
+        return inst
+
+    def target(self, inst):
+        return self.resolve(self.refs[inst])
+
+    def labels(self, code):
+        out = set(self.target(inst) for inst in self.refs)
+        out.update(self.resolve(inst) for inst in self.funcinsts.values())
+        return out
+
+    def replace(self, code, start, end, newinsts):
+        # References to the first replaced instruction move to its
+        # replacement, or to whatever instruction follows the removed run.
+        follow = code[end] if end < len(code) else None
+        for inst in code[start:end]:
+            if inst in self.refs:
+                del self.refs[inst]
+            self.forward[inst] = newinsts[0] if newinsts else follow
+        code[start:end] = newinsts
+
+    def relink(self, code):
+        index = {inst: addr for addr, inst in enumerate(code)}
+        prog = self.compiled.program
+        for inst in code:
+            if inst not in self.refs:
+                continue
+            addr = index[self.target(inst)]
+            if type(inst) is instst.InstPushItem:
+                inst.value = si.Address(addr, prog)
+            else:
+                inst.value = addr
+        self.relink_functions(index)
+        self.record_inlined(code)
+
+    def relink_functions(self, index):
+        comp = self.compiled
+        prog = comp.program
+        lastname = None
+        for name, addr in comp.functions.items():
+            if addr is comp.lastfunction:
+                lastname = name
+        for name, inst in self.funcinsts.items():
+            comp.functions[name] = si.Address(index[self.resolve(inst)], prog)
+            if name in comp.publics:
+                comp.publics[name] = comp.functions[name]
+        if lastname:
+            comp.lastfunction = comp.functions[lastname]
+
+    def record_inlined(self, code):
+        # Remember which runs of code came from inlined functions, so the
+        # debugger can still show the original function name.
+        comp = self.compiled
+        comp.inlined = []
+        for addr, inst in enumerate(code):
+            name = self.inlined.get(inst)
+            if name is None:
+                continue
+            if comp.inlined and comp.inlined[-1][1] == addr and comp.inlined[-1][2] == name:
+                start, end, name = comp.inlined.pop()
+                comp.inlined.append((start, addr + 1, name))
+            else:
+                comp.inlined.append((addr, addr + 1, name))
+
+    def thread_jumps(self, code):
+        changed = False
+        for addr, inst in enumerate(code):
+            if inst not in self.refs or not isinstance(inst, jump_types):
+                continue
+            targ = self.target(inst)
+            seen = set([inst])
+            while type(targ) is instfl.InstJmp and targ not in seen:
+                seen.add(targ)
+                targ = self.target(targ)
+            if targ is not self.refs[inst]:
+                self.refs[inst] = targ
+                changed = True
+        addr = 0
+        while addr < len(code) - 1:
+            inst = code[addr]
+            if (
+                type(inst) in (instfl.InstJmp, instfl.InstJmpIfFalse) and
+                self.target(inst) is code[addr + 1]
+            ):
+                # A jump to the next instruction does nothing, beyond the
+                # conditional jump still consuming its test value.
+                if type(inst) is instfl.InstJmp:
+                    newinsts = []
+                else:
+                    newinsts = [instst.InstPop(inst.line)]
+                self.replace(code, addr, addr + 1, newinsts)
+                changed = True
+            addr += 1
+        return code, changed
+
+    def evaluate(self, consts, inst):
+        # Imported here, as mufsim.process itself imports the compiler.
+        from mufsim.process import MufProcess
+        if self.evalfr is None:
+            self.evalfr = MufProcess(None)
+        fr = self.evalfr
+        fr.data_stack = MufDataStack(consts)
+        fr.catch_stack = []
+        fr.fp_errors = 0
+        try:
+            type(inst)(inst.line).execute(fr)
+        except (
+            MufRuntimeError, ArithmeticError, LookupError, ValueError,
+            TypeError
+        ):
+            return None
+        if fr.fp_errors:
+            return None
+        if not all(type(val) in constant_types for val in fr.data_stack):
+            return None
+        return fr.data_stack
+
+    def fold_constants(self, code):
+        changed = False
+        labels = self.labels(code)
+        addr = 0
+        while addr < len(code):
+            inst = code[addr]
+            if inst.prim_name not in foldable_primitives:
+                addr += 1
+                continue
+            start = addr
+            while (
+                start > 0 and
+                type(code[start - 1]) is instst.InstPushItem and
+                type(code[start - 1].value) in constant_types and
+                (start == addr or code[start] not in labels)
+            ):
+                start -= 1
+            if start == addr or inst in labels:
+                addr += 1
+                continue
+            consts = [prim.value for prim in code[start:addr]]
+            results = self.evaluate(consts, inst)
+            if results is None:
+                addr += 1
+                continue
+            # Leave alone any leading constants the primitive didn't touch.
+            # They're compared by operand_key(), so 0.0 and -0.0 differ.
+            keep = 0
+            while (
+                keep < len(consts) and keep < len(results) and
+                operand_key(consts[keep]) == operand_key(results[keep])
+            ):
+                keep += 1
+            start += keep
+            line = code[start].line
+            newinsts = [
+                instst.InstPushItem(line, val)
+                for val in results[keep:]
+            ]
+            self.replace(code, start, addr + 1, newinsts)
+            labels = self.labels(code)
+            changed = True
+            addr = start + len(newinsts)
+        return code, changed
+
+    def remove_noops(self, code):
+        changed = False
+        labels = self.labels(code)
+        addr = 0
+        while addr < len(code) - 1:
+            if (
+                type(code[addr]) is instst.InstDup and
+                type(code[addr + 1]) is instst.InstPop and
+                code[addr + 1] not in labels
+            ):
+                self.replace(code, addr, addr + 2, [])
+                labels = self.labels(code)
+                changed = True
+                continue
+            addr += 1
+        return code, changed
+
+    def inline_body(self, body):
+        # Returns True if a function body is small and simple enough to
+        # be copied in place of a call to it.
+        if not body or type(body[-1]) is not instfl.InstExit:
+            return False
+        if len(body) - 1 > INLINE_BUDGET:
+            return False
+        if not all(self.inline_safe(body, pos) for pos in range(len(body))):
+            return False
+        # Loops live in the call frame, and exiting a function drops them.
+        exits = sum(1 for inst in body if type(inst) is instfl.InstExit)
+        loops = any(isinstance(inst, loop_types) for inst in body)
+        if loops and exits > 1:
+            return False
+        return True
+
+    def inline_safe(self, body, pos):
+        # Returns True if the instruction at pos still works when the
+        # body is copied into another function.
+        inst = body[pos]
+        if isinstance(inst, inline_barrier_types):
+            return False
+        if inst in self.refs and self.target(inst) not in body:
+            return False
+        if type(inst) is instst.InstPushItem:
+            return not isinstance(inst.value, si.Address)
+        if type(inst) is instst.InstFuncVar:
+            # Variable references mustn't escape the function.
+            if pos + 1 >= len(body):
+                return False
+            return type(body[pos + 1]) in (instst.InstAt, instst.InstBang)
+        return True
+
+    def get_inline_slots(self, caller, callee):
+        # Callee variables get their own slots at the end of the caller's
+        # frame, shared by every place the callee is inlined into it.
+        key = (caller.funcname, callee.funcname)
+        if key not in self.inline_slots:
+            comp = self.compiled
+            callervars = comp.func_vars.setdefault(caller.funcname, [])
+            while len(callervars) < caller.varcount:
+                callervars.append("")
+            base = len(callervars)
+            calleevars = list(comp.func_vars.get(callee.funcname, []))
+            while len(calleevars) < callee.varcount:
+                calleevars.append("")
+            for vname in calleevars:
+                callervars.append("%s:%s" % (callee.funcname, vname))
+            self.inline_slots[key] = (base, len(calleevars))
+        return self.inline_slots[key]
+
+    def inline_call(self, caller, callee, body, follow, line):
+        base, varcount = self.get_inline_slots(caller, callee)
+        varnames = self.compiled.func_vars[caller.funcname]
+        newinsts = []
+        for vnum in range(varcount - 1, -1, -1):
+            vname = varnames[base + vnum]
+            if vnum >= callee.varcount:
+                newinsts.append(instst.InstPushItem(line, 0))
+            newinsts.append(instst.InstFuncVar(line, base + vnum, vname))
+            newinsts.append(instst.InstBang(line))
+        clones = {}
+        for pos, inst in enumerate(body):
+            if type(inst) is instfl.InstExit:
+                if pos == len(body) - 1:
+                    clones[inst] = follow
+                    continue
+                clone = instfl.InstJmp(inst.line)
+                clone.value = 0
+                self.refs[clone] = follow
+            else:
+                clone = copy.copy(inst)
+                if type(inst) is instst.InstFuncVar:
+                    clone.varnum = base + inst.varnum
+                    clone.varname = varnames[clone.varnum]
+            clones[inst] = clone
+            newinsts.append(clone)
+            self.inlined[clone] = self.inlined.get(inst, callee.funcname)
+        for inst in body:
+            if inst in self.refs:
+                self.refs[clones[inst]] = clones[self.target(inst)]
+        for inst in newinsts:
+            self.inlined.setdefault(inst, callee.funcname)
+        return newinsts
+
+    def inline_calls(self, code):
+        changed = False
+        labels = self.labels(code)
+        bodies = {}
+        starts = [
+            addr for addr, inst in enumerate(code)
+            if type(inst) is instfl.InstFunc
+        ]
+        for start, end in zip(starts, starts[1:] + [len(code)]):
+            body = code[start + 1:end]
+            # Calls to pure functions are kept, to go through the memo cache.
+            if code[start].funcname in self.compiled.pure_funcs:
+                continue
+            if self.inline_body(body):
+                bodies[code[start]] = body
+        caller = None
+        addr = 0
+        while addr < len(code) - 2:
+            inst = code[addr]
+            if type(inst) is instfl.InstFunc:
+                caller = inst
+            if (
+                caller is None or
+                type(inst) is not instst.InstPushItem or
+                inst not in self.refs or
+                not isinstance(code[addr + 1], instfl.InstExecute) or
+                code[addr + 1] in labels
+            ):
+                addr += 1
+                continue
+            callee = self.target(inst)
+            if callee not in bodies or callee is caller:
+                addr += 1
+                continue
+            newinsts = self.inline_call(
+                caller, callee, bodies[callee], code[addr + 2], inst.line
+            )
+            self.replace(code, addr, addr + 2, newinsts)
+            labels = self.labels(code)
+            changed = True
+            addr += len(newinsts)
+        return code, changed
+
+    def mark_tail_calls(self, code):
+        changed = False
+        for addr in range(len(code) - 1):
+            inst = code[addr]
+            if (
+                type(inst) is instfl.InstExecute and
+                type(code[addr + 1]) is instfl.InstExit
+            ):
+                newinst = instfl.InstTailExecute(inst.line)
+                self.replace(code, addr, addr + 1, [newinst])
+                changed = True
+        return code, changed
+
+    def remove_unreachable(self, code):
+        changed = False
+        labels = self.labels(code)
+        addr = 0
+        while addr < len(code):
+            inst = code[addr]
+            addr += 1
+            if type(inst) not in terminal_types:
+                continue
+            end = addr
+            while (
+                end < len(code) and
+                code[end] not in labels and
+                type(code[end]) is not instfl.InstFunc
+            ):
+                end += 1
+            if end > addr:
+                self.replace(code, addr, end, [])
+                labels = self.labels(code)
+                changed = True
+        return code, changed
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -0,0 +1,759 @@
+# Immutable containers used to back MUF arrays.  Updates return a new
+# container that shares all unchanged structure with the old one, so a
+# functional array update costs O(log n) instead of a full copy.
+
+from array import array
+from itertools import islice
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+# A vector stored as a 32-way trie, with the last partial leaf kept aside
+# as a tail so that appends rarely touch the trie.  Nodes are plain lists
+# that are never modified once shared.
+class PersistentVector(object):
+    typecode = None
+
+    def __init__(self, count=0, shift=BITS, root=None, tail=None):
+        self.count = count
+        self.shift = shift
+        self.root = [] if root is None else root
+        self.tail = [] if tail is None else tail
+
+    @classmethod
+    def from_list(cls, items):
+        items = list(items)
+        cnt = len(items)
+        tailoff = cls.tail_offset(cnt)
+        nodes = [items[i:i + WIDTH] for i in range(0, tailoff, WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [nodes[i:i + WIDTH] for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+        return cls(cnt, shift, nodes, items[tailoff:])
+
+    @staticmethod
+    def tail_offset(cnt):
+        if cnt < WIDTH:
+            return 0
+        return ((cnt - 1) >> BITS) << BITS
+
+    def __len__(self):
+        return self.count
+
+    def leaf_for(self, idx):
+        if idx >= self.tail_offset(self.count):
+            return self.tail
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node[(idx >> level) & MASK]
+            level -= BITS
+        return node
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.to_list()[idx]
+        if idx < 0:
+            idx += self.count
+        if idx < 0 or idx >= self.count:
+            raise IndexError("vector index out of range")
+        return self.leaf_for(idx)[idx & MASK]
+
+    def get(self, idx, dflt=None):
+        # Fast read for an index that may be out of range.  Negative
+        # indexes don't count from the end here.
+        if idx < 0 or idx >= self.count:
+            return dflt
+        return self.leaf_for(idx)[idx & MASK]
+
+    def __iter__(self):
+        tailoff = self.tail_offset(self.count)
+        for idx in range(0, tailoff, WIDTH):
+            for val in self.leaf_for(idx):
+                yield val
+        for val in self.tail:
+            yield val
+
+    def __reversed__(self):
+        return reversed(self.to_list())
+
+    def __eq__(self, other):
+        if not isinstance(other, VECTOR_TYPES):
+            return NotImplemented
+        return vectors_equal(self, other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __lt__(self, other):
+        if isinstance(other, VECTOR_TYPES):
+            other = other.to_list()
+        return self.to_list() < other
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def to_list(self):
+        return list(self)
+
+    def set(self, idx, val):
+        # Setting the index just past the end appends.
+        if idx == self.count:
+            return self.append(val)
+        if idx < 0 or idx > self.count:
+            raise IndexError("vector index out of range")
+        if idx >= self.tail_offset(self.count):
+            tail = list(self.tail)
+            tail[idx & MASK] = val
+            return PersistentVector(self.count, self.shift, self.root, tail)
+        root = self.assoc(self.shift, self.root, idx, val)
+        return PersistentVector(self.count, self.shift, root, self.tail)
+
+    def assoc(self, level, node, idx, val):
+        node = list(node)
+        if level == 0:
+            node[idx & MASK] = val
+        else:
+            sub = (idx >> level) & MASK
+            node[sub] = self.assoc(level - BITS, node[sub], idx, val)
+        return node
+
+    def append(self, val):
+        cnt = self.count
+        if not cnt:
+            return make_vector([val])
+        if cnt - self.tail_offset(cnt) < WIDTH:
+            return PersistentVector(cnt + 1, self.shift, self.root, self.tail + [val])
+        shift = self.shift
+        if (cnt >> BITS) > (1 << shift):
+            root = [self.root, self.new_path(shift, self.tail)]
+            shift += BITS
+        else:
+            root = self.push_tail(shift, self.root, self.tail)
+        return PersistentVector(cnt + 1, shift, root, [val])
+
+    def push_tail(self, level, parent, tailnode):
+        sub = ((self.count - 1) >> level) & MASK
+        node = list(parent)
+        if level == BITS:
+            child = tailnode
+        elif sub < len(parent):
+            child = self.push_tail(level - BITS, parent[sub], tailnode)
+        else:
+            child = self.new_path(level - BITS, tailnode)
+        if sub < len(node):
+            node[sub] = child
+        else:
+            node.append(child)
+        return node
+
+    def new_path(self, level, node):
+        while level > 0:
+            node = [node]
+            level -= BITS
+        return node
+
+    def extend(self, vals):
+        vec = self
+        for val in vals:
+            vec = vec.append(val)
+        return vec
+
+    def splice(self, start, end, vals=()):
+        # Replaces items start through end-1.  Appends are done
+        # incrementally; anything else rebuilds the vector.
+        if start >= self.count and end >= self.count and self.count:
+            return self.extend(vals)
+        items = self.to_list()
+        items[start:end] = vals
+        return make_vector(items)
+
+    def find(self, val, invert=False):
+        # Returns the indexes of items equal to val, or not equal if invert.
+        if invert:
+            return [i for i, x in enumerate(self) if x != val]
+        return [i for i, x in enumerate(self) if x == val]
+
+    def view(self, start, stop):
+        return VectorView(self, start, stop)
+
+    def reversed(self):
+        return VectorView(self, 0, self.count, True)
+
+
+# Lists whose items are all ints, or all floats, are kept unboxed in an
+# array.array instead.  Several vectors may share one array, each using
+# only its first count items, so an append to the newest vector can grow
+# the array in place.  Storing anything of another type falls back to a
+# PersistentVector.
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+
+def numeric_typecode(items):
+    if not items:
+        return None
+    types = set(map(type, items))
+    if types == {int}:
+        if INT_MIN <= min(items) and max(items) <= INT_MAX:
+            return 'q'
+    elif types == {float}:
+        return 'd'
+    return None
+
+
+def make_vector(items):
+    if isinstance(items, VECTOR_TYPES):
+        return items
+    if isinstance(items, array):
+        return NumericVector(items)
+    items = list(items)
+    code = numeric_typecode(items)
+    if code:
+        return NumericVector(array(code, items))
+    return PersistentVector.from_list(items)
+
+
+class NumericVector(object):
+    def __init__(self, arr, count=None):
+        self.arr = arr
+        self.count = len(arr) if count is None else count
+        self.typecode = arr.typecode
+
+    def __len__(self):
+        return self.count
+
+    def fits(self, val):
+        if self.typecode == 'q':
+            return type(val) is int and INT_MIN <= val <= INT_MAX
+        return type(val) is float
+
+    def items(self):
+        # The backing array, trimmed to this vector's items.
+        if len(self.arr) == self.count:
+            return self.arr
+        return self.arr[:self.count]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.items()[idx]
+        if idx < 0:
+            idx += self.count
+        if idx < 0 or idx >= self.count:
+            raise IndexError("vector index out of range")
+        return self.arr[idx]
+
+    def get(self, idx, dflt=None):
+        if idx < 0 or idx >= self.count:
+            return dflt
+        return self.arr[idx]
+
+    def __iter__(self):
+        return islice(self.arr, self.count)
+
+    def __reversed__(self):
+        return reversed(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, NumericVector):
+            return self.count == other.count and self.items() == other.items()
+        if not isinstance(other, VECTOR_TYPES):
+            return NotImplemented
+        return vectors_equal(self, other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __lt__(self, other):
+        if isinstance(other, NumericVector):
+            return self.items() < other.items()
+        if isinstance(other, VECTOR_TYPES):
+            other = other.to_list()
+        return self.to_list() < other
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def to_list(self):
+        return self.items().tolist()
+
+    def fallback(self):
+        return PersistentVector.from_list(self.to_list())
+
+    def set(self, idx, val):
+        if idx == self.count:
+            return self.append(val)
+        if idx < 0 or idx > self.count:
+            raise IndexError("vector index out of range")
+        if not self.fits(val):
+            return self.fallback().set(idx, val)
+        arr = self.arr[:self.count]
+        arr[idx] = val
+        return NumericVector(arr)
+
+    def append(self, val):
+        return self.splice(self.count, self.count, [val])
+
+    def extend(self, vals):
+        return self.splice(self.count, self.count, vals)
+
+    def splice(self, start, end, vals=()):
+        vals = list(vals)
+        if not all(self.fits(val) for val in vals):
+            items = self.to_list()
+            items[start:end] = vals
+            return make_vector(items)
+        if start >= self.count and end >= self.count:
+            if len(self.arr) == self.count:
+                # Nobody else has grown the shared array past us yet.
+                self.arr.extend(vals)
+                return NumericVector(self.arr, self.count + len(vals))
+            arr = self.arr[:self.count]
+            arr.extend(vals)
+            return NumericVector(arr)
+        arr = self.arr[:start]
+        arr.extend(vals)
+        arr.extend(self.arr[end:self.count])
+        if not arr:
+            return PersistentVector()
+        return NumericVector(arr)
+
+    def find(self, val, invert=False):
+        # Returns the indexes of items equal to val, or not equal if invert.
+        found = []
+        if type(val) in (int, float):
+            pos = 0
+            try:
+                while True:
+                    pos = self.arr.index(val, pos, self.count)
+                    found.append(pos)
+                    pos += 1
+            except ValueError:
+                pass
+        if not invert:
+            return found
+        found = set(found)
+        return [i for i in range(self.count) if i not in found]
+
+    def view(self, start, stop):
+        return VectorView(self, start, stop)
+
+    def reversed(self):
+        return VectorView(self, 0, self.count, True)
+
+    def sorted(self, reverse=False):
+        return NumericVector(array(self.typecode, sorted(self.items(), reverse=reverse)))
+
+
+# A read-only window onto a range of another vector, optionally reversed.
+# Ranges and reversals of an array share its items this way, until the
+# first write copies just the visible items into a vector of their own.
+class VectorView(object):
+    def __init__(self, parent, start, stop, reverse=False):
+        if isinstance(parent, VectorView):
+            if parent.reverse:
+                start, stop = parent.stop - stop, parent.stop - start
+            else:
+                start, stop = parent.start + start, parent.start + stop
+            reverse = reverse != parent.reverse
+            parent = parent.parent
+        self.parent = parent
+        self.start = start
+        self.stop = stop
+        self.reverse = reverse
+        self.count = stop - start
+        self.typecode = parent.typecode if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.materialize()[idx]
+        if idx < 0:
+            idx += self.count
+        if idx < 0 or idx >= self.count:
+            raise IndexError("vector index out of range")
+        if self.reverse:
+            return self.parent[self.stop - 1 - idx]
+        return self.parent[self.start + idx]
+
+    def get(self, idx, dflt=None):
+        if idx < 0 or idx >= self.count:
+            return dflt
+        if self.reverse:
+            return self.parent.get(self.stop - 1 - idx)
+        return self.parent.get(self.start + idx)
+
+    def positions(self, reverse=False):
+        if reverse == self.reverse:
+            return range(self.start, self.stop)
+        return range(self.stop - 1, self.start - 1, -1)
+
+    def __iter__(self):
+        if self.typecode and not self.reverse:
+            return islice(self.parent.arr, self.start, self.stop)
+        parent = self.parent
+        return (parent[i] for i in self.positions())
+
+    def __reversed__(self):
+        parent = self.parent
+        return (parent[i] for i in self.positions(True))
+
+    def __eq__(self, other):
+        if not isinstance(other, VECTOR_TYPES):
+            return NotImplemented
+        return vectors_equal(self, other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __lt__(self, other):
+        if isinstance(other, VECTOR_TYPES):
+            other = other.to_list()
+        return self.to_list() < other
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def to_list(self):
+        return list(self)
+
+    def materialize(self):
+        if self.typecode:
+            arr = self.parent.arr[self.start:self.stop]
+            if self.reverse:
+                arr.reverse()
+            return NumericVector(arr)
+        return make_vector(self.to_list())
+
+    def set(self, idx, val):
+        return self.materialize().set(idx, val)
+
+    def append(self, val):
+        return self.materialize().append(val)
+
+    def extend(self, vals):
+        return self.materialize().extend(vals)
+
+    def splice(self, start, end, vals=()):
+        return self.materialize().splice(start, end, vals)
+
+    def find(self, val, invert=False):
+        return self.materialize().find(val, invert)
+
+    def view(self, start, stop):
+        return VectorView(self, start, stop)
+
+    def reversed(self):
+        return VectorView(self, 0, self.count, True)
+
+    def sorted(self, reverse=False):
+        return self.materialize().sorted(reverse)
+
+
+VECTOR_TYPES = (PersistentVector, NumericVector, VectorView)
+
+
+def vectors_equal(a, b):
+    # Compares two vectors item by item, without copying either one.
+    return len(a) == len(b) and all(x == y for x, y in zip(a, b))
+
+
+# An ordered map stored as an AVL tree.  Keys are kept in MUF sort order,
+# numbers first, then strings, so iteration never needs a separate sort.
+# Nodes are tuples of (order, key, val, left, right, height).
+def key_order(key):
+    if isinstance(key, (int, float)):
+        return (0, key)
+    if isinstance(key, str):
+        return (2, key)
+    return (1, key)
+
+
+def height(node):
+    return node[5] if node else 0
+
+
+def make_node(order, key, val, left, right):
+    return (order, key, val, left, right, max(height(left), height(right)) + 1)
+
+
+def rotate_right(node):
+    left = node[3]
+    return make_node(
+        left[0], left[1], left[2], left[3],
+        make_node(node[0], node[1], node[2], left[4], node[4]),
+    )
+
+
+def rotate_left(node):
+    right = node[4]
+    return make_node(
+        right[0], right[1], right[2],
+        make_node(node[0], node[1], node[2], node[3], right[3]),
+        right[4],
+    )
+
+
+def balance(order, key, val, left, right):
+    node = make_node(order, key, val, left, right)
+    diff = height(left) - height(right)
+    if diff > 1:
+        if height(left[3]) < height(left[4]):
+            node = make_node(order, key, val, rotate_left(left), right)
+        return rotate_right(node)
+    if diff < -1:
+        if height(right[4]) < height(right[3]):
+            node = make_node(order, key, val, left, rotate_right(right))
+        return rotate_left(node)
+    return node
+
+
+def tree_insert(node, order, key, val):
+    # Returns the new subtree, and whether the key was added.
+    if not node:
+        return (make_node(order, key, val, None, None), True)
+    if order < node[0]:
+        left, added = tree_insert(node[3], order, key, val)
+        return (balance(node[0], node[1], node[2], left, node[4]), added)
+    if order > node[0]:
+        right, added = tree_insert(node[4], order, key, val)
+        return (balance(node[0], node[1], node[2], node[3], right), added)
+    return (make_node(order, key, val, node[3], node[4]), False)
+
+
+def tree_pop_min(node):
+    # Returns the subtree without its leftmost node, and that node.
+    if not node[3]:
+        return (node[4], node)
+    left, minnode = tree_pop_min(node[3])
+    return (balance(node[0], node[1], node[2], left, node[4]), minnode)
+
+
+def tree_delete(node, order):
+    # Returns the new subtree, and whether the key was removed.
+    if not node:
+        return (None, False)
+    if order < node[0]:
+        left, removed = tree_delete(node[3], order)
+        if not removed:
+            return (node, False)
+        return (balance(node[0], node[1], node[2], left, node[4]), True)
+    if order > node[0]:
+        right, removed = tree_delete(node[4], order)
+        if not removed:
+            return (node, False)
+        return (balance(node[0], node[1], node[2], node[3], right), True)
+    if not node[3]:
+        return (node[4], True)
+    if not node[4]:
+        return (node[3], True)
+    right, succ = tree_pop_min(node[4])
+    return (balance(succ[0], succ[1], succ[2], node[3], right), True)
+
+
+def tree_build(items):
+    # Builds a balanced tree from (order, key, val) triples in sort order.
+    if not items:
+        return None
+    mid = len(items) // 2
+    order, key, val = items[mid]
+    return make_node(
+        order, key, val, tree_build(items[:mid]), tree_build(items[mid + 1:])
+    )
+
+
+MISSING = object()
+
+
+# Tree lookups are slow next to a dict, so once a map has been read more
+# than INDEX_READS times, plus once for every 8 items, its items are
+# copied into a dict that serves all later reads.  Maps that are updated
+# between every few reads never build one.
+class PersistentMap(object):
+    INDEX_READS = 4
+
+    def __init__(self, root=None, count=0):
+        self.root = root
+        self.count = count
+        self.index = None
+        self.reads = 0
+
+    @classmethod
+    def from_dict(cls, d):
+        items = {}
+        for key, val in d.items():
+            items[key_order(key)] = (key, val)
+        items = [(order,) + items[order] for order in sorted(items)]
+        return cls(tree_build(items), len(items))
+
+    def __len__(self):
+        return self.count
+
+    def find(self, key):
+        order = key_order(key)
+        node = self.root
+        while node:
+            if order < node[0]:
+                node = node[3]
+            elif order > node[0]:
+                node = node[4]
+            else:
+                return node
+        return None
+
+    def __getitem__(self, key):
+        val = self.get(key, MISSING)
+        if val is MISSING:
+            raise KeyError(key)
+        return val
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def get(self, key, dflt=None):
+        index = self.index
+        if index is None:
+            self.reads += 1
+            if self.reads <= self.INDEX_READS + (self.count >> 3):
+                node = self.find(key)
+                return dflt if node is None else node[2]
+            index = self.index = self.to_dict()
+        try:
+            return index.get(key, dflt)
+        except TypeError:
+            # Unhashable keys are never in the map.
+            return dflt
+
+    def nodes(self):
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node[3]
+            node = stack.pop()
+            yield node
+            node = node[4]
+
+    def __iter__(self):
+        for node in self.nodes():
+            yield node[1]
+
+    def keys(self):
+        return [node[1] for node in self.nodes()]
+
+    def values(self):
+        return [node[2] for node in self.nodes()]
+
+    def items(self):
+        return [(node[1], node[2]) for node in self.nodes()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if not isinstance(other, PersistentMap):
+            return NotImplemented
+        if self.count != other.count:
+            return False
+        return all(
+            a[1] == b[1] and a[2] == b[2]
+            for a, b in zip(self.nodes(), other.nodes())
+        )
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __lt__(self, other):
+        if isinstance(other, PersistentMap):
+            other = other.items()
+        return self.items() < other
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def first(self):
+        node = self.root
+        while node and node[3]:
+            node = node[3]
+        return node
+
+    def last(self):
+        node = self.root
+        while node and node[4]:
+            node = node[4]
+        return node
+
+    def next_node(self, key):
+        # The node with the smallest key after the given one.
+        order = key_order(key)
+        node = self.root
+        found = None
+        while node:
+            if order < node[0]:
+                found = node
+                node = node[3]
+            else:
+                node = node[4]
+        return found
+
+    def prev_node(self, key):
+        # The node with the largest key before the given one.
+        order = key_order(key)
+        node = self.root
+        found = None
+        while node:
+            if order > node[0]:
+                found = node
+                node = node[4]
+            else:
+                node = node[3]
+        return found
+
+    def split(self, key):
+        # Returns maps of the items before the given key, and the rest.
+        order = key_order(key)
+        items = [(node[0], node[1], node[2]) for node in self.nodes()]
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if items[mid][0] < order:
+                lo = mid + 1
+            else:
+                hi = mid
+        return (
+            PersistentMap(tree_build(items[:lo]), lo),
+            PersistentMap(tree_build(items[lo:]), len(items) - lo),
+        )
+
+    def range(self, start, end):
+        # Returns a map of the items with keys from start to end, inclusive.
+        lo = key_order(start)
+        hi = key_order(end)
+        items = [
+            (node[0], node[1], node[2]) for node in self.nodes()
+            if lo <= node[0] <= hi
+        ]
+        return PersistentMap(tree_build(items), len(items))
+
+    def set(self, key, val):
+        root, added = tree_insert(self.root, key_order(key), key, val)
+        return PersistentMap(root, self.count + (1 if added else 0))
+
+    def delete(self, key):
+        root, removed = tree_delete(self.root, key_order(key))
+        if not removed:
+            return self
+        return PersistentMap(root, self.count - 1)
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
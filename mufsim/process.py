@@ -1,4 +1,3 @@
-import copy
 import time
 
 import mufsim.stackitems as si
@@ -7,6 +6,7 @@ from mufsim.compiler import MufCompiler
 from mufsim.logger import log, warnlog, errlog
 from mufsim.errors import MufRuntimeError, MufBreakExecution
 from mufsim.callframe import MufCallFrame
+from mufsim.datastack import MufDataStack, expected_type_error
 from mufsim.events import MufEventQueue
 
 
@@ -30,6 +30,26 @@ class MufProcess(object):
     MODE_FOREGROUND = 1
     MODE_BACKGROUND = 2
 
+    MAX_SLICE_CYCLES = {
+        MODE_PREEMPT: 999999999,
+        MODE_FOREGROUND: 10000,
+        MODE_BACKGROUND: 10000,
+    }
+
+    # Wall time budgets, in seconds, so that a process running expensive
+    # primitives yields as soon as one running cheap ones would.  The
+    # clock is read every SLICE_CHECK_CYCLES instructions.
+    MAX_SLICE_SECS = {
+        MODE_PREEMPT: None,
+        MODE_FOREGROUND: 0.05,
+        MODE_BACKGROUND: 0.05,
+    }
+    SLICE_CHECK_CYCLES = 1000
+
+    ENGINE_DISPATCH = 'dispatch'
+    ENGINE_CLASSIC = 'classic'
+    ENGINE_JIT = 'jit'
+
     def __init__(self, proclist):
         self.proclist = proclist
         self.user = si.DBRef(-1)
@@ -38,7 +58,7 @@ class MufProcess(object):
         self.command = ""
         self.catch_stack = []
         self.call_stack = []
-        self.data_stack = []
+        self.data_stack = MufDataStack()
         self.globalvars = {}
         self.fp_errors = 0
         self.events = MufEventQueue()
@@ -47,8 +67,16 @@ class MufProcess(object):
         self.execution_mode = self.MODE_FOREGROUND
         self.wait_state = ''
         self.trace = False
+        self.engine = self.ENGINE_DISPATCH
         self.cycles = 0
+        self.slice_cycles = 0
+        self.slice_limit = 0
+        self.slice_started = 0.0
         self.runtime = 0.0
+        self.queued_at = 0.0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
         self.breakpoints = []
         self.break_on_error = False
         self.break_type = None
@@ -78,32 +106,41 @@ class MufProcess(object):
     def timer_stop(self, name):
         self.proclist.timer_del(self.pid, name)
 
+    def send_event(self, pid, name, data):
+        self.proclist.send_event(pid, name, data)
+
     def watch_pid(self, pid):
         self.proclist.watch_pid(self.pid, pid)
 
     def kill_pid(self, pid):
-        self.proclist.kill_process(self.pid)
+        self.proclist.kill_process(pid)
 
     def end_process(self):
         self.proclist.process_complete(self.pid)
 
     def fork_process(self):
         newproc = self.proclist.new_process()
-        newproc.program = copy.deepcopy(self.program)
-        newproc.user = copy.deepcopy(self.user)
-        newproc.trigger = copy.deepcopy(self.trigger)
+        # The child shares stack items and array contents with this
+        # process, rather than deep copying them.  See si.fork_copy().
+        memo = {}
+        newproc.program = self.program
+        newproc.user = self.user
+        newproc.trigger = self.trigger
         newproc.command = self.command
-        newproc.globalvar_set(0, copy.deepcopy(self.user))
+        newproc.globalvar_set(0, self.user)
         newproc.globalvar_set(1, si.DBRef(db.getobj(self.user).location))
-        newproc.globalvar_set(2, copy.deepcopy(self.trigger))
+        newproc.globalvar_set(2, self.trigger)
         newproc.globalvar_set(3, self.command)
-        newproc.catch_stack = copy.deepcopy(self.catch_stack)
-        newproc.call_stack = copy.deepcopy(self.call_stack)
-        newproc.data_stack = copy.deepcopy(self.data_stack)
-        newproc.globalvars = copy.deepcopy(self.globalvars)
+        newproc.catch_stack = list(self.catch_stack)
+        newproc.call_stack = [frame.fork(memo) for frame in self.call_stack]
+        newproc.data_stack = self.data_stack.fork(memo)
+        newproc.globalvars = {
+            k: si.fork_copy(v, memo) for k, v in self.globalvars.items()
+        }
         newproc.fp_errors = self.fp_errors
         newproc.breakpoints = self.breakpoints
         newproc.break_on_error = self.break_on_error
+        newproc.engine = self.engine
         newproc.read_wants_blanks = self.read_wants_blanks
         newproc.execution_mode = self.MODE_BACKGROUND
         newproc.proclist.sleep(0.0, newproc.pid)
@@ -130,7 +167,7 @@ class MufProcess(object):
         # Reset program state.
         self.catch_stack = []
         self.call_stack = []
-        self.data_stack = []
+        self.data_stack = MufDataStack()
         self.globalvars = {}
         self.fp_errors = 0
         self.read_wants_blanks = False
@@ -160,12 +197,27 @@ class MufProcess(object):
         return False
 
     def get_compiled(self, prog=-1):
+        # A recompiled program gets a new CompiledMuf, but frames that were
+        # already running it keep the version they entered.  Look up the
+        # code through the newest such frame, if any.
         prog = db.normobj(prog)
         if prog < 0:
             addr = self.curr_addr()
             prog = addr.prog
-        progobj = db.getobj(prog)
-        return progobj.compiled
+        for frame in reversed(self.call_stack):
+            if frame.prog == prog and frame.compiled is not None:
+                return frame.compiled
+        return db.getobj(prog).compiled
+
+    def get_call_compiled(self, prog):
+        # Calls within a program stay in the calling frame's version of
+        # it, since its addresses are only valid there.  Calls into a
+        # program from elsewhere get its latest version.
+        if self.call_stack:
+            frame = self.call_stack[-1]
+            if frame.prog == prog and frame.compiled is not None:
+                return frame.compiled
+        return db.getobj(prog).compiled
 
     def set_trace(self, on_off):
         self.trace = on_off
@@ -204,12 +256,70 @@ class MufProcess(object):
         return self.call_stack[-1].pc_set(addr)
 
     def call_push(self, addr, caller):
+        comp = self.get_call_compiled(addr.prog)
+        varcount = comp.get_frame_size(addr) if comp else 0
         self.call_stack.append(
-            MufCallFrame(copy.deepcopy(addr), caller)
+            MufCallFrame(addr, caller, comp, varcount)
         )
 
+    def call_replace(self, addr, caller):
+        # Tail call.  The new frame takes the place of the current one,
+        # and keeps count of how many frames it stands in for.
+        comp = self.get_call_compiled(addr.prog)
+        varcount = comp.get_frame_size(addr) if comp else 0
+        frame = MufCallFrame(addr, caller, comp, varcount)
+        frame.elided = self.call_stack[-1].elided + 1
+        # Whatever the replaced frame would have returned, this one will.
+        frame.memos = self.call_stack[-1].memos
+        self.call_stack[-1] = frame
+
     def call_pop(self):
-        self.call_stack.pop()
+        frame = self.call_stack.pop()
+        if frame.memos:
+            self.memo_store(frame.memos)
+
+    def call_function(self, addr, caller, tail=False):
+        # A call made by MUF code.  Calls to functions declared pure are
+        # answered from the program's memo cache when possible, in which
+        # case no frame is pushed.  Otherwise the new frame notes where to
+        # store its results when it returns.
+        comp = self.get_call_compiled(addr.prog)
+        memo = None
+        if comp is not None and comp.pure_funcs:
+            argcnt = comp.get_pure_funcs().get(addr.value)
+            if argcnt is not None and self.data_depth() >= argcnt:
+                stk = self.data_stack
+                args = stk[len(stk) - argcnt:]
+                key, results = comp.memo.lookup(addr.value, args)
+                if results is not None:
+                    del stk[len(stk) - argcnt:]
+                    self.data_push_many(results)
+                    if tail:
+                        self.call_pop()
+                    return
+                if key is not None:
+                    memo = (comp.memo, key, len(stk) - argcnt)
+        if tail:
+            self.call_replace(addr, caller)
+        else:
+            self.call_push(addr, caller)
+        if memo:
+            frame = self.call_stack[-1]
+            frame.memos = frame.memos + (memo,)
+        self.pc_advance(-1)
+
+    def memo_store(self, memos):
+        stk = self.data_stack
+        for cache, key, base in memos:
+            if base >= stk.lock and base <= len(stk):
+                cache.store(key, stk[base:])
+
+    def call_depth(self, frames=None):
+        # Frames elided by tail calls still count as call stack levels.
+        stack = self.call_stack
+        if frames is not None:
+            stack = stack[:frames]
+        return len(stack) + sum(cfr.elided for cfr in stack)
 
     def caller_get(self, level=-1):
         return self.call_stack[level].caller
@@ -238,9 +348,12 @@ class MufProcess(object):
 
     def catch_push(self, detailed, addr, lockdepth):
         self.catch_stack.append((detailed, addr, lockdepth))
+        self.data_stack.lock = lockdepth
 
     def catch_pop(self):
-        return self.catch_stack.pop()
+        val = self.catch_stack.pop()
+        self.data_stack.lock = self.catch_locklevel()
+        return val
 
     def catch_is_detailed(self):
         if not self.catch_stack:
@@ -276,8 +389,7 @@ class MufProcess(object):
             warnlog("Caught error in #%d line %d (%s): %s" %
                     (addr.prog, inst.line, str(inst), e))
         # Clear stack down to stacklock
-        while self.data_depth() > self.catch_locklevel():
-            self.data_pop()
+        self.data_stack.truncate()
         if self.catch_is_detailed():
             # Push detailed exception info.
             self.data_push(
@@ -307,45 +419,13 @@ class MufProcess(object):
                 self.raise_expected_type_error(types, isarray=True, argnum=argnum)
 
     def raise_expected_type_error(self, types, isarray=False, argnum=0):
-        types = list(types)
-        type_names = [
-            ("number", [int, float]),
-            ("integer", [int]),
-            ("float", [float]),
-            ("string", [str]),
-            ("list array", [si.MufList]),
-            ("dictionary array", [si.MufDict]),
-            ("dbref", [si.DBRef]),
-            ("array", [si.MufArray, si.MufDict]),
-            ("address", [si.Address]),
-            ("lock", [si.Lock]),
-            ("variable", [si.GlobalVar, si.FuncVar]),
-            ("variable", [si.GlobalVar]),
-            ("variable", [si.FuncVar]),
-        ]
-        expected = []
-        for name, extypes in type_names:
-            found = True
-            for extype in extypes:
-                if extype not in types:
-                    found = False
-                    break
-            if found:
-                for extype in extypes:
-                    types.remove(extype)
-                expected.append(name)
-        expected = " or ".join(expected)
-        arrstr = "array of " if isarray else ""
-        argstr = " ({0})".format(argnum) if argnum else ""
-        msg = "Expected {0}{1} argument.{2}".format(arrstr, expected, argstr)
-        raise MufRuntimeError(msg)
+        raise expected_type_error(types, isarray=isarray, argnum=argnum)
 
     def check_underflow(self, cnt):
-        if self.data_depth() < cnt:
-            raise MufRuntimeError("Stack underflow.")
+        self.data_stack.check_underflow(cnt)
 
     def data_depth(self):
-        return len(self.data_stack) - self.catch_locklevel()
+        return self.data_stack.depth()
 
     def data_full_depth(self):
         return len(self.data_stack)
@@ -357,40 +437,74 @@ class MufProcess(object):
         self.data_push(si.MufDict(x, self.array_pinning))
 
     def data_push(self, x):
-        if isinstance(x, str) and len(x) > self.BUFFER_LEN:
-            raise MufRuntimeError("String overflow.")
-        if isinstance(x, (si.MufList, si.MufDict)) and len(x) > self.MAX_STACK:
-            raise MufRuntimeError("Array overflow.")
-        self.data_stack.append(x)
-        if len(self.data_stack) > self.MAX_STACK:
+        typ = type(x)
+        if typ is str:
+            if len(x) > self.BUFFER_LEN:
+                raise MufRuntimeError("String overflow.")
+        elif typ is si.MufList or typ is si.MufDict:
+            if len(x) > self.MAX_STACK:
+                raise MufRuntimeError("Array overflow.")
+        stk = self.data_stack
+        stk.append(x)
+        if len(stk) > self.MAX_STACK:
             raise MufRuntimeError("Stack overflow.")
 
+    def data_push_many(self, items):
+        # Pushes each of the given items in order, checking limits once.
+        items = list(items)
+        stk = self.data_stack
+        if len(stk) + len(items) > self.MAX_STACK:
+            raise MufRuntimeError("Stack overflow.")
+        for x in items:
+            typ = type(x)
+            if typ is str:
+                if len(x) > self.BUFFER_LEN:
+                    raise MufRuntimeError("String overflow.")
+            elif typ is si.MufList or typ is si.MufDict:
+                if len(x) > self.MAX_STACK:
+                    raise MufRuntimeError("Array overflow.")
+        stk.extend(items)
+
     def data_pop(self, *types):
-        if len(self.data_stack) - self.catch_locklevel() < 1:
-            raise MufRuntimeError("Stack underflow.")
-        self.check_type(self.data_stack[-1], types)
-        return self.data_stack.pop()
+        if types:
+            return self.data_stack.pop_typed(types)
+        return self.data_stack.pop_any()
+
+    def data_pop_int(self):
+        return self.data_stack.pop_int()
+
+    def data_pop_str(self):
+        return self.data_stack.pop_str()
+
+    def data_pop_many(self, cnt):
+        return self.data_stack.pop_many(cnt)
+
+    def data_pop2(self):
+        return self.data_stack.pop2()
+
+    def data_pop3(self):
+        return self.data_stack.pop3()
 
     def data_pop_array(self):
-        return self.data_pop(si.MufList, si.MufDict)
+        return self.data_stack.pop_typed((si.MufList, si.MufDict))
 
     def data_pop_list(self):
-        return self.data_pop(si.MufList)
+        return self.data_stack.pop_typed((si.MufList,))
 
     def data_pop_dict(self):
-        return self.data_pop(si.MufDict)
+        return self.data_stack.pop_typed((si.MufDict,))
 
     def data_pop_dbref(self):
-        return self.data_pop(si.DBRef)
+        return self.data_stack.pop_dbref()
 
     def data_pop_object(self):
-        return db.getobj(self.data_pop(si.DBRef))
+        return db.getobj(self.data_stack.pop_dbref())
 
     def data_pop_address(self):
-        return self.data_pop(si.Address)
+        return self.data_stack.pop_typed((si.Address,))
 
     def data_pop_lock(self):
-        return self.data_pop(si.Lock)
+        return self.data_stack.pop_typed((si.Lock,))
 
     def data_pick(self, n):
         if len(self.data_stack) < n:
@@ -398,19 +512,19 @@ class MufProcess(object):
         return self.data_stack[-n]
 
     def data_pull(self, n):
-        if len(self.data_stack) - self.catch_locklevel() < n:
+        if len(self.data_stack) - self.data_stack.lock < n:
             raise MufRuntimeError("Stack underflow.")
         a = self.data_stack[-n]
         del self.data_stack[-n]
         return a
 
     def data_put(self, n, val):
-        if len(self.data_stack) - self.catch_locklevel() < n:
+        if len(self.data_stack) - self.data_stack.lock < n:
             raise MufRuntimeError("Stack underflow.")
         self.data_stack[-n] = val
 
     def data_insert(self, n, val):
-        if len(self.data_stack) - self.catch_locklevel() < n:
+        if len(self.data_stack) - self.data_stack.lock < n:
             raise MufRuntimeError("StackUnderflow")
         if n < 1:
             self.data_stack.append(val)
@@ -462,7 +576,7 @@ class MufProcess(object):
                 if not self.break_count:
                     self._trigger_breakpoint()
         elif self.break_type == self.BREAK_FINISH:
-            if len(self.call_stack) < self.prev_call_level:
+            if self.call_depth() < self.prev_call_level:
                 self._trigger_breakpoint()
 
     def _check_line_based_breakpoints(self):
@@ -477,7 +591,7 @@ class MufProcess(object):
                     warnlog("Stopped at breakpoint %d." % bpnum)
                     self._trigger_breakpoint()
             if self.break_type == self.BREAK_NEXT:
-                if len(self.call_stack) > self.prev_call_level:
+                if self.call_depth() > self.prev_call_level:
                     return
             self.prevline = currline
             if self.break_type in [self.BREAK_STEP, self.BREAK_NEXT]:
@@ -495,19 +609,59 @@ class MufProcess(object):
         self._check_inst_based_breakpoints()
         self._check_line_based_breakpoints()
 
+    def set_engine(self, engine):
+        engines = (self.ENGINE_DISPATCH, self.ENGINE_CLASSIC, self.ENGINE_JIT)
+        if engine not in engines:
+            raise ValueError("Unknown execution engine: %s" % engine)
+        self.engine = engine
+
     def execute_code(self, level=-1):
-        maxcycles = {
-            self.MODE_PREEMPT: 999999999,
-            self.MODE_FOREGROUND: 10000,
-            self.MODE_BACKGROUND: 10000,
-        }
+        if self.engine == self.ENGINE_CLASSIC:
+            return self._execute_code_classic(level)
+        return self._execute_code_dispatch(level)
+
+    def slice_start(self):
+        self.slice_cycles = 0
+        self.slice_started = time.time()
+        self.slice_limit = 0
+        self.slice_check()
+
+    def slice_check(self):
+        # Called when slice_cycles reaches slice_limit.  Yields if this
+        # slice has used up its cycle or time budget, otherwise sets the
+        # next point to check at.  Tracing and debugging are slow enough
+        # that only the cycle budget applies to them.  The time budget is
+        # only enforced when something else is waiting to run, so a busy
+        # host doesn't make a lone process stop early.
+        mode = self.execution_mode
+        if mode not in self.MAX_SLICE_CYCLES:
+            mode = self.MODE_BACKGROUND
+        maxcycles = self.MAX_SLICE_CYCLES[mode]
+        if self.slice_cycles >= maxcycles:
+            self.sleep(0.0)
+        maxsecs = self.MAX_SLICE_SECS[mode]
+        if maxsecs is not None and not self.trace and not self.break_type:
+            now = time.time()
+            if now - self.slice_started >= maxsecs and self.proclist.has_waiting(now):
+                self.sleep(0.0)
+        self.slice_limit = min(
+            maxcycles, self.slice_cycles + self.SLICE_CHECK_CYCLES
+        )
+
+    def get_wait_stats(self):
+        # Returns how many times this process was queued to run, and its
+        # average and longest waits in the run queue, in seconds.
+        avg = self.wait_total / self.wait_count if self.wait_count else 0.0
+        return (self.wait_count, avg, self.wait_max)
+
+    def _execute_code_classic(self, level=-1):
         level += len(self.call_stack) if level < 0 else 0
         starttime = time.time()
-        self.prev_call_level = level + 1
+        self.prev_call_level = self.call_depth(level + 1)
         addr = self.curr_addr()
         inst = self.get_inst(addr)
         self.prevline = (addr.prog, inst.line)
-        slice_cycles = 0
+        self.slice_start()
         while self.call_stack:
             addr = self.curr_addr()
             inst = self.get_inst(addr)
@@ -516,11 +670,11 @@ class MufProcess(object):
             try:
                 try:
                     self.cycles += 1
-                    slice_cycles += 1
+                    self.slice_cycles += 1
                     inst.execute(self)
                     self.pc_advance(1)
-                    if slice_cycles >= maxcycles[self.execution_mode]:
-                        self.sleep(0.0)
+                    if self.slice_cycles >= self.slice_limit:
+                        self.slice_check()
                     self.check_breakpoints()
                 except (MufRuntimeError, db.InvalidObjectError) as e:
                     if not self.catch_trigger(e):
@@ -531,6 +685,60 @@ class MufProcess(object):
                 self.runtime += time.time() - starttime
                 return
 
+    def _frame_dispatch(self, frame, jit):
+        # Returns the dispatch table for the code a call frame is running.
+        comp = frame.compiled
+        if comp is None:
+            comp = self.get_compiled(frame.prog)
+        return comp.get_dispatch(jit)
+
+    def _execute_code_dispatch(self, level=-1):
+        # Runs the same Instruction semantics as the classic engine, but
+        # looks the dispatch table up only when the top call frame changes,
+        # so each step is a single indexed call.  The JIT engine uses a
+        # table whose hot functions run as generated python code.
+        jit = self.engine == self.ENGINE_JIT
+        level += len(self.call_stack) if level < 0 else 0
+        starttime = time.time()
+        self.prev_call_level = self.call_depth(level + 1)
+        addr = self.curr_addr()
+        inst = self.get_inst(addr)
+        self.prevline = (addr.prog, inst.line)
+        self.slice_start()
+        try:
+            while self.call_stack:
+                try:
+                    self._dispatch_steps(jit)
+                except (MufRuntimeError, db.InvalidObjectError) as e:
+                    if not self.catch_trigger(e):
+                        return
+                    self.check_breakpoints()
+        except MufBreakExecution:
+            pass
+        finally:
+            self.runtime += time.time() - starttime
+
+    def _dispatch_steps(self, jit):
+        # Runs instructions until an error or a break is raised.
+        call_stack = self.call_stack
+        frame = None
+        ops = None
+        while True:
+            if call_stack[-1] is not frame:
+                frame = call_stack[-1]
+                ops = self._frame_dispatch(frame, jit)
+            if self.trace:
+                log(self.get_trace_line(), msgtype='trace')
+            self.cycles += 1
+            self.slice_cycles += 1
+            ops[frame.pcnum](self)
+            if call_stack:
+                call_stack[-1].pcnum += 1
+            if self.slice_cycles >= self.slice_limit:
+                self.slice_check()
+            if not call_stack or self.break_type or self.breakpoints:
+                self.check_breakpoints()
+
     ###############################################################
 
     def get_programs(self):
@@ -565,6 +773,15 @@ class MufProcess(object):
         comp = self.get_compiled(prog)
         return comp.get_functions()
 
+    def program_memo_stats(self, prog):
+        # Returns (function, hits, misses, entries) for each function
+        # declared pure.
+        comp = self.get_compiled(prog)
+        return [
+            (fun,) + comp.memo.get_stats(comp.functions[fun].value)
+            for fun in sorted(comp.pure_funcs)
+        ]
+
     def program_function_addr(self, prog, fun):
         comp = self.get_compiled(prog)
         return comp.get_function_addr(fun)
@@ -655,6 +872,7 @@ class MufProcess(object):
                     'addr': addr.value,
                     'inst': str(inst),
                     'src': self.get_addr_source_line(addr),
+                    'elided': callfr.elided,
                 }
             )
         return out
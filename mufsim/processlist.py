@@ -1,11 +1,12 @@
 import time
-import heapq
+from collections import deque
 
-import mufsim.utils as util
 import mufsim.commands as cmds
 from mufsim.logger import log, warnlog
 from mufsim.errors import MufRuntimeError
 from mufsim.process import MufProcess
+from mufsim.timers import MufTimerQueue
+from mufsim.events import MufEventMatcher
 from mufsim.interface import network_interface as netifc
 
 STATE_ACTIVE = ''
@@ -22,9 +23,19 @@ class ProcessList(object):
         self.max_pid = 1
         self.processes = {}
         self.current_process = None
-        self.timer_queue = []
-        self.pending_processes = []
-        self.sleeping_processes = []
+        # MUF timers and sleeping processes share one timer queue.  Timers
+        # are keyed by (pid, name), and sleeps by pid.
+        self.timer_queue = MufTimerQueue()
+        # One run queue per execution mode, served in this order, so
+        # preempt processes always run before foreground ones, and
+        # foreground ones before background ones.
+        self.run_queues = [
+            (mode, deque()) for mode in (
+                MufProcess.MODE_PREEMPT,
+                MufProcess.MODE_FOREGROUND,
+                MufProcess.MODE_BACKGROUND,
+            )
+        ]
         self.waiting_processes = {}
         self.reading_processes = {}
         self.process_watch_cbs = []
@@ -40,18 +51,24 @@ class ProcessList(object):
         return self.processes.get(pid, dflt)
 
     def process(self, level=-1):
-        self.process_sleeping()
+        self.process_timers()
         self.process_reads()
-        self.handle_events()
         self.process_active_queue(level=level)
 
+    def has_pending(self):
+        return any(queue for mode, queue in self.run_queues)
+
     def next_time(self):
-        if self.pending_processes:
+        # Returns when the next process or timer will be ready to run, or
+        # None if nothing is pending or scheduled.
+        if self.has_pending():
             return 0.0
-        return min(
-            self.timer_queue[0][0],
-            self.sleeping_processes[0][0],
-        )
+        return self.timer_queue.next_time()
+
+    def has_waiting(self, now):
+        # True if some process is ready to run, or a timer is due, by now.
+        when = self.next_time()
+        return when is not None and when <= now
 
     def queue_process(self, process):
         if not process:
@@ -59,14 +76,38 @@ class ProcessList(object):
         if self.current_process == process:
             self.current_process = None
         process.wait_state = STATE_PENDING
-        self.pending_processes.append(process.pid)
+        process.queued_at = time.time()
+        self.run_queue(process.execution_mode).append(process.pid)
+
+    def run_queue(self, mode):
+        # Unknown modes get queued as background processes.
+        for qmode, queue in self.run_queues:
+            if qmode == mode:
+                return queue
+        return self.run_queues[-1][1]
+
+    def dequeue_process(self):
+        # Pops the next pending process from the highest priority run
+        # queue that has one, and updates its queue wait statistics.
+        for mode, queue in self.run_queues:
+            while queue:
+                process = self.get(queue.popleft())
+                if not process or process.wait_state != STATE_PENDING:
+                    continue
+                wait = time.time() - process.queued_at
+                process.wait_count += 1
+                process.wait_total += wait
+                process.wait_max = max(process.wait_max, wait)
+                return process
+        return None
 
     def process_active_queue(self, level=-1):
         if self.current_process is not None:
             return
-        if not self.pending_processes:
+        process = self.dequeue_process()
+        if not process:
             return
-        process = self.get(self.pending_processes.pop(0))
+        process.wait_state = STATE_ACTIVE
         self.current_process = process
         log("Switching to process PID=%d" % process.pid)
         for callback in self.process_watch_cbs:
@@ -79,12 +120,12 @@ class ProcessList(object):
     def set_read_handler(self, callback):
         self.read_handler = callback
 
-    def process_sleeping(self):
-        now = time.time()
-        while self.sleeping_processes and self.sleeping_processes[0][0] < now:
-            when, pid = heapq.heappop(self.sleeping_processes)
-            ofr = self.processes.get(pid)
-            self.queue_process(ofr)
+    def process_timers(self):
+        for when, key, name in self.timer_queue.pop_due(time.time()):
+            if name is None:
+                self.queue_process(self.processes.get(key))
+                continue
+            self.send_event(key[0], "TIMER." + name[:32], when)
 
     def poll_network(self):
         for descr in netifc.get_descriptors():
@@ -128,30 +169,26 @@ class ProcessList(object):
                 self.queue_process(ofr)
                 break
 
-    def handle_events(self):
-        self.trigger_timers()
-        for pid in list(self.waiting_processes.keys()):
-            ofr = self.processes.get(pid)
-            if not ofr:
-                del self.waiting_processes[pid]
-                continue
-            for idx, event in enumerate(list(ofr.events)):
-                pats = self.waiting_processes[pid]
-                matches = [util.smatch(pat, event.name) for pat in pats]
-                if not pats or any(matches):
-                    ofr.data_push(event.data)
-                    ofr.data_push(event.name)
-                    del ofr.events[idx]
-                    del self.waiting_processes[pid]
-                    self.queue_process(ofr)
-
-    def trigger_timers(self):
-        now = time.time()
-        while self.timer_queue and self.timer_queue[0][0] < now:
-            when, pid, name = heapq.heappop(self.timer_queue)
-            ofr = self.processes.get(pid)
-            if ofr:
-                ofr.events.add_event("TIMER." + name[:32], when)
+    def send_event(self, pid, name, data):
+        # Adds an event to a process's mailbox.  If the process is waiting
+        # for an event like it, it's woken right away, so waiting processes
+        # cost nothing until something is sent to them.
+        ofr = self.processes.get(pid)
+        if not ofr or ofr.wait_state == STATE_DEAD:
+            return
+        event = ofr.events.add_event(name, data)
+        if event is None:
+            return
+        match = self.waiting_processes.get(pid)
+        if match is not None and match(name):
+            self.deliver_event(ofr, event)
+
+    def deliver_event(self, ofr, event):
+        ofr.events.remove_event(event)
+        del self.waiting_processes[ofr.pid]
+        ofr.data_push(event.data)
+        ofr.data_push(event.name)
+        self.queue_process(ofr)
 
     def alloc_new_pid(self):
         attempts = 1024
@@ -185,16 +222,11 @@ class ProcessList(object):
         return list(self.processes.keys())
 
     def timer_add(self, secs, pid, name):
-        self.timer_del(pid, name)
         when = time.time() + secs
-        heapq.heappush(self.timer_queue, (when, pid, name))
+        self.timer_queue.add(when, (pid, name), name, owner=pid)
 
     def timer_del(self, pid, name):
-        for idx, timer in enumerate(self.timer_queue):
-            when, tpid, tname = timer
-            if (tpid, tname) == (pid, name):
-                del self.timer_queue[idx]
-                break
+        self.timer_queue.cancel((pid, name))
 
     def wait_for_events(self, pid, pats):
         ofr = self.processes.get(pid)
@@ -203,7 +235,11 @@ class ProcessList(object):
         if ofr == self.current_process:
             self.current_process = None
         ofr.wait_state = STATE_EVENT
-        self.waiting_processes[pid] = pats
+        match = MufEventMatcher(pats)
+        self.waiting_processes[pid] = match
+        event = ofr.events.find_match(match)
+        if event:
+            self.deliver_event(ofr, event)
 
     def wait_for_read(self, user, pid):
         # TODO: do something if a process is already awaiting a user's text line
@@ -225,18 +261,18 @@ class ProcessList(object):
             if pid not in ofr.watchers:
                 ofr.watchers.append(watcher)
         elif wfr:
-            wfr.events.add_event("PROC.EXIT.%d" % pid, pid)
+            self.send_event(watcher, "PROC.EXIT.%d" % pid, pid)
 
     def process_complete(self, pid):
         ofr = self.processes.get(pid)
         if not ofr:
             return
         ofr.wait_state = STATE_DEAD
+        self.timer_queue.cancel_owner(pid)
+        self.waiting_processes.pop(pid, None)
         log("Process exited: pid=%d" % ofr.pid)
         for wpid in ofr.watchers:
-            wfr = self.processes.get(wpid)
-            if wfr:
-                wfr.events.add_event("PROC.EXIT.%d" % pid, pid)
+            self.send_event(wpid, "PROC.EXIT.%d" % pid, pid)
         if ofr == self.current_process:
             self.current_process = None
         # Keep processes in proc list for inspection
@@ -250,7 +286,7 @@ class ProcessList(object):
             self.current_process = None
         ofr.wait_state = STATE_SLEEP
         when = time.time() + secs
-        heapq.heappush(self.sleeping_processes, (when, pid))
+        self.timer_queue.add(when, pid, owner=pid)
 
     def killall(self, prog):
         for pid in self.get_pids():
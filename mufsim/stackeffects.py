@@ -0,0 +1,396 @@
+import mufsim.stackitems as si
+from mufsim.insts.base import primitives
+
+import mufsim.insts.flow as instfl
+import mufsim.insts.stack as instst
+
+
+# Type codes used in stack effect signatures.  Inputs accept any of the
+# listed python types; 'x' accepts anything.  Outputs name the type pushed,
+# 'x' for unknown.  A digit passes through the type of that input, and
+# 'N' is a numeric result that is an int if all inputs were ints, or a
+# float if the inputs were a mix of ints and floats.
+type_codes = {
+    'i': (int,),
+    'f': (float,),
+    's': (str,),
+    'd': (si.DBRef,),
+    'l': (si.MufList,),
+    'h': (si.MufDict,),
+    'y': (si.MufList, si.MufDict),
+    'k': (si.Lock,),
+    'a': (si.Address,),
+    'v': (si.GlobalVar, si.FuncVar),
+    'n': (int, float),
+    'm': (int, float, si.DBRef),
+    'r': (int, float, str),
+    'p': (int, float, str, si.DBRef),
+    't': (int, str),
+}
+
+
+# Stack effects for primitives with a fixed number of arguments and
+# results, written as "inputs -- outputs", deepest item first.  Anything
+# not listed here is treated as having an unknown effect on the stack.
+stack_effects = {
+    # Stack manipulation.
+    "pop": "1 --",
+    "dup": "1 -- 1 1",
+    "swap": "1 2 -- 2 1",
+    "over": "1 2 -- 1 2 1",
+    "rot": "1 2 3 -- 2 3 1",
+    "-rot": "1 2 3 -- 3 1 2",
+    "nip": "1 2 3 -- 1 3",
+    "tuck": "1 2 3 -- 1 3 2 3",
+    "shallow_copy": "1 -- 1 x",
+    "deep_copy": "1 -- 1 x",
+    "depth": "-- i",
+    "fulldepth": "-- i",
+    "@": "v -- x",
+    "!": "x v --",
+
+    # Integer math and logic.
+    "+": "p p -- N",
+    "-": "m m -- N",
+    "*": "r r -- x",
+    "/": "n n -- N",
+    "%": "n n -- N",
+    "abs": "i -- i",
+    "sign": "i -- i",
+    "bitand": "i i -- i",
+    "bitor": "i i -- i",
+    "bitxor": "i i -- i",
+    "bitshift": "i i -- i",
+    "int": "x -- i",
+    "not": "x -- i",
+    "and": "x x -- i",
+    "or": "x x -- i",
+    "xor": "x x -- i",
+    "random": "-- i",
+
+    # Comparisons.
+    "=": "p p -- i",
+    "!=": "p p -- i",
+    "<": "m m -- i",
+    "<=": "m m -- i",
+    ">": "m m -- i",
+    ">=": "m m -- i",
+    "dbcmp": "d d -- i",
+
+    # Floating point.
+    "float": "i -- f",
+    "fabs": "n -- f",
+    "floor": "f -- f",
+    "ceil": "f -- f",
+    "round": "f i -- f",
+    "fmod": "f f -- f",
+    "sin": "f -- x",
+    "cos": "f -- x",
+    "tan": "f -- x",
+    "asin": "f -- x",
+    "acos": "f -- x",
+    "atan": "f -- x",
+    "atan2": "f f -- x",
+    "exp": "f -- x",
+    "log": "f -- x",
+    "log10": "f -- x",
+    "sqrt": "f -- x",
+    "pow": "f f -- x",
+    "pi": "-- f",
+    "epsilon": "-- f",
+    "inf": "-- f",
+    "frand": "-- f",
+    "ftostr": "n -- s",
+    "ftostrc": "n -- s",
+    "strtof": "s -- f",
+
+    # Strings.
+    "strlen": "s -- i",
+    "strcat": "s s -- s",
+    "toupper": "s -- s",
+    "tolower": "s -- s",
+    "striplead": "s -- s",
+    "striptail": "s -- s",
+    "instr": "s s -- i",
+    "instring": "s s -- i",
+    "rinstr": "s s -- i",
+    "rinstring": "s s -- i",
+    "strcmp": "s s -- i",
+    "stringcmp": "s s -- i",
+    "stringpfx": "s s -- i",
+    "strncmp": "s s i -- i",
+    "midstr": "s i i -- s",
+    "subst": "s s s -- s",
+    "strcut": "s i -- s s",
+    "split": "s s -- s s",
+    "rsplit": "s s -- s s",
+    "smatch": "s s -- i",
+    "textattr": "s s -- s",
+    "intostr": "i -- s",
+    "atoi": "s -- i",
+    "ctoi": "s -- i",
+    "itoc": "i -- s",
+    "md5hash": "s -- s",
+    "sha1hash": "s -- s",
+    "ansi_strlen": "s -- i",
+    "ansi_strip": "s -- s",
+    "ansi_strcut": "s i -- s s",
+    "ansi_midstr": "s i i -- s",
+    "explode_array": "s s -- l",
+    "array_join": "l s -- s",
+    "stod": "s -- d",
+    "dbref": "i -- d",
+
+    # Type predicates.
+    "string?": "x -- i",
+    "int?": "x -- i",
+    "float?": "x -- i",
+    "number?": "x -- i",
+    "dbref?": "x -- i",
+    "array?": "x -- i",
+    "dictionary?": "x -- i",
+    "address?": "x -- i",
+    "lock?": "x -- i",
+
+    # Time.
+    "systime": "-- i",
+    "time": "-- i i i",
+    "date": "-- i i i",
+    "timefmt": "s i -- s",
+
+    # Objects and properties.
+    "prog": "-- d",
+    "trig": "-- d",
+    "pid": "-- i",
+    "dbtop": "-- d",
+    "name": "d -- s",
+    "location": "d -- d",
+    "owner": "d -- d",
+    "getlink": "d -- d",
+    "contents": "d -- d",
+    "exits": "d -- d",
+    "next": "d -- d",
+    "ok?": "d -- i",
+    "player?": "d -- i",
+    "thing?": "d -- i",
+    "room?": "d -- i",
+    "exit?": "d -- i",
+    "program?": "d -- i",
+    "mlevel": "d -- i",
+    "pennies": "d -- x",
+    "controls": "d d -- i",
+    "flag?": "d s -- i",
+    "getprop": "d s -- x",
+    "getpropstr": "d s -- s",
+    "getpropval": "d s -- i",
+    "getpropfval": "d s -- f",
+    "envpropstr": "d s -- s",
+    "propdir?": "d s -- i",
+    "setprop": "d s x --",
+    "remove_prop": "d s --",
+    "notify": "d s --",
+
+    # Arrays and loops.
+    "array_count": "y -- i",
+    "for": "i i i --",
+    "foreach": "y --",
+    " __forpop__": "--",
+}
+
+
+def parse_effect(sig):
+    ins, outs = sig.split("--")
+    return (tuple(ins.split()), tuple(outs.split()))
+
+
+parsed_effects = {
+    name: parse_effect(sig) for name, sig in stack_effects.items()
+}
+
+
+# Stack effects of branching instructions, as a pair of the effect when
+# falling through and the effect when branching.  None means that path
+# is never taken.
+branch_effects = {
+    instfl.InstJmp: (None, "--"),
+    instfl.InstJmpIfFalse: ("x --", "x --"),
+    instfl.InstForNext: ("-- i", "--"),
+    instfl.InstForeachNext: ("-- x x", "--"),
+}
+
+
+parsed_branch_effects = {
+    typ: tuple(sig and parse_effect(sig) for sig in sigs)
+    for typ, sigs in branch_effects.items()
+}
+
+
+# Instructions after which nothing is known about the stack.
+UNKNOWN = (False, ())
+
+MAX_TRACKED = 64
+
+
+class MufStackAnalyzer(object):
+    def __init__(self, comp):
+        self.compiled = comp
+
+    def get_effect(self, inst):
+        name = inst.prim_name
+        if name is None or primitives.get(name) is not type(inst):
+            return None
+        return parsed_effects.get(name)
+
+    def func_ranges(self, code):
+        starts = sorted(addr.value for addr in self.compiled.functions.values())
+        ends = starts[1:] + [len(code)]
+        return list(zip(starts, ends))
+
+    def merge(self, a, b):
+        aexact, aitems = a
+        bexact, bitems = b
+        cnt = min(len(aitems), len(bitems))
+        items = tuple(
+            x if x == y else 'x'
+            for x, y in zip(aitems[len(aitems) - cnt:], bitems[len(bitems) - cnt:])
+        )
+        exact = aexact and bexact and len(aitems) == len(bitems)
+        return (exact, items)
+
+    def is_compatible(self, item, code):
+        if code == 'x' or code.isdigit():
+            return True
+        if item == 'x' or item == 'N':
+            return False
+        return set(type_codes[item]) <= set(type_codes[code])
+
+    def apply_effect(self, state, effect):
+        exact, items = state
+        ins, outs = effect
+        if len(items) < len(ins):
+            return UNKNOWN
+        args = items[len(items) - len(ins):]
+        results = []
+        for code in outs:
+            if code.isdigit():
+                code = args[int(code) - 1]
+            elif code == 'N':
+                if all(arg == 'i' for arg in args):
+                    code = 'i'
+                elif all(arg in ('i', 'f') for arg in args):
+                    code = 'f'
+                else:
+                    code = 'x'
+            results.append(code)
+        items = items[:len(items) - len(ins)] + tuple(results)
+        if len(items) > MAX_TRACKED:
+            return (False, items[-MAX_TRACKED:])
+        return (exact, items)
+
+    def push_type(self, val):
+        for code in "ifsdlhka":
+            if type(val) in type_codes[code]:
+                return code
+        return 'x'
+
+    def transfer(self, inst, addr, state):
+        # Returns a list of (successor address, state) pairs.
+        typ = type(inst)
+        nxt = addr + 1
+        if typ in parsed_branch_effects:
+            succs = zip((nxt, inst.value), parsed_branch_effects[typ])
+            return [
+                (succ, self.apply_effect(state, effect))
+                for succ, effect in succs if effect is not None
+            ]
+        if typ is instfl.InstTry:
+            return [(nxt, UNKNOWN), (inst.value, UNKNOWN)]
+        if typ is instfl.InstExit or inst.prim_name == "abort":
+            return []
+        if typ is instfl.InstFunc:
+            effect = (('x',) * inst.varcount, ())
+            return [(nxt, self.apply_effect(state, effect))]
+        if typ is instst.InstPushItem:
+            effect = ((), (self.push_type(inst.value),))
+            return [(nxt, self.apply_effect(state, effect))]
+        if typ in (instst.InstFuncVar, instst.InstGlobalVar):
+            return [(nxt, self.apply_effect(state, ((), ('v',))))]
+        effect = self.get_effect(inst)
+        if effect is None:
+            return [(nxt, UNKNOWN)]
+        return [(nxt, self.apply_effect(state, effect))]
+
+    def flow(self, code, start, end, entry):
+        states = {start: entry}
+        work = [start]
+        while work:
+            addr = work.pop()
+            for succ, state in self.transfer(code[addr], addr, states[addr]):
+                if succ < start or succ >= end:
+                    continue
+                old = states.get(succ)
+                new = state if old is None else self.merge(old, state)
+                if new != old:
+                    states[succ] = new
+                    work.append(succ)
+        return states
+
+    def arg_count(self, inst):
+        if type(inst) is instfl.InstFunc:
+            return inst.varcount
+        if type(inst) is instfl.InstJmpIfFalse:
+            return 1
+        effect = self.get_effect(inst)
+        if effect is None:
+            return 0
+        return len(effect[0])
+
+    def is_proven(self, inst, state):
+        effect = self.get_effect(inst)
+        if effect is None:
+            return False
+        ins = effect[0]
+        items = state[1]
+        if len(items) < len(ins):
+            return False
+        args = items[len(items) - len(ins):]
+        return all(
+            self.is_compatible(item, code)
+            for item, code in zip(args, ins)
+        )
+
+    def mark_proven(self, code):
+        # Marks instructions whose arguments are known to be on the stack,
+        # with acceptable types, on every path that reaches them.
+        for start, end in self.func_ranges(code):
+            states = self.flow(code, start, end, UNKNOWN)
+            for addr, state in states.items():
+                inst = code[addr]
+                if inst.execute_fast is not None and self.is_proven(inst, state):
+                    inst.proven = True
+
+    def find_underflows(self, code):
+        # The entry point is run as a command, with just the command
+        # string on the stack, so the whole stack is known there.
+        entry = self.compiled.lastfunction
+        if entry is None:
+            return []
+        warnings = []
+        for start, end in self.func_ranges(code):
+            if start != entry.value:
+                continue
+            states = self.flow(code, start, end, (True, ('s',)))
+            for addr in sorted(states.keys()):
+                exact, items = states[addr]
+                inst = code[addr]
+                if exact and len(items) < self.arg_count(inst):
+                    warnings.append(
+                        "Line %d: stack underflow in %s: needs %d, has %d." % (
+                            inst.line, str(inst),
+                            self.arg_count(inst), len(items)
+                        )
+                    )
+        return warnings
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
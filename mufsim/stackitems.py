@@ -1,11 +1,11 @@
-import copy
 import mufsim.utils as util
 from mufsim.errors import MufRuntimeError
-from functools import cmp_to_key, total_ordering
+from mufsim.persistent import PersistentMap, make_vector
+from functools import total_ordering
 
 
 class Item(object):
-    value = 0
+    __slots__ = ("value",)
 
     def __init__(self, value):
         self.value = value
@@ -23,10 +23,69 @@ class Item(object):
         return str(self)
 
 
+# Immutable items.  Since they never change, instances can be shared
+# freely, and copies of them are just the same instance.
+class ValueItem(Item):
+    __slots__ = ()
+
+    def __init__(self, value):
+        object.__setattr__(self, "value", value)
+
+    def __setattr__(self, name, val):
+        raise AttributeError("%s is immutable." % type(self).__name__)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (type(self), (self.value,))
+
+
+# Immutable items with small integer values are interned, so that the
+# commonly used ones are allocated once and then reused.  Each subclass
+# gets its own cache.
+INTERN_MIN = -4
+INTERN_MAX = 1023
+
+
+class InternedItem(ValueItem):
+    __slots__ = ()
+    interned = None
+
+    def __new__(cls, value):
+        cache = cls.interned
+        item = cache.get(value)
+        if item is not None and type(value) is int:
+            return item
+        item = object.__new__(cls)
+        object.__setattr__(item, "value", value)
+        if type(value) is int and INTERN_MIN <= value <= INTERN_MAX:
+            cache[value] = item
+        return item
+
+    def __init__(self, value):
+        pass
+
+
 @total_ordering
-class Mark(Item):
+class Mark(ValueItem):
+    __slots__ = ()
+    instance = None
+
+    def __new__(cls):
+        if cls.instance is None:
+            cls.instance = object.__new__(cls)
+            object.__setattr__(cls.instance, "value", 0)
+        return cls.instance
+
     def __init__(self):
-        super(Mark, self).__init__(0)
+        pass
+
+    def __reduce__(self):
+        return (Mark, ())
 
     def __bool__(self):
         return False
@@ -42,7 +101,10 @@ class Mark(Item):
 
 
 @total_ordering
-class DBRef(Item):
+class DBRef(InternedItem):
+    __slots__ = ()
+    interned = {}
+
     def __str__(self):
         return "#%d" % self.value
 
@@ -58,6 +120,8 @@ class DBRef(Item):
 
 @total_ordering
 class Lock(Item):
+    __slots__ = ()
+
     def __str__(self):
         return "Lock:%s" % self.value
 
@@ -72,13 +136,16 @@ class Lock(Item):
 
 
 @total_ordering
-class Address(Item):
-    prog = -1
+class Address(ValueItem):
+    __slots__ = ("prog",)
 
     def __init__(self, value, prog):
-        self.prog = prog
+        object.__setattr__(self, "prog", prog)
         super(Address, self).__init__(value)
 
+    def __reduce__(self):
+        return (Address, (self.value, self.prog))
+
     def __bool__(self):
         return self.value is not None
 
@@ -97,7 +164,10 @@ class Address(Item):
 
 
 @total_ordering
-class GlobalVar(Item):
+class GlobalVar(InternedItem):
+    __slots__ = ()
+    interned = {}
+
     def __str__(self):
         return "LV%d" % self.value
 
@@ -112,7 +182,10 @@ class GlobalVar(Item):
 
 
 @total_ordering
-class FuncVar(Item):
+class FuncVar(InternedItem):
+    __slots__ = ()
+    interned = {}
+
     def __str__(self):
         return "SV%d" % self.value
 
@@ -128,15 +201,18 @@ class FuncVar(Item):
 
 @total_ordering
 class MufList(Item):
-    def __init__(self, val=[], pin=False):
+    __slots__ = ("pinned",)
+
+    def __init__(self, val=(), pin=False):
+        val = make_vector(val)
         super(MufList, self).__init__(val)
         self.pinned = pin
 
     def __str__(self):
-        return str(self.value)
+        return str(self.value.to_list())
 
     def __bool__(self):
-        return self.value != -1
+        return True
 
     def __len__(self):
         return len(self.value)
@@ -148,51 +224,115 @@ class MufList(Item):
         return self.value == other.value
 
     def __getitem__(self, key):
-        if not isinstance(key, int):
+        if not isinstance(key, (int, slice)):
             raise MufRuntimeError("List array expects integer index.")
         return self.value[key]
 
-    def __setitem__(self, key, val):
+    def get(self, key, dflt=None):
+        # Returns dflt if there is no item at the given index.
         if not isinstance(key, int):
-            raise MufRuntimeError("List array expects integer index.")
-        self.value[key] = val
-
-    def __delitem__(self, key):
-        del self.value[key]
+            return dflt
+        return self.value.get(key, dflt)
 
     def __contains__(self, key):
         return key in self.value
 
     def __iter__(self):
-        for val in self.value:
-            yield val
+        return iter(self.value)
+
+    def __reversed__(self):
+        return reversed(self.value)
 
     def keys(self):
         return range(len(self.value))
 
-    def copy_unpinned(self):
+    def values(self):
+        return self.value.to_list()
+
+    def items(self):
+        return list(enumerate(self.value))
+
+    # Key navigation, in MUF key order.  Each returns None if there is no
+    # such key.  Numeric keys sort before string keys.
+    def first_key(self):
+        return 0 if len(self.value) else None
+
+    def last_key(self):
+        return len(self.value) - 1 if len(self.value) else None
+
+    def next_key(self, key):
+        if isinstance(key, str):
+            return None
+        key = max(int(key) + 1, 0)
+        return key if key < len(self.value) else None
+
+    def prev_key(self, key):
+        if isinstance(key, str):
+            key = len(self.value)
+        key = min(int(key) - 1, len(self.value) - 1)
+        return key if key >= 0 else None
+
+    def is_numeric(self):
+        # True if every item is an int, or every item is a float.
+        return self.value.typecode is not None
+
+    def find_keys(self, val, invert=False):
+        # Indexes of the items equal to val, or not equal if invert.
+        return self.value.find(val, invert)
+
+    def range_view(self, start, stop):
+        # The items from start up to stop, as a view sharing this array's
+        # storage.  Indexes are handled like python slice bounds.
+        start, stop, step = slice(start, stop).indices(len(self.value))
+        return self.value.view(start, max(start, stop))
+
+    def updated(self, vec):
+        # Pinned arrays are changed in place.  Others are never modified,
+        # and updates return a new array sharing structure with this one.
         if self.pinned:
+            self.value = vec
             return self
-        return MufList(copy.copy(self.value), self.pinned)
+        return MufList(vec, self.pinned)
 
     def set_item(self, idx, val):
-        if not isinstance(idx, (int, slice)):
+        if isinstance(idx, slice):
+            start, end, step = idx.indices(len(self.value))
+            return self.updated(self.value.splice(start, max(start, end), val))
+        if not isinstance(idx, int):
             raise MufRuntimeError("List array expects integer index.")
-        arr = self.copy_unpinned()
-        arr[idx] = val
-        return arr
+        if idx < 0:
+            idx += len(self.value)
+        return self.updated(self.value.set(idx, val))
 
     def del_item(self, idx):
-        if not isinstance(idx, (int, slice)):
+        if isinstance(idx, slice):
+            start, end, step = idx.indices(len(self.value))
+        elif isinstance(idx, int):
+            if idx < 0:
+                idx += len(self.value)
+            start, end = idx, idx + 1
+        else:
             raise MufRuntimeError("List array expects integer index.")
-        arr = self.copy_unpinned()
-        del arr[idx]
-        return arr
+        cnt = len(self.value)
+        end = min(end, cnt)
+        if start >= end:
+            return self.updated(self.value)
+        if start == 0:
+            return self.updated(self.value.view(end, cnt))
+        if end == cnt and start > 0:
+            return self.updated(self.value.view(0, start))
+        return self.updated(self.value.splice(start, end))
 
 
 @total_ordering
 class MufDict(Item):
-    def __init__(self, val={}, pin=False):
+    __slots__ = ("pinned",)
+
+    def __init__(self, val=None, pin=False):
+        if val is None:
+            val = PersistentMap()
+        elif not isinstance(val, PersistentMap):
+            val = PersistentMap.from_dict(val)
         super(MufDict, self).__init__(val)
         self.pinned = pin
 
@@ -200,16 +340,16 @@ class MufDict(Item):
         vals = [
             "{}=>{}".format(
                 util.escape_str(k) if isinstance(k, str) else str(k),
-                util.escape_str(self.value[k]) if isinstance(self.value[k], str) else str(self.value[k]),
+                util.escape_str(v) if isinstance(v, str) else str(v),
             )
-            for k in self.keys()
+            for k, v in self.value.items()
         ]
         if not vals:
             vals = ["=>"]
         return "[{}]".format(", ".join(vals))
 
     def __bool__(self):
-        return self.value != -1
+        return True
 
     def __len__(self):
         return len(self.value)
@@ -225,64 +365,124 @@ class MufDict(Item):
             raise MufRuntimeError("dictionary array expects integer or string index.")
         return self.value[key]
 
-    def __setitem__(self, key, val):
-        if not isinstance(key, (int, str)):
-            raise MufRuntimeError("dictionary array expects integer or string index.")
-        self.value[key] = val
-
-    def __delitem__(self, key):
-        del self.value[key]
-
     def __contains__(self, key):
         return key in self.value
 
     def __iter__(self):
-        for key in self.keys():
-            yield key
+        return iter(self.value)
+
+    def get(self, key, dflt=None):
+        return self.value.get(key, dflt)
 
     def keys(self):
-        return sorted(list(self.value.keys()), key=cmp_to_key(sortcomp))
+        return self.value.keys()
+
+    def values(self):
+        return self.value.values()
+
+    def items(self):
+        return self.value.items()
+
+    # Key navigation, in MUF key order.  Each returns None if there is no
+    # such key.
+    def first_key(self):
+        node = self.value.first()
+        return node[1] if node else None
 
-    def copy_unpinned(self):
+    def last_key(self):
+        node = self.value.last()
+        return node[1] if node else None
+
+    def next_key(self, key):
+        node = self.value.next_node(key)
+        return node[1] if node else None
+
+    def prev_key(self, key):
+        node = self.value.prev_node(key)
+        return node[1] if node else None
+
+    def split(self, key):
+        # Returns arrays of the items before the given key, and the rest.
+        before, after = self.value.split(key)
+        return (MufDict(before, self.pinned), MufDict(after, self.pinned))
+
+    def get_range(self, start, end):
+        return MufDict(self.value.range(start, end), self.pinned)
+
+    def updated(self, tree):
+        # Pinned arrays are changed in place.  Others are never modified,
+        # and updates return a new array sharing structure with this one.
         if self.pinned:
+            self.value = tree
             return self
-        return MufDict(copy.copy(self.value), self.pinned)
+        return MufDict(tree, self.pinned)
 
     def set_item(self, idx, val):
         if not isinstance(idx, (int, str)):
             raise MufRuntimeError("Dictionary array expects integer or string index.")
-        arr = self.copy_unpinned()
-        arr[idx] = val
-        return arr
+        return self.updated(self.value.set(idx, val))
 
     def del_item(self, idx):
         if not isinstance(idx, (int, str)):
             raise MufRuntimeError("Dictionary array expects integer or string index.")
-        arr = self.copy_unpinned()
-        del arr[idx]
-        return arr
+        return self.updated(self.value.delete(idx))
+
+
+def fork_copy(val, memo):
+    # Stack items are immutable, so a forked process can share them with
+    # its parent.  Arrays can be pinned, and then changed in place, so the
+    # fork gets its own wrapper for every array, nested ones included.
+    # The persistent contents are shared, and are only rebuilt if they
+    # hold arrays.  memo maps the id of each array copied so far to its
+    # copy, so an array referenced twice is still one array in the fork.
+    typ = type(val)
+    if typ is not MufList and typ is not MufDict:
+        return val
+    new = memo.get(id(val))
+    if new is not None:
+        return new
+    new = memo[id(val)] = typ(val.value, val.pinned)
+    if typ is MufList:
+        if val.value.typecode is None and any(map(is_array, val.value)):
+            new.value = make_vector([fork_copy(x, memo) for x in val.value])
+    elif any(map(is_array, val.value.values())):
+        new.value = PersistentMap.from_dict(
+            {k: fork_copy(x, memo) for k, x in val.value.items()}
+        )
+    return new
+
+
+def fork_contents(vals, memo):
+    # Copies the contents of an array, as fork_copy() would.
+    typ = MufDict if isinstance(vals, PersistentMap) else MufList
+    return fork_copy(typ(vals), memo).value
+
+
+def is_array(val):
+    typ = type(val)
+    return typ is MufList or typ is MufDict
+
+
+def sort_key(val, nocase=False):
+    # Key giving the MUF sort order: numbers, then dbrefs, then strings,
+    # then everything else grouped by type.
+    typ = type(val)
+    if typ is int or typ is float or typ is bool:
+        return (0, val)
+    if typ is DBRef:
+        return (1, val.value)
+    if typ is str:
+        return (2, val.upper() if nocase else val)
+    return (3, typ.__name__, val)
+
+
+def sort_keyi(val):
+    return sort_key(val, nocase=True)
 
 
 def sortcomp(a, b, nocase=False):
-    if isinstance(a, type(b)):
-        if isinstance(a, str) and nocase:
-            a = a.upper()
-            b = b.upper()
-        return (a > b) - (a < b)
-    if util.is_number(a) and util.is_number(b):
-        return (a > b) - (a < b)
-    if util.is_number(a):
-        return -1
-    if util.is_number(b):
-        return 1
-    if isinstance(a, DBRef):
-        return -1
-    if isinstance(b, DBRef):
-        return 1
-    if isinstance(a, str):
-        return -1
-    if isinstance(b, str):
-        return 1
+    a = sort_key(a, nocase)
+    b = sort_key(b, nocase)
     return (a > b) - (a < b)
 
 
@@ -314,7 +514,7 @@ def item_repr(x):
         out += "]"
         return out
     elif isinstance(x, dict):
-        keys = sorted(list(x.keys()), key=cmp_to_key(sortcomp))
+        keys = sorted(list(x.keys()), key=sort_key)
         out = "%d{" % len(x)
         out += ", ".join(
             ["%s: %s" % (item_repr(k), item_repr(x[k])) for k in keys]
@@ -353,7 +553,7 @@ def item_repr_pretty(x, indent=""):
                 item_repr_pretty(k, subind),
                 item_repr_pretty(x[k], subind).lstrip(),
             )
-            for k in sorted(list(x.keys()), key=cmp_to_key(sortcomp))
+            for k in sorted(list(x.keys()), key=sort_key)
         ]
         return "%s{\n%s\n%s}" % (indent, ",\n".join(items), indent)
     else:
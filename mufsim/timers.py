@@ -0,0 +1,77 @@
+import heapq
+import itertools
+
+
+# A heap of deadlines, each stored under a key.  Cancelling or replacing
+# a key just marks its heap entry dead, and dead entries are skipped when
+# they reach the top of the heap.  The heap is rebuilt without them when
+# they outnumber the live ones.
+class MufTimerQueue(object):
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.owners = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def add(self, when, key, data=None, owner=None):
+        # Schedules data to be returned by pop_due() at time when,
+        # replacing anything already scheduled under key.
+        self.cancel(key)
+        entry = [when, next(self.counter), key, data, owner]
+        self.entries[key] = entry
+        if owner is not None:
+            self.owners.setdefault(owner, set()).add(key)
+        heapq.heappush(self.heap, entry)
+
+    def cancel(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        owner = entry[4]
+        if owner is not None:
+            keys = self.owners[owner]
+            keys.discard(key)
+            if not keys:
+                del self.owners[owner]
+        entry[2] = None
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.compact()
+        return True
+
+    def cancel_owner(self, owner):
+        for key in list(self.owners.get(owner, ())):
+            self.cancel(key)
+
+    def compact(self):
+        self.heap = [entry for entry in self.heap if entry[2] is not None]
+        heapq.heapify(self.heap)
+
+    def next_time(self):
+        # Returns the earliest live deadline, or None if nothing is queued.
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now):
+        # Removes and returns (when, key, data) for each entry whose
+        # deadline is before now, earliest first.
+        due = []
+        while True:
+            when = self.next_time()
+            if when is None or when >= now:
+                break
+            entry = heapq.heappop(self.heap)
+            key = entry[2]
+            self.cancel(key)
+            due.append((when, key, entry[3]))
+        return due
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -62,7 +62,17 @@ def split_char(txt, chars):
     return txt[:pos], txt[pos:]
 
 
-def smatch(pat, txt):
+# Compiled smatch() patterns, or None for patterns that don't compile.
+smatch_patterns = {}
+MAX_SMATCH_PATTERNS = 256
+
+
+def smatch_compile(pat):
+    try:
+        return smatch_patterns[pat]
+    except KeyError:
+        pass
+    rx = pat
     pats = [
         ('{', '\b('),
         ('}', ')\b'),
@@ -70,12 +80,22 @@ def smatch(pat, txt):
         ('*', '.*'),
     ]
     for fnd, repl in pats:
-        pat = pat.replace(fnd, repl)
+        rx = rx.replace(fnd, repl)
     try:
-        pat = re.compile(pat, re.IGNORECASE)
+        rx = re.compile(rx, re.IGNORECASE)
     except:
+        rx = None
+    if len(smatch_patterns) >= MAX_SMATCH_PATTERNS:
+        smatch_patterns.clear()
+    smatch_patterns[pat] = rx
+    return rx
+
+
+def smatch(pat, txt):
+    rx = smatch_compile(pat)
+    if rx is None:
         return False
-    if pat.search(txt):
+    if rx.search(txt):
         return True
     return False
 
@@ -108,7 +128,8 @@ def getsize(obj):
         elif hasattr(obj, '__slots__'):
             size += sum(
                 inner(getattr(obj, s))
-                for s in obj.__slots__
+                for cls in type(obj).__mro__
+                for s in getattr(cls, '__slots__', ())
                 if hasattr(obj, s)
             )
         else:
@@ -12,7 +12,9 @@ for f in *.muf *.muv ; do
     cmpfile=$base.cmp
     if [ "$refresh_only" -eq 0 -o ! -e "$cmpfile" ]; then
         echo $f
-        mufsim $f -u -r -t 2>&1 | sed 's/.\[?1034h//g' >$outfile
+        # A first line of "( mufsim: ARGS )" overrides the default args.
+        args=$(sed -n '1s/^( *mufsim: *\(.*[^ ]\) *)$/\1/p' $f)
+        mufsim $f ${args:--u -r -t} 2>&1 | sed 's/.\[?1034h//g' >$outfile
         if [ ! -e "$cmpfile" ]; then
             echo "Installing results as $cmpfile"
             mv -f $outfile $cmpfile
@@ -0,0 +1,49 @@
+import unittest
+
+import mufsim.gamedb as db
+from mufsim.compiler import MufCompiler
+from mufsim.processlist import ProcessList
+
+
+# The parent pins both arrays after the fork, then changes them in place.
+# The child must still see the arrays as they were when it forked.
+FORK_PIN_SRC = """
+: main
+    { 1 2 3 }list
+    { 4 5 }list 1 array_make
+    fork if
+        swap array_pin 99 swap 0 array_setitem swap
+        dup 0 [] array_pin 99 swap 0 array_setitem pop
+    then
+;
+"""
+
+
+class ForkTest(unittest.TestCase):
+    def run_program(self, src):
+        userobj = db.get_player_obj("John_Doe")
+        progobj = db.get_registered_obj(userobj, "$cmd/test")
+        progobj.sources = src
+        self.assertTrue(MufCompiler().compile_source(progobj.dbref))
+        proclist = ProcessList()
+        fr = proclist.new_process()
+        trigobj = db.get_registered_obj(userobj, "$testaction")
+        fr.setup(progobj, userobj, trigobj, "")
+        proclist.queue_process(fr)
+        for i in range(20):
+            proclist.process()
+        return [proclist.get(pid) for pid in sorted(proclist.get_pids())]
+
+    def test_pinned_arrays_not_shared(self):
+        parent, child = self.run_program(FORK_PIN_SRC)
+        self.assertEqual(parent.data_stack[1].value.to_list(), [99, 2, 3])
+        self.assertEqual(parent.data_stack[2][0].value.to_list(), [99, 5])
+        self.assertEqual(child.data_stack[1].value.to_list(), [1, 2, 3])
+        self.assertEqual(child.data_stack[2][0].value.to_list(), [4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
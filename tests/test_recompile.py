@@ -0,0 +1,52 @@
+import unittest
+
+import mufsim.gamedb as db
+from mufsim.compiler import MufCompiler
+from mufsim.processlist import ProcessList
+
+
+# main yields with 0 SLEEP, and is recompiled while it's asleep.  When it
+# wakes up, its CALL to its own public must land in the version it's
+# still running, even though the new version moved that function.
+OLD_SRC = """
+: helper "old" ;
+public helper
+: main 0 sleep prog "helper" call ;
+"""
+
+NEW_SRC = """
+: pad "pad" ;
+: helper "new" ;
+public helper
+: main 0 sleep prog "helper" call ;
+"""
+
+
+class RecompileTest(unittest.TestCase):
+    def compile(self, progobj, src):
+        progobj.sources = src
+        self.assertTrue(MufCompiler().compile_source(progobj.dbref))
+
+    def test_self_call_after_recompile(self):
+        userobj = db.get_player_obj("John_Doe")
+        progobj = db.get_registered_obj(userobj, "$cmd/test")
+        self.compile(progobj, OLD_SRC)
+        proclist = ProcessList()
+        fr = proclist.new_process()
+        trigobj = db.get_registered_obj(userobj, "$testaction")
+        fr.setup(progobj, userobj, trigobj, "")
+        proclist.queue_process(fr)
+        proclist.process()
+        self.assertTrue(fr.call_stack)
+        self.compile(progobj, NEW_SRC)
+        for i in range(20):
+            proclist.process()
+        self.assertFalse(fr.call_stack)
+        self.assertEqual(list(fr.data_stack), ["", "old"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap
@@ -0,0 +1,46 @@
+import unittest
+
+from mufsim.processlist import ProcessList
+from mufsim.timers import MufTimerQueue
+
+
+class TimerQueueTest(unittest.TestCase):
+    def test_cancel_leaves_nothing_queued(self):
+        queue = MufTimerQueue()
+        queue.add(10.0, "a", "a")
+        self.assertTrue(queue.cancel("a"))
+        self.assertEqual(len(queue), 0)
+        self.assertIsNone(queue.next_time())
+        self.assertEqual(queue.pop_due(20.0), [])
+
+    def test_replace_keeps_one_entry(self):
+        queue = MufTimerQueue()
+        queue.add(10.0, "a", 1)
+        queue.add(5.0, "a", 2)
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue.pop_due(20.0), [(5.0, "a", 2)])
+        self.assertIsNone(queue.next_time())
+
+    def test_timer_stop_after_timer_start(self):
+        proclist = ProcessList()
+        proclist.timer_add(1, 1, "tick")
+        proclist.timer_del(1, "tick")
+        self.assertEqual(len(proclist.timer_queue), 0)
+        self.assertIsNone(proclist.timer_queue.next_time())
+        self.assertIsNone(proclist.next_time())
+
+    def test_process_exit_cancels_timers(self):
+        proclist = ProcessList()
+        fr = proclist.new_process()
+        proclist.timer_add(1, fr.pid, "tick")
+        proclist.timer_add(2, fr.pid, "tock")
+        proclist.kill_process(fr.pid)
+        self.assertEqual(len(proclist.timer_queue), 0)
+        self.assertIsNone(proclist.next_time())
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: expandtab tabstop=4 shiftwidth=4 softtabstop=4 nowrap